@@ -0,0 +1,133 @@
+# Role allocation counters, maintained by the allocation write routes so the
+# list and stats endpoints never aggregate employee_role_allocations.
+CREATE_ALLOCATION_STATS_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS role_allocation_stats_daily (
+        allocated_date DATE NOT NULL,
+        role_id VARCHAR(50) NOT NULL,
+        allocation_count INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (allocated_date, role_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS role_allocation_counters (
+        role_id VARCHAR(50) PRIMARY KEY,
+        allocation_count INT NOT NULL DEFAULT 0,
+        INDEX idx_allocation_count (allocation_count)
+    )
+    """
+]
+
+
+def create_allocation_stats_tables(cursor):
+    for statement in CREATE_ALLOCATION_STATS_TABLES:
+        cursor.execute(statement)
+
+
+def count_allocation(cursor, allocated_date, role_id, delta):
+    """
+    Add ``delta`` (+1 or -1) allocations for a date and role.
+
+    Runs on the caller's cursor so the counters commit with the allocation
+    write.
+    """
+    cursor.execute("""
+        INSERT INTO role_allocation_stats_daily (allocated_date, role_id, allocation_count)
+        VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE allocation_count = allocation_count + VALUES(allocation_count)
+    """, (allocated_date, role_id, delta))
+    cursor.execute("""
+        INSERT INTO role_allocation_counters (role_id, allocation_count)
+        VALUES (%s, %s)
+        ON DUPLICATE KEY UPDATE allocation_count = allocation_count + VALUES(allocation_count)
+    """, (role_id, delta))
+    if delta < 0:
+        cursor.execute("DELETE FROM role_allocation_stats_daily WHERE allocated_date = %s AND role_id = %s "
+                       "AND allocation_count <= 0", (allocated_date, role_id))
+        cursor.execute("DELETE FROM role_allocation_counters WHERE role_id = %s AND allocation_count <= 0",
+                       (role_id,))
+
+
+def _value(row, key):
+    if row is None:
+        return 0
+    value = row[key] if isinstance(row, dict) else row[0]
+    return int(value or 0)
+
+
+def read_allocation_stats(cursor, top=None):
+    """
+    total, recent (last 30 days) and roleDistribution from the counters.
+
+    Args:
+        cursor: Dictionary cursor
+        top (int, optional): Number of roles in the distribution (all if None)
+    """
+    cursor.execute("SELECT SUM(allocation_count) AS total FROM role_allocation_counters")
+    total = _value(cursor.fetchone(), 'total')
+    cursor.execute("""
+        SELECT SUM(allocation_count) AS recent FROM role_allocation_stats_daily
+        WHERE allocated_date >= DATE_SUB(CURDATE(), INTERVAL 30 DAY)
+    """)
+    recent = _value(cursor.fetchone(), 'recent')
+    query = """
+        SELECT role_id, allocation_count AS count FROM role_allocation_counters
+        ORDER BY allocation_count DESC, role_id
+    """
+    if top:
+        query += f" LIMIT {int(top)}"
+    cursor.execute(query)
+    return {
+        "total": total,
+        "recent": recent,
+        "roleDistribution": cursor.fetchall()
+    }
+
+
+def allocation_trend(cursor, months=6):
+    """Allocations per month (YYYY-MM) for the last ``months`` months"""
+    cursor.execute(f"""
+        SELECT
+            DATE_FORMAT(allocated_date, '%Y-%m') as month,
+            CAST(SUM(allocation_count) AS UNSIGNED) as count
+        FROM role_allocation_stats_daily
+        WHERE allocated_date >= DATE_SUB(CURDATE(), INTERVAL {int(months)} MONTH)
+        GROUP BY DATE_FORMAT(allocated_date, '%Y-%m')
+        ORDER BY month
+    """)
+    return cursor.fetchall()
+
+
+def rebuild_allocation_stats(conn):
+    """
+    Recount both counter tables from employee_role_allocations.
+
+    Returns:
+        dict: Rows written per table
+    """
+    cursor = conn.cursor()
+    try:
+        create_allocation_stats_tables(cursor)
+        cursor.execute("DELETE FROM role_allocation_stats_daily")
+        cursor.execute("""
+            INSERT INTO role_allocation_stats_daily (allocated_date, role_id, allocation_count)
+            SELECT allocated_date, role_id, COUNT(*)
+            FROM employee_role_allocations
+            GROUP BY allocated_date, role_id
+        """)
+        daily = cursor.rowcount
+        cursor.execute("DELETE FROM role_allocation_counters")
+        cursor.execute("""
+            INSERT INTO role_allocation_counters (role_id, allocation_count)
+            SELECT role_id, COUNT(*)
+            FROM employee_role_allocations
+            GROUP BY role_id
+        """)
+        roles = cursor.rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return {'role_allocation_stats_daily': daily, 'role_allocation_counters': roles}
@@ -5,6 +5,8 @@ import re
 import io
 from io import BytesIO ,StringIO 
 import traceback
+import atexit
+import time
 from datetime import datetime, timedelta
 import pandas as pd
 from flask import send_file, make_response , redirect, url_for
@@ -14,7 +16,8 @@ from reportlab.lib import colors
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image, Flowable
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 import os
-from flask import Flask, request, jsonify, url_for, send_from_directory
+from flask import Flask, request, jsonify, url_for, send_from_directory, g, has_app_context, has_request_context
+import click
 from werkzeug.utils import secure_filename
 import mysql.connector
 from flask import send_from_directory
@@ -25,6 +28,31 @@ import logging
 from flask_mysqldb import MySQL
 from reportlab.lib.units import inch
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Table, TableStyle, Spacer, Image, Flowable
+from db_pool import ConnectionPool, RequestConnection
+from pagination import ListSpec, PaginationError, run_list_query, page_headers
+from schema_registry import SchemaRegistry
+from ref_cache import TTLCache
+from csv_export import stream_csv_response, build_csv_content
+from pdf_report import render_table_pdf
+from log_writer import BufferedLogWriter
+from report_cache import ReportArtifactCache
+from timesheet_lines import CREATE_TASK_LINES_TABLE, sync_entry_task_lines, backfill_task_lines
+from allocation_stats import (create_allocation_stats_tables, count_allocation, read_allocation_stats,
+                              allocation_trend, rebuild_allocation_stats)
+from task_status import CREATE_TASK_CURRENT_STATUS_TABLE, record_task_status, current_statuses, rebuild_task_status
+from id_resolver import EntityIdResolver, ID_SOURCES, NORMALIZED, SAME_NUMBER
+from profile_images import (ProfileImageWorker, ProfileImageError, validate_upload, variant_name, variant_names,
+                            parse_variant, render_variants, PRIMARY_VARIANT)
+from role_tree import RoleTreeService
+from static_files import send_cached_file
+from compression import ResponseCompressor, negotiate
+from json_provider import FastJSONProvider, RawJSON, json_formats
+from reporting_graph import ReportingGraphService, fetch_latest_allocations, manager_lines, reporting_rows
+from search_index import CREATE_SEARCH_TABLE, SEARCH_TYPES, reindex_entities, rebuild_search_index, search
+from download_stats import create_download_stats_tables, apply_download_events, subtract_logs, backfill_download_stats
+from timesheet_rollups import ROLLUP_TABLES, ALL_PROJECTS, create_rollup_tables, refresh_rollups, rebuild_rollups, read_rollup
+from report_jobs import ReportJobQueue, ReportJobError, QueueFullError, JOB_DONE, JOB_FAILED
+from query_audit import QueryCapture, scan_source, local_modules, attribute_routes, load_capture, run_audit
 
 
 def check_table_structure():
@@ -172,11 +200,51 @@ logger = logging.getLogger(__name__)
 
 
 app = Flask(__name__)
+# jsonify() encodes with orjson and writes TIME columns and JSON columns
+# itself. Routes marked @json_formats also get their dates written as
+# YYYY-MM-DD[ HH:MM:SS] instead of HTTP dates, so they can return rows as
+# fetched. Formats can be changed with JSON_DATE_FORMAT /
+# JSON_DATETIME_FORMAT / JSON_TIME_FORMAT (set one to 'iso' for ISO 8601).
+app.json = FastJSONProvider(app)
+for _attr, _env in (('date_format', 'JSON_DATE_FORMAT'), ('datetime_format', 'JSON_DATETIME_FORMAT'),
+                    ('time_format', 'JSON_TIME_FORMAT')):
+    if os.environ.get(_env):
+        setattr(app.json, _attr, None if os.environ[_env].lower() == 'iso' else os.environ[_env])
 # Configure CORS properly to allow requests from frontend
-CORS(app, resources={r"/*": {"origins": ["http://localhost:3000"], "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"], "allow_headers": ["Content-Type", "Authorization"]}})
+CORS(app, resources={r"/*": {"origins": ["http://localhost:3000"], "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"], "allow_headers": ["Content-Type", "Authorization"], "expose_headers": ["X-Next-Cursor", "X-Total-Count", "X-Page-Limit", "Location", "Retry-After"]}})
 # Configure your upload folder and allowed extensions
 app.config['UPLOAD_FOLDER'] = './uploads'
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg'}
+ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'webp'}
+
+# Upload and static file caching. uuid-named uploads are cached as immutable;
+# other files for the max-age below. Behind nginx, set *_ACCEL_PREFIX to the
+# internal location of each folder so nginx sends the bytes (X-Accel-Redirect);
+# USE_X_SENDFILE does the same for Apache/lighttpd.
+UPLOAD_MAX_AGE = int(os.environ.get('UPLOAD_MAX_AGE', 0))
+STATIC_MAX_AGE = int(os.environ.get('STATIC_MAX_AGE', 3600))
+UPLOADS_ACCEL_PREFIX = os.environ.get('UPLOADS_ACCEL_PREFIX')
+STATIC_ACCEL_PREFIX = os.environ.get('STATIC_ACCEL_PREFIX')
+app.config['USE_X_SENDFILE'] = os.environ.get('USE_X_SENDFILE', '').lower() in ('1', 'true', 'yes')
+
+# Latest allocation per employee, newest allocated_date first (ties broken
+# by id). Used as a derived table so list endpoints avoid one role lookup
+# per employee.
+LATEST_ROLE_ALLOCATION_QUERY = """
+    SELECT employee_id, role_id, role_name
+    FROM (
+        SELECT 
+            employee_id, role_id, role_name,
+            ROW_NUMBER() OVER (
+                PARTITION BY employee_id
+                ORDER BY allocated_date DESC, id DESC
+            ) AS rn
+        FROM employee_role_allocations
+    ) ranked
+    WHERE rn = 1
+"""
+
+# Maximum number of IDs sent in a single IN (...) list
+BULK_LOOKUP_CHUNK_SIZE = 500
 
 # Define role mappings for quick lookup
 ROLE_MAPPING = {
@@ -196,6 +264,50 @@ ROLE_MAPPING = {
   "INTRN": { "description": "Internship Trainee", "parent": "SSE" }
 }
 
+# Columns added to download_logs for background report jobs
+DOWNLOAD_LOG_JOB_COLUMNS = [
+    ('job_id', 'VARCHAR(32)'),
+    ('job_status', 'VARCHAR(20)'),
+    ('started_at', 'DATETIME'),
+    ('finished_at', 'DATETIME'),
+    ('queue_ms', 'INT'),
+    ('run_ms', 'INT'),
+    ('error_message', 'TEXT'),
+    ('artifact_name', 'VARCHAR(255)'),
+    ('artifact_type', 'VARCHAR(100)'),
+]
+
+def add_missing_columns(cursor, table, columns):
+    """Add any of ``columns`` ([(name, definition)]) that ``table`` does not have yet"""
+    cursor.execute("""
+        SELECT COLUMN_NAME FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+    """, (table,))
+    existing = {row[0] for row in cursor.fetchall()}
+    for name, definition in columns:
+        if name not in existing:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+
+# NULL task_ids never collide in a unique key, so the key uses IFNULL(task_id, '')
+TIMESHEET_SUMMARY_KEY_COLUMNS = [
+    ('task_key', "VARCHAR(20) GENERATED ALWAYS AS (IFNULL(task_id, '')) STORED"),
+]
+
+def add_missing_index(cursor, table, index_name, definition):
+    """Add an index unless ``table`` already has one named ``index_name``"""
+    cursor.execute("""
+        SELECT 1 FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s
+        LIMIT 1
+    """, (table, index_name))
+    if cursor.fetchone():
+        return
+    try:
+        cursor.execute(f"ALTER TABLE {table} ADD {definition}")
+    except Error as e:
+        # Existing duplicate rows block a unique key; they have to be merged by hand
+        print(f"Could not add index {index_name} to {table}: {e}")
+
 # Initialize database tables
 def create_tables():
     """Create required tables if they don't exist"""
@@ -269,6 +381,15 @@ def create_tables():
             )
         """)
         
+        # Allocation counters for the list/stats endpoints
+        create_allocation_stats_tables(cursor)
+        
+        # Cross-entity search documents, maintained by the entity write routes
+        cursor.execute(CREATE_SEARCH_TABLE)
+        
+        # Latest status per task, maintained by update_task_status
+        cursor.execute(CREATE_TASK_CURRENT_STATUS_TABLE)
+        
         # Create time_sheet_summary table if it doesn't exist
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS time_sheet_summary (
@@ -283,14 +404,28 @@ def create_tables():
                 out_time TIME NOT NULL,
                 total_hours DECIMAL(5,2) NOT NULL,
                 total_entries INT GENERATED ALWAYS AS (1) STORED,
+                task_key VARCHAR(20) GENERATED ALWAYS AS (IFNULL(task_id, '')) STORED,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
                 INDEX idx_employee (employee_id),
                 INDEX idx_project (project_id),
-                INDEX idx_date (entry_date)
+                INDEX idx_date (entry_date),
+                UNIQUE KEY uq_summary_employee_date_task (employee_id, entry_date, task_key)
             )
         """)
         
+        # Task lines of timesheet entries, indexed for per-task/project/employee hours
+        cursor.execute(CREATE_TASK_LINES_TABLE)
+        
+        # Daily/weekly/monthly hour rollups per employee and project
+        create_rollup_tables(cursor)
+        
+        # One summary row per employee, date and task (rows without a task
+        # share the '' task_key), so bulk saves can upsert
+        add_missing_columns(cursor, 'time_sheet_summary', TIMESHEET_SUMMARY_KEY_COLUMNS)
+        add_missing_index(cursor, 'time_sheet_summary', 'uq_summary_employee_date_task',
+                          'UNIQUE KEY uq_summary_employee_date_task (employee_id, entry_date, task_key)')
+        
         # Create clients table if it doesn't exist
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS clients (
@@ -367,8 +502,46 @@ def create_tables():
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         """)
+
+        # Create download_logs table if it doesn't exist
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS download_logs (
+                log_id INT AUTO_INCREMENT PRIMARY KEY,
+                user_id VARCHAR(50),
+                report_type VARCHAR(50) NOT NULL,
+                entity_id VARCHAR(50),
+                download_format VARCHAR(10) NOT NULL,
+                ip_address VARCHAR(45),
+                download_date DATETIME NOT NULL,
+                filter_params TEXT,
+                record_count INT DEFAULT 0
+            )
+        """)
+
+        # Background report jobs record their state and timings on the log row
+        add_missing_columns(cursor, 'download_logs', DOWNLOAD_LOG_JOB_COLUMNS)
+        add_missing_index(cursor, 'download_logs', 'idx_download_date', 'INDEX idx_download_date (download_date)')
+        add_missing_index(cursor, 'download_logs', 'idx_download_job_id', 'INDEX idx_download_job_id (job_id)')
         
+        # Download counts per day/type/format and per entity for the stats endpoints
+        create_download_stats_tables(cursor)
+
         conn.commit()
+        
+        # Derived tables are seeded the first time, once every table they
+        # read from exists
+        schema_registry.refresh()
+        cursor.execute("SELECT 1 FROM role_allocation_counters LIMIT 1")
+        if not cursor.fetchone():
+            rebuild_allocation_stats(conn)
+        # task_update is not created here; without it there is nothing to seed
+        cursor.execute("SELECT 1 FROM task_current_status LIMIT 1")
+        if not cursor.fetchone() and schema_registry.has_table('task_update'):
+            rebuild_task_status(conn)
+        cursor.execute("SELECT 1 FROM search_documents LIMIT 1")
+        if not cursor.fetchone():
+            rebuild_search_index(conn, schema_registry.columns)
+        
         print("Database tables created/verified successfully")
         
         cursor.close()
@@ -379,13 +552,62 @@ def create_tables():
 
 @app.route('/uploads/<filename>')
 def uploaded_file(filename):
-    return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+    # A variant requested right after an upload may still be rendering
+    variant = parse_variant(filename)
+    if variant and not os.path.exists(os.path.join(app.config['UPLOAD_FOLDER'], filename)):
+        profile_images.wait(variant[0], PROFILE_IMAGE_WAIT)
+    return send_cached_file(app.config['UPLOAD_FOLDER'], filename, UPLOAD_MAX_AGE, UPLOADS_ACCEL_PREFIX)
+
+def serve_static(filename):
+    return send_cached_file(app.static_folder, filename, STATIC_MAX_AGE, STATIC_ACCEL_PREFIX)
+
+# /static/<path:filename> gets the same ETag and caching as uploads
+app.view_functions['static'] = serve_static
+
+# JSON, CSV and text responses are compressed with brotli (when installed)
+# or gzip, as negotiated with Accept-Encoding. Bodies under
+# COMPRESS_MIN_SIZE bytes are sent as is; streamed CSV exports are
+# compressed chunk by chunk. Set COMPRESS_RESPONSES=0 when a proxy
+# in front already compresses.
+COMPRESS_RESPONSES = os.environ.get('COMPRESS_RESPONSES', '1').lower() not in ('0', 'false', 'no')
+compressor = ResponseCompressor(
+    min_size=int(os.environ.get('COMPRESS_MIN_SIZE', 1024)),
+    gzip_level=int(os.environ.get('COMPRESS_GZIP_LEVEL', 6)),
+    brotli_quality=int(os.environ.get('COMPRESS_BROTLI_QUALITY', 5))
+)
+
+@app.after_request
+def compress_response(response):
+    if not COMPRESS_RESPONSES:
+        return response
+    try:
+        return compressor.compress_response(response, request.accept_encodings, request.range is not None)
+    except Exception as e:
+        print(f"Error compressing response for {request.path}: {e}")
+        return response
+
+@app.route('/api/compression/stats', methods=['GET'])
+def get_compression_stats():
+    stats = compressor.stats()
+    stats['enabled'] = COMPRESS_RESPONSES
+    return jsonify(stats)
 
 # Utility function to convert MySQL rows to dictionaries
 def row_to_dict(cursor):
     columns = [col[0] for col in cursor.description]
     return [dict(zip(columns, row)) for row in cursor.fetchall()]
 
+# Hand JSON text columns to jsonify() as is; text that does not parse is sent as []
+def raw_json_columns(rows, *columns):
+    for row in rows:
+        for column in columns:
+            value = row.get(column)
+            if isinstance(value, (bytes, bytearray)):
+                value = value.decode('utf-8')
+            if value and isinstance(value, str):
+                row[column] = RawJSON(value, invalid=[])
+    return rows
+
 # Format dates for JSON response
 def format_dates(item):
     date_fields = ['release_date', 'committed_date', 'initiative_date', 'target_completion_date', 'actual_completion_date', 'allocated_date']
@@ -440,7 +662,7 @@ def health_check():
         cursor.fetchone()
         cursor.close()
         conn.close()
-        return jsonify({"status": "healthy", "database": "connected"})
+        return jsonify({"status": "healthy", "database": "connected", "pool": db_pool.metrics()})
     except Error as e:
         return jsonify({"status": "unhealthy", "database": "disconnected", "error": str(e)}), 500
 
@@ -448,6 +670,108 @@ def health_check():
 # Create uploads directory if it doesn't exist
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
+# Profile photos are validated in the request, stored raw in a folder that is
+# not served and resized to WebP/JPEG variants by background threads.
+# employees.profile_pic points at the 1024 px JPEG.
+PROFILE_IMAGE_MAX_BYTES = int(float(os.environ.get('PROFILE_IMAGE_MAX_MB', 10)) * 1024 * 1024)
+PROFILE_IMAGE_WAIT = float(os.environ.get('PROFILE_IMAGE_WAIT', 5))
+profile_images = ProfileImageWorker(
+    directory=app.config['UPLOAD_FOLDER'],
+    incoming_dir=os.path.join(app.config['UPLOAD_FOLDER'], '.incoming'),
+    workers=int(os.environ.get('PROFILE_IMAGE_WORKERS', 2)),
+    max_queue=int(os.environ.get('PROFILE_IMAGE_QUEUE_SIZE', 100))
+)
+
+def read_profile_image(file):
+    """
+    Read and validate an uploaded photo. At most one byte over the limit is
+    read, so an oversized upload is rejected without loading all of it.
+
+    Returns:
+        bytes: The upload, for queue_profile_image() once the row is saved
+
+    Raises:
+        ProfileImageError: The upload is not an acceptable image
+    """
+    if not allowed_file(file.filename):
+        raise ProfileImageError("Invalid file type. Only PNG, JPG, JPEG and WebP allowed.")
+    data = file.stream.read(PROFILE_IMAGE_MAX_BYTES + 1)
+    validate_upload(data, max_bytes=PROFILE_IMAGE_MAX_BYTES)
+    return data
+
+def queue_profile_image(stem, data):
+    """Store a validated upload and queue it for resizing; call after the commit"""
+    try:
+        profile_images.store(stem, data)
+        profile_images.submit(stem)
+    except OSError as e:
+        print(f"Error storing profile image {stem}: {e}")
+
+def profile_image_variants(profile_pic):
+    """{size: {format: url}} for a processed profile_pic, None for older uploads"""
+    variant = parse_variant(profile_pic)
+    if not variant:
+        return None
+    return {
+        str(size): {ext: url_for('uploaded_file', filename=name, _external=True) for ext, name in names.items()}
+        for size, names in variant_names(variant[0]).items()
+    }
+
+def add_profile_thumbnails(employees, field='profile_photo'):
+    """Add profile_thumbnail (64 px WebP) to list rows whose photo has variants"""
+    for employee in employees:
+        variant = parse_variant(employee.get(field))
+        employee['profile_thumbnail'] = (
+            url_for('uploaded_file', filename=variant_name(variant[0], 64, 'webp'), _external=True)
+            if variant else None
+        )
+    return employees
+
+@app.route('/api/profile-images/stats', methods=['GET'])
+def get_profile_image_stats():
+    return jsonify(profile_images.stats())
+
+@app.cli.command('process-profile-images')
+def process_profile_images_command():
+    """Resize uploads left unprocessed and convert older profile photos to variants"""
+    # Rendered in this process: the worker threads are daemons and would be
+    # killed when the command exits
+    done, failed = profile_images.process_pending(inline=True)
+    if done or failed:
+        print(f"Processed {done} pending uploads ({failed} failed)")
+    conn = get_db_connection()
+    if not conn:
+        print("Database connection failed.")
+        return
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT employee_id, profile_pic FROM employees WHERE profile_pic IS NOT NULL AND profile_pic <> ''")
+        converted = 0
+        for employee_id, profile_pic in cursor.fetchall():
+            if parse_variant(profile_pic):
+                continue
+            path = os.path.join(app.config['UPLOAD_FOLDER'], os.path.basename(profile_pic))
+            if not os.path.isfile(path):
+                print(f"Skipping {employee_id}: {profile_pic} not found")
+                continue
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+                validate_upload(data, max_bytes=PROFILE_IMAGE_MAX_BYTES)
+                stem = f"profile_{secure_filename(employee_id)}_{uuid.uuid4().hex}"
+                render_variants(data, app.config['UPLOAD_FOLDER'], stem)
+            except (ProfileImageError, OSError) as e:
+                print(f"Skipping {employee_id}: {e}")
+                continue
+            cursor.execute("UPDATE employees SET profile_pic = %s WHERE employee_id = %s",
+                           (variant_name(stem, *PRIMARY_VARIANT), employee_id))
+            conn.commit()
+            converted += 1
+        print(f"Converted {converted} profile photos")
+    finally:
+        cursor.close()
+        conn.close()
+
 def cursor_result_to_dict(cursor):
     columns = [col[0] for col in cursor.description]
     return [dict(zip(columns, row)) for row in cursor.fetchall()]
@@ -485,20 +809,282 @@ def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 # MySQL Database connection setup
+# Connections come from a bounded pool. Inside a request every call to
+# get_db_connection() returns the same connection, and it is handed back to
+# the pool when the app context is torn down. Size the pool so that
+# DB_POOL_SIZE x gunicorn workers stays below MySQL's max_connections.
+db_pool = ConnectionPool(
+    pool_size=int(os.environ.get('DB_POOL_SIZE', 10)),
+    checkout_timeout=float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+    pre_ping_after=float(os.environ.get('DB_POOL_PRE_PING_AFTER', 30)),
+    recycle_after=float(os.environ.get('DB_POOL_RECYCLE', 3600)),
+    host='localhost',
+    database='employee_management_v2',
+    user='root',
+    password='password123'
+)
+
 def get_db_connection():
     try:
-        connection = mysql.connector.connect(
-            host='localhost',
-            database='employee_management_v2',
-            user='root',
-            password='password123'
-        )
-        if connection.is_connected():
-            return connection
+        if has_app_context():
+            if 'db_conn' not in g:
+                g.db_conn = db_pool.checkout(wrapper=RequestConnection)
+                if query_capture:
+                    endpoint = request.endpoint if has_request_context() else None
+                    g.db_conn = query_capture.wrap(g.db_conn, endpoint)
+            return g.db_conn
+        # Outside a request (startup scripts) the caller owns the connection
+        # and close() returns it to the pool
+        return db_pool.checkout()
     except Error as e:
         print(f"Error while connecting to MySQL: {e}")
         return None
 
+# Set QUERY_AUDIT_CAPTURE to a file path to record every statement the app
+# runs (with its endpoint and first parameters) for `flask audit-queries`
+QUERY_AUDIT_CAPTURE = os.environ.get('QUERY_AUDIT_CAPTURE')
+query_capture = QueryCapture(QUERY_AUDIT_CAPTURE) if QUERY_AUDIT_CAPTURE else None
+if query_capture:
+    atexit.register(query_capture.save)
+
+@app.teardown_appcontext
+def release_db_connection(exception=None):
+    conn = g.pop('db_conn', None)
+    if conn is not None:
+        conn.release()
+
+@app.cli.command('audit-queries')
+@click.option('--output', default='query_audit.json', show_default=True, help='Where to write the JSON report')
+@click.option('--capture', default=None, help='Runtime capture file (defaults to QUERY_AUDIT_CAPTURE)')
+@click.option('--top', default=10, show_default=True, help='Recommendations to print')
+def audit_queries_command(output, capture, top):
+    """
+    EXPLAIN every SQL statement of the backend and rank index recommendations.
+
+    Statements come from a static scan of app.py and its helper modules plus,
+    if available, a runtime capture. Run it against a local database seeded
+    with representative data.
+    """
+    statements = []
+    functions = {}
+    for path in local_modules(__file__):
+        found, funcs = scan_source(path)
+        statements.extend(found)
+        functions.update(funcs)
+    endpoints = {}
+    for rule in app.url_map.iter_rules():
+        methods = ','.join(sorted(m for m in rule.methods if m not in ('HEAD', 'OPTIONS')))
+        endpoints.setdefault(rule.endpoint, []).append(f"{methods} {rule.rule}")
+    attribute_routes(statements, functions, endpoints)
+    
+    if query_capture:
+        query_capture.save()
+    conn = get_db_connection()
+    if not conn:
+        print("Database connection failed.")
+        return
+    try:
+        report = run_audit(conn, statements, load_capture(capture or QUERY_AUDIT_CAPTURE), endpoints)
+    finally:
+        conn.close()
+    
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, sort_keys=True, default=str)
+    
+    summary = report['summary']
+    print(f"{summary['statements']} statements, {summary['explained']} explained, "
+          f"{summary['flagged']} flagged, {summary['errors']} not explainable")
+    for rec in report['recommendations'][:top]:
+        print(f"{rec['rank']:>3}. {rec['ddl']}  score={rec['score']} routes={len(rec['routes'])}")
+    print(f"Report written to {output}")
+
+@app.route('/api/db-pool/metrics', methods=['GET'])
+def get_db_pool_metrics():
+    """Connection pool usage, for sizing the pool against the worker count"""
+    return jsonify(db_pool.metrics())
+
+# Table/column cache so request handlers never run SHOW COLUMNS or DESCRIBE.
+# Call /api/schema/refresh after running migrations.
+schema_registry = SchemaRegistry(get_db_connection, max_age=float(os.environ.get('SCHEMA_CACHE_TTL', 0)))
+
+@app.route('/api/schema/refresh', methods=['POST'])
+def refresh_schema_cache():
+    """Reload cached table columns and rebuild schema-dependent statements"""
+    try:
+        tables = schema_registry.refresh()
+        return jsonify({"message": "Schema cache refreshed", "tables": len(tables)}), 200
+    except Error as e:
+        return jsonify({"error": str(e)}), 500
+
+# In-process caches for reference lookups used by the forms. Write routes
+# that change these rows invalidate them; the TTL bounds staleness across
+# worker processes.
+REFERENCE_CACHE_TTL = float(os.environ.get('REFERENCE_CACHE_TTL', 300))
+REFERENCE_CACHE_SIZE = int(os.environ.get('REFERENCE_CACHE_SIZE', 2048))
+role_cache = TTLCache('roles', maxsize=REFERENCE_CACHE_SIZE, ttl=REFERENCE_CACHE_TTL)
+employee_name_cache = TTLCache('employee_names', maxsize=REFERENCE_CACHE_SIZE, ttl=REFERENCE_CACHE_TTL)
+client_cache = TTLCache('clients', maxsize=REFERENCE_CACHE_SIZE, ttl=REFERENCE_CACHE_TTL)
+product_cache = TTLCache('products', maxsize=REFERENCE_CACHE_SIZE, ttl=REFERENCE_CACHE_TTL)
+REFERENCE_CACHES = (role_cache, employee_name_cache, client_cache, product_cache)
+
+@app.route('/api/reference-cache/stats', methods=['GET'])
+def get_reference_cache_stats():
+    """Hit/miss counters for the reference lookup caches"""
+    return jsonify([cache.stats() for cache in REFERENCE_CACHES])
+
+@app.route('/api/reference-cache/clear', methods=['POST'])
+def clear_reference_cache():
+    for cache in REFERENCE_CACHES:
+        cache.invalidate()
+    return jsonify({"message": "Reference caches cleared"}), 200
+
+# In-memory index of employee/project/product/client/task IDs. Report and
+# detail routes resolve user-typed IDs ('P123', '123', 'pro-0123') against it
+# before querying, instead of falling back to LIKE '%...%' scans.
+def load_entity_ids(table, key_column):
+    conn = get_db_connection()
+    if not conn:
+        raise Error("Database connection failed")
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"SELECT {key_column} FROM {table}")
+        return [row[0] for row in cursor.fetchall() if row[0] not in (None, '')]
+    finally:
+        cursor.close()
+        conn.close()
+
+entity_ids = EntityIdResolver(
+    load_entity_ids,
+    ttl=float(os.environ.get('ID_INDEX_TTL', 300)),
+    miss_reload_after=float(os.environ.get('ID_INDEX_MISS_RELOAD', 5))
+)
+
+def canonical_id(entity_type, raw_id, max_tier=SAME_NUMBER):
+    """
+    The canonical ID for a user-supplied one, or ``raw_id`` unchanged when the
+    index has no single exact, normalized or same-number match (or cannot be
+    loaded), so the query decides and an unknown ID still gets a 404.
+    """
+    try:
+        return entity_ids.resolve(entity_type, raw_id, max_tier) or raw_id
+    except Error as e:
+        print(f"Error loading {entity_type} ID index: {e}")
+        return raw_id
+
+def candidate_ids(entity_type, raw_id):
+    """
+    Best-ranked IDs for a user-supplied one, or None when the index cannot be
+    loaded and the caller has to query without it.
+    """
+    try:
+        return entity_ids.candidates(entity_type, raw_id)
+    except Error as e:
+        print(f"Error loading {entity_type} ID index: {e}")
+        return None
+
+def matching_ids(entity_type, raw_id, limit=None):
+    """
+    IDs matching a partial ID, best first, or None when the index cannot be
+    loaded and the caller has to query without it.
+    """
+    try:
+        return entity_ids.search(entity_type, raw_id, limit)
+    except Error as e:
+        print(f"Error loading {entity_type} ID index: {e}")
+        return None
+
+def id_filter(entity_type, key_column, raw_id, limit=None):
+    """
+    WHERE condition and params selecting the rows whose ID matches a partial
+    one, by primary key. Falls back to LIKE when the index cannot be loaded.
+    """
+    ids = matching_ids(entity_type, raw_id, limit)
+    if ids is None:
+        return f"{key_column} LIKE %s", (f"%{raw_id}%",)
+    if not ids:
+        return "1 = 0", ()
+    return f"{key_column} IN ({', '.join(['%s'] * len(ids))})", tuple(ids)
+
+@app.route('/api/resolve-id/<entity_type>/<path:raw_id>', methods=['GET'])
+def resolve_entity_id(entity_type, raw_id):
+    """Canonical ID (if unambiguous) and ranked candidates for a user-typed ID"""
+    if entity_type not in ID_SOURCES:
+        return jsonify({"error": "Invalid entity type", "types": list(ID_SOURCES)}), 400
+    try:
+        candidates = entity_ids.candidates(entity_type, raw_id)
+        resolved = entity_ids.resolve(entity_type, raw_id)
+    except Error as e:
+        return jsonify({"error": str(e)}), 500
+    return jsonify({
+        "input": raw_id,
+        "id": resolved,
+        "candidates": candidates
+    }), 200 if candidates else 404
+
+@app.route('/api/id-index/stats', methods=['GET'])
+def get_id_index_stats():
+    return jsonify(entity_ids.stats())
+
+# Role description lookup; the column name differs between older and newer
+# versions of the employee_roles table
+def build_role_name_query(registry):
+    columns = registry.columns('employee_roles')
+    for column, field_name in (('role_description', 'roleDescription'),
+                               ('role_name', 'roleName'),
+                               ('rolename', 'roleName'),
+                               ('description', 'roleDescription')):
+        if column in columns:
+            return f"SELECT {column} FROM employee_roles WHERE role_id = %s", field_name
+    return None, None
+
+# Every role with its name and parent, for the in-memory role tree. The
+# parent_role column written by the role routes wins over role_hierarchy.
+def build_role_tree_query(registry):
+    columns = registry.columns('employee_roles')
+    name_column = next((f"r.{c}" for c in ('role_description', 'role_name') if c in columns), 'r.role_id')
+    parents = [f"NULLIF(r.{c}, '')" for c in ('parent_role', 'parent_role_id') if c in columns]
+    join = ''
+    if registry.has_table('role_hierarchy'):
+        parents.append('h.parent_role_id')
+        join = 'LEFT JOIN role_hierarchy h ON h.role_id = r.role_id'
+    parent_column = f"COALESCE({', '.join(parents)})" if len(parents) > 1 else (parents[0] if parents else 'NULL')
+    return f"SELECT r.role_id, {name_column}, {parent_column} FROM employee_roles r {join}"
+
+def role_tree_rows(cursor, role_id=None):
+    """(role_id, role_name, parent_role_id) rows, for every role or just one"""
+    query = schema_registry.compiled('role_tree', build_role_tree_query)
+    if role_id is None:
+        cursor.execute(query)
+    else:
+        cursor.execute(f"{query} WHERE r.role_id = %s", (role_id,))
+    rows = cursor.fetchall()
+    if rows and isinstance(rows[0], dict):
+        rows = [tuple(row.values()) for row in rows]
+    return rows
+
+def load_role_tree_rows():
+    conn = get_db_connection()
+    if not conn:
+        raise Error("Database connection failed")
+    cursor = conn.cursor()
+    try:
+        return role_tree_rows(cursor)
+    finally:
+        cursor.close()
+        conn.close()
+
+# employee_roles/role_hierarchy as an in-memory tree with its ancestor
+# closure; role writes apply their row to it, the TTL picks up other workers'
+role_tree = RoleTreeService(load_role_tree_rows, ttl=float(os.environ.get('ROLE_TREE_TTL', 300)))
+
+def refresh_role_tree(cursor, role_id):
+    """Apply a written role to the role tree; a failure drops the tree so it reloads"""
+    try:
+        role_tree.apply(role_tree_rows(cursor, role_id))
+    except Error as e:
+        print(f"Error updating role tree for {role_id}: {e}")
+        role_tree.invalidate()
+
 # Initialize CORS
 CORS(app)  # Enable CORS for all routes
 
@@ -548,7 +1134,11 @@ def save_product():
             product_framework
         )
         cursor.execute(insert_query, values)
+        update_search_index(cursor, 'product', product_id)
         conn.commit()
+        entity_ids.add('product', product_id)
+        product_cache.invalidate(('name', product_id))
+        report_cache.invalidate('product')
         
         return jsonify({
             'message': 'Product saved successfully',
@@ -610,18 +1200,20 @@ def add_employee():
             except ValueError:
                 return jsonify({"error": "Invalid DOJ format. Use DD-MM-YYYY."}), 400
         
-        # Handle profile photo upload (if any)
+        # Handle profile photo upload (if any); it is only stored once the
+        # employee row is committed
         profile_pic_url = None
+        profile_stem = profile_data = None
         if 'profilePic' in request.files:
             file = request.files['profilePic']
-            if file and file.filename and allowed_file(file.filename):
-                ext = file.filename.rsplit('.', 1)[1].lower()
-                unique_name = f"{uuid.uuid4().hex}.{ext}"
-                filepath = os.path.join(app.config['UPLOAD_FOLDER'], unique_name)
-                file.save(filepath)
+            if file and file.filename:
+                try:
+                    profile_data = read_profile_image(file)
+                except ProfileImageError as e:
+                    return jsonify({"error": str(e)}), 400
+                profile_stem = uuid.uuid4().hex
+                unique_name = variant_name(profile_stem, *PRIMARY_VARIANT)
                 profile_pic_url = url_for('uploaded_file', filename=unique_name, _external=True)
-            elif file and file.filename:
-                return jsonify({"error": "Invalid file type. Only PNG, JPG, JPEG allowed."}), 400
         
         # Database connection
         conn = get_db_connection()
@@ -666,7 +1258,11 @@ def add_employee():
         """
         try:
             cursor.execute(insert_query, values)
+            update_search_index(cursor, 'employee', get("employeeId"))
             conn.commit()
+            entity_ids.add('employee', get("employeeId"))
+            if profile_stem:
+                queue_profile_image(profile_stem, profile_data)
         except Error as e:
             print(f"Error inserting employee data: {e}")
             conn.rollback()
@@ -678,7 +1274,8 @@ def add_employee():
         return jsonify({
             "status": "success",
             "employeeID": get("employeeId"),
-            "profile_photo": profile_pic_url
+            "profile_photo": profile_pic_url,
+            "profile_variants": profile_image_variants(profile_pic_url)
         }), 200
         
     except Exception as e:
@@ -713,6 +1310,8 @@ def add_employee_role():
         try:
             cursor.execute(insert_role_query, (role_id, role_description, parent_role, role_type, status))
             conn.commit()
+            role_cache.invalidate()
+            refresh_role_tree(cursor, role_id)
         except Error as e:
             print(f"Error inserting role data: {e}")
             conn.rollback()
@@ -740,6 +1339,16 @@ def update_employee_role():
         role_type = role_data['roleType']
         status = role_data.get('status')  # Get status if provided
         
+        # A role cannot report to itself or to one of its own sub-roles
+        if parent_role:
+            try:
+                tree = role_tree.tree()
+            except Error as e:
+                print(f"Error loading role tree: {e}")
+                tree = None
+            if parent_role == role_id or (tree is not None and tree.is_ancestor(role_id, parent_role)):
+                return jsonify({"error": f"Role {parent_role} is {role_id} or one of its sub-roles"}), 400
+        
         conn = get_db_connection()
         if not conn:
             return jsonify({"error": "Database connection failed."}), 500
@@ -764,6 +1373,8 @@ def update_employee_role():
         try:
             cursor.execute(update_role_query, query_params)
             conn.commit()
+            role_cache.invalidate()
+            refresh_role_tree(cursor, role_id)
         except Error as e:
             print(f"Error updating role data: {e}")
             conn.rollback()
@@ -781,14 +1392,17 @@ def update_employee_role():
 @app.route('/api/employee_roles', methods=['GET'])
 def get_employee_roles():
     try:
-        conn = get_db_connection()
-        if not conn:
-            return jsonify({"error": "Database connection failed."}), 500
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM employee_roles")
-        roles = cursor.fetchall()
-        cursor.close()
-        conn.close()
+        roles = role_cache.get('employee_roles')
+        if roles is None:
+            conn = get_db_connection()
+            if not conn:
+                return jsonify({"error": "Database connection failed."}), 500
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute("SELECT * FROM employee_roles")
+            roles = cursor.fetchall()
+            cursor.close()
+            conn.close()
+            role_cache.set('employee_roles', roles)
         return jsonify(roles), 200
     except Exception as e:
         print(f"Error fetching employee roles: {e}")
@@ -797,6 +1411,10 @@ def get_employee_roles():
 @app.route('/get_employee_name/<employee_id>', methods=['GET'])
 def get_employee_name(employee_id):
     try:
+        name = employee_name_cache.get(employee_id)
+        if name is not None:
+            return jsonify({'name': name})
+        
         conn = get_db_connection()
         if not conn:
             return jsonify({"error": "Database connection failed."}), 500
@@ -808,7 +1426,9 @@ def get_employee_name(employee_id):
         conn.close()
         
         if result:
-            return jsonify({'name': f"{result[0]} {result[1]}"})
+            name = f"{result[0]} {result[1]}"
+            employee_name_cache.set(employee_id, name)
+            return jsonify({'name': name})
         
         return jsonify({'name': ''}), 404
     except Exception as e:
@@ -887,6 +1507,10 @@ def get_role_name(role_id):
         # This handles cases like single character inputs like 'S' that aren't valid roles
         if role_id in ROLE_MAPPING:
             return jsonify({'roleDescription': ROLE_MAPPING[role_id]['description']}), 200
+        
+        cached = role_cache.get(('name', role_id))
+        if cached is not None:
+            return jsonify(cached), 200
             
         # Fetch the role from the database using the role_id
         conn = get_db_connection()
@@ -895,39 +1519,24 @@ def get_role_name(role_id):
         
         cursor = conn.cursor()
         
-        # Check the structure of the employee_roles table first
-        cursor.execute("SHOW COLUMNS FROM employee_roles")
-        columns = cursor.fetchall()
-        
-        # Extract column names
-        column_names = [column[0] for column in columns]
-        
-        # Determine which query to use based on available columns
-        if 'role_description' in column_names:
-            cursor.execute("SELECT role_description FROM employee_roles WHERE role_id = %s", (role_id,))
-            field_name = 'roleDescription'
-        elif 'role_name' in column_names:
-            cursor.execute("SELECT role_name FROM employee_roles WHERE role_id = %s", (role_id,))
-            field_name = 'roleName'
-        elif 'rolename' in column_names:  # Try lowercase version
-            cursor.execute("SELECT rolename FROM employee_roles WHERE role_id = %s", (role_id,))
-            field_name = 'roleName'
-        elif 'description' in column_names:  # Try generic description field
-            cursor.execute("SELECT description FROM employee_roles WHERE role_id = %s", (role_id,))
-            field_name = 'roleDescription'
-        else:
+        # Query is chosen from the cached employee_roles columns
+        query, field_name = schema_registry.compiled('role_name', build_role_name_query)
+        if not query:
             # If we can't determine the right column, return both column list and error
             return jsonify({
                 'error': 'Could not determine role name/description column',
-                'available_columns': column_names
+                'available_columns': list(schema_registry.columns('employee_roles'))
             }), 500
         
+        cursor.execute(query, (role_id,))
         role = cursor.fetchone()
         cursor.close()
         conn.close()
         
         if role:
-            return jsonify({field_name: role[0]}), 200
+            result = {field_name: role[0]}
+            role_cache.set(('name', role_id), result)
+            return jsonify(result), 200
         else:
             # Check if the role ID might be a partial string that matches a role in ROLE_MAPPING
             for key in ROLE_MAPPING:
@@ -936,6 +1545,7 @@ def get_role_name(role_id):
             
             return jsonify({'error': 'Role not found'}), 404
     except Exception as e:
+        schema_registry.invalidate_on_error(e)
         print(f"Error in get_role_name: {e}")
         return jsonify({'error': str(e)}), 500
 
@@ -982,6 +1592,7 @@ def allocate_role():
             additional_employee_id,
             additional_employee_name
         ))
+        count_allocation(cursor, allocated_date, role_id, 1)
         
         # Also update the employee's role in the employees table
         try:
@@ -998,6 +1609,7 @@ def allocate_role():
             # Continue even if this update fails - the allocation is still valid
         
         conn.commit()
+        refresh_reporting_lines(cursor, employee_id)
         cursor.close()
         conn.close()
         
@@ -1054,93 +1666,179 @@ def get_employee_role(employee_id):
         print(f"Error in get_employee_role: {e}")
         return jsonify({"error": str(e)}), 500
 
-    
-    
-@app.route('/get_role_hierarchy/<role_id>', methods=['GET'])
-def get_role_hierarchy(role_id):
+@app.route('/get_employee_roles', methods=['POST'])
+def get_employee_roles_bulk():
+    """
+    Latest role allocation for many employees in one call.
+
+    Expects {"employeeIds": [...]} and returns {"roles": {employee_id:
+    {"roleId", "roleName"}}, "notFound": [...]}. Employees without an
+    allocation get empty strings, as in /get_employee_role/<employee_id>.
+    """
     try:
+        data = request.get_json() or {}
+        employee_ids = data.get('employeeIds')
+        if not isinstance(employee_ids, list):
+            return jsonify({"error": "employeeIds must be a list"}), 400
+        
+        # Preserve order, drop duplicates and blanks
+        employee_ids = list(dict.fromkeys(str(eid) for eid in employee_ids if eid))
+        if not employee_ids:
+            return jsonify({"roles": {}, "notFound": []}), 200
+        
         conn = get_db_connection()
         if not conn:
             return jsonify({"error": "Database connection failed."}), 500
         
-        cursor = conn.cursor()
+        cursor = conn.cursor(dictionary=True)
+        roles = {}
         
-        # First check if the role exists in employee_roles
-        cursor.execute("SELECT role_id FROM employee_roles WHERE role_id = %s", (role_id,))
-        role = cursor.fetchone()
+        for i in range(0, len(employee_ids), BULK_LOOKUP_CHUNK_SIZE):
+            chunk = employee_ids[i:i + BULK_LOOKUP_CHUNK_SIZE]
+            placeholders = ', '.join(['%s'] * len(chunk))
+            cursor.execute(f"""
+                SELECT 
+                    e.employee_id,
+                    COALESCE(r.role_id, '') AS role_id,
+                    COALESCE(r.role_name, '') AS role_name
+                FROM employees e
+                LEFT JOIN (
+                    SELECT 
+                        employee_id, role_id, role_name,
+                        ROW_NUMBER() OVER (
+                            PARTITION BY employee_id
+                            ORDER BY allocated_date DESC, id DESC
+                        ) AS rn
+                    FROM employee_role_allocations
+                    WHERE employee_id IN ({placeholders})
+                ) r ON r.employee_id = e.employee_id AND r.rn = 1
+                WHERE e.employee_id IN ({placeholders})
+            """, chunk + chunk)
+            for row in cursor.fetchall():
+                roles[row['employee_id']] = {
+                    "roleId": row['role_id'],
+                    "roleName": row['role_name']
+                }
         
-        if not role:
-            cursor.close()
-            conn.close()
+        cursor.close()
+        conn.close()
+        
+        not_found = [eid for eid in employee_ids if eid not in roles]
+        return jsonify({"roles": roles, "notFound": not_found}), 200
+        
+    except Exception as e:
+        print(f"Error in get_employee_roles_bulk: {e}")
+        return jsonify({"error": str(e)}), 500
+
+    
+    
+@app.route('/get_role_hierarchy/<role_id>', methods=['GET'])
+def get_role_hierarchy(role_id):
+    try:
+        tree = role_tree.tree()
+        if role_id not in tree:
             return jsonify({"error": "Role not found"}), 404
         
-        # Check if role_hierarchy table exists and has the necessary structure
-        try:
-            cursor.execute("""
-                SELECT parent_role_id 
-                FROM role_hierarchy 
-                WHERE role_id = %s
-            """, (role_id,))
-            
-            hierarchy = cursor.fetchone()
-            
-            if hierarchy and hierarchy[0]:
-                parent_role_id = hierarchy[0]
-                
-                # Get the parent role name
-                cursor.execute("SHOW COLUMNS FROM employee_roles")
-                columns = cursor.fetchall()
-                column_names = [column[0] for column in columns]
-                
-                if 'role_description' in column_names:
-                    cursor.execute("SELECT role_description FROM employee_roles WHERE role_id = %s", (parent_role_id,))
-                    field_name = 'parentRoleName'
-                elif 'role_name' in column_names:
-                    cursor.execute("SELECT role_name FROM employee_roles WHERE role_id = %s", (parent_role_id,))
-                    field_name = 'parentRoleName'
-                else:
-                    field_name = 'parentRoleName'
-                    cursor.execute("SELECT role_id FROM employee_roles WHERE role_id = %s", (parent_role_id,))
-                
-                parent_role = cursor.fetchone()
-                
-                cursor.close()
-                conn.close()
-                
-                if parent_role:
-                    return jsonify({
-                        "parentRoleId": parent_role_id,
-                        field_name: parent_role[0]
-                    }), 200
-                else:
-                    return jsonify({
-                        "parentRoleId": parent_role_id,
-                        field_name: ""
-                    }), 200
-            else:
-                cursor.close()
-                conn.close()
-                return jsonify({
-                    "parentRoleId": "",
-                    "parentRoleName": ""
-                }), 200
-                
-        except Exception as table_error:
-            # If the role_hierarchy table doesn't exist or there's another issue,
-            # we'll return an empty response rather than an error
-            print(f"Warning in get_role_hierarchy: {table_error}")
-            cursor.close()
-            conn.close()
+        parent_role_id = tree.parent(role_id)
+        if parent_role_id:
             return jsonify({
-                "parentRoleId": "",
-                "parentRoleName": ""
+                "parentRoleId": parent_role_id,
+                "parentRoleName": tree.names.get(parent_role_id, "")
             }), 200
+        
+        return jsonify({
+            "parentRoleId": "",
+            "parentRoleName": ""
+        }), 200
             
     except Exception as e:
+        schema_registry.invalidate_on_error(e)
         print(f"Error in get_role_hierarchy: {e}")
         return jsonify({"error": str(e)}), 500
 
+# ================== ROLE TREE ==================
 
+def role_tree_or_error():
+    """The role tree, or (None, error response) when it cannot be loaded"""
+    try:
+        return role_tree.tree(), None
+    except Exception as e:
+        schema_registry.invalidate_on_error(e)
+        print(f"Error loading role tree: {e}")
+        return None, (jsonify({"error": str(e)}), 500)
+
+@app.route('/api/role-tree', methods=['GET'])
+def get_role_tree():
+    """The whole organisation tree, one nested node per root role"""
+    tree, error = role_tree_or_error()
+    if error:
+        return error
+    return jsonify({
+        "roleCount": len(tree),
+        "roots": [tree.nested(root) for root in tree.roots()]
+    }), 200
+
+@app.route('/api/role-tree/<role_id>', methods=['GET'])
+def get_role_tree_node(role_id):
+    """A role with its depth, full ancestor chain and sub-role counts"""
+    tree, error = role_tree_or_error()
+    if error:
+        return error
+    if role_id not in tree:
+        return jsonify({"error": "Role not found"}), 404
+    node = tree.node(role_id)
+    node.update({
+        "ancestors": [tree.node(ancestor) for ancestor in tree.ancestors[role_id]],
+        "childCount": len(tree.children.get(role_id, ())),
+        "descendantCount": len(tree.descendants(role_id))
+    })
+    return jsonify(node), 200
+
+@app.route('/api/role-tree/<role_id>/ancestors', methods=['GET'])
+def get_role_ancestors(role_id):
+    """Chain from the role's parent up to the root role"""
+    tree, error = role_tree_or_error()
+    if error:
+        return error
+    if role_id not in tree:
+        return jsonify({"error": "Role not found"}), 404
+    return jsonify({
+        "roleId": role_id,
+        "depth": tree.depth(role_id),
+        "ancestors": [tree.node(ancestor) for ancestor in tree.ancestors[role_id]]
+    }), 200
+
+@app.route('/api/role-tree/<role_id>/subtree', methods=['GET'])
+def get_role_subtree(role_id):
+    """
+    The role and everything below it, nested; ?flat=true lists the sub-roles
+    instead and ?depth=N stops N levels down.
+    """
+    tree, error = role_tree_or_error()
+    if error:
+        return error
+    if role_id not in tree:
+        return jsonify({"error": "Role not found"}), 404
+    try:
+        max_depth = int(request.args['depth']) if request.args.get('depth') else None
+    except ValueError:
+        return jsonify({"error": "depth must be a number"}), 400
+    if request.args.get('flat', '').lower() in ('1', 'true', 'yes'):
+        base = tree.depth(role_id)
+        roles = [tree.node(r) for r in tree.descendants(role_id)
+                 if max_depth is None or tree.depth(r) - base <= max_depth]
+        return jsonify({"roleId": role_id, "roles": roles}), 200
+    return jsonify(tree.nested(role_id, max_depth)), 200
+
+@app.route('/api/role-tree/reload', methods=['POST'])
+def reload_role_tree():
+    """Reload the role tree from the database, e.g. after editing roles by hand"""
+    try:
+        role_tree.reload()
+    except Exception as e:
+        schema_registry.invalidate_on_error(e)
+        return jsonify({"error": str(e)}), 500
+    return jsonify(role_tree.stats()), 200
 
 @app.route('/get_employee_status/<employee_id>', methods=['GET'])
 def get_employee_status(employee_id):
@@ -1342,7 +2040,11 @@ def save_client():
         )
         
         cursor.execute(insert_query, values)
+        update_search_index(cursor, 'client', client_id)
         conn.commit()
+        entity_ids.add('client', client_id)
+        client_cache.invalidate(('name', client_id))
+        report_cache.invalidate('client')
         
         return jsonify({
             'message': 'Client created successfully',
@@ -1360,6 +2062,9 @@ def save_client():
 @app.route('/get_client_name/<client_id>', methods=['GET'])
 def get_client_name(client_id):
     try:
+        cached = client_cache.get(('name', client_id))
+        if cached is not None:
+            return jsonify(cached), 200
         conn = get_db_connection()
         if not conn:
             return jsonify({"error": "Database connection failed"}), 500
@@ -1370,6 +2075,7 @@ def get_client_name(client_id):
         cursor.close()
         conn.close()
         if result:
+            client_cache.set(('name', client_id), result)
             return jsonify(result), 200
         else:
             return jsonify({"error": "Client not found"}), 404
@@ -1379,6 +2085,9 @@ def get_client_name(client_id):
 @app.route('/get_product_name/<product_id>', methods=['GET'])
 def get_product_name(product_id):
     try:
+        cached = product_cache.get(('name', product_id))
+        if cached is not None:
+            return jsonify(cached), 200
         conn = get_db_connection()
         if not conn:
             return jsonify({"error": "Database connection failed"}), 500
@@ -1389,6 +2098,7 @@ def get_product_name(product_id):
         cursor.close()
         conn.close()
         if result:
+            product_cache.set(('name', product_id), result)
             return jsonify(result), 200
         else:
             return jsonify({"error": "Product not found"}), 404
@@ -1449,7 +2159,10 @@ def save_project():
         )
         
         cursor.execute(insert_query, values)
+        update_search_index(cursor, 'project', project_id)
         conn.commit()
+        entity_ids.add('project', project_id)
+        report_cache.invalidate('project')
         
         return jsonify({
             'message': 'Project created successfully',
@@ -1473,6 +2186,31 @@ def save_project():
             cursor.close()
             conn.close()
 
+# Format date_joined as DD-MM-YYYY for the employee list views
+def format_date_joined(employees):
+    for employee in employees:
+        if employee.get('date_joined'):
+            try:
+                if isinstance(employee['date_joined'], date) and not isinstance(employee['date_joined'], datetime):
+                    employee['date_joined'] = employee['date_joined'].strftime('%d-%m-%Y')
+                elif isinstance(employee['date_joined'], str):
+                    # If it's a string, parse it and then format
+                    date_obj = datetime.strptime(employee['date_joined'], '%Y-%m-%d')
+                    employee['date_joined'] = date_obj.strftime('%d-%m-%Y')
+            except (ValueError, TypeError):
+                pass
+    return employees
+
+EMPLOYEE_LIST_SPEC = ListSpec({
+    'employee_id': 'employee_id',
+    'employee_name': "CONCAT(first_name, ' ', last_name)",
+    'profile_photo': 'profile_pic',
+    'date_joined': 'doj',
+    'email': 'email',
+    'phone': 'mobile',
+    'role_name': 'role_name'
+}, primary_key='employee_id')
+
 @app.route('/api/employees', methods=['GET'])
 def get_employees():
     try:
@@ -1482,36 +2220,17 @@ def get_employees():
         cursor = conn.cursor(dictionary=True)
         
         # Fetch employees with their role names
-        cursor.execute("""
-            SELECT 
-                employee_id, 
-                CONCAT(first_name, ' ', last_name) AS employee_name, 
-                profile_pic AS profile_photo, 
-                doj AS date_joined, 
-                email, 
-                mobile AS phone,
-                role_name
-            FROM employees
-        """)
-        
-        employees = cursor.fetchall()
+        employees, page = run_list_query(cursor, EMPLOYEE_LIST_SPEC, request.args, "FROM employees")
         cursor.close()
         conn.close()
         
-        # Format date_joined if it's a valid date string
-        for employee in employees:
-            if employee['date_joined']:
-                try:
-                    if isinstance(employee['date_joined'], date) and not isinstance(employee['date_joined'], datetime):
-                        employee['date_joined'] = employee['date_joined'].strftime('%d-%m-%Y')
-                    elif isinstance(employee['date_joined'], str):
-                        # If it's a string, parse it and then format
-                        date_obj = datetime.strptime(employee['date_joined'], '%Y-%m-%d')
-                        employee['date_joined'] = date_obj.strftime('%d-%m-%Y')
-                except (ValueError, TypeError):
-                    pass
+        format_date_joined(employees)
+        add_profile_thumbnails(employees)
                     
-        return jsonify(employees)
+        return jsonify(employees), 200, page_headers(page)
+        
+    except PaginationError as e:
+        return jsonify({"error": str(e)}), 400
         
     except mysql.connector.Error as e:
         print(f"Database error: {e}")
@@ -1521,17 +2240,69 @@ def get_employees():
         print(f"An error occurred: {e}")
         return jsonify({"error": f"An error occurred: {str(e)}"}), 500
 
-@app.route('/api/roles', methods=['GET'])
-def get_roles():
+EMPLOYEE_WITH_ROLES_LIST_SPEC = ListSpec({
+    'employee_id': 'e.employee_id',
+    'employee_name': "CONCAT(e.first_name, ' ', e.last_name)",
+    'profile_photo': 'e.profile_pic',
+    'date_joined': 'e.doj',
+    'email': 'e.email',
+    'phone': 'e.mobile',
+    'role_id': "COALESCE(r.role_id, '')",
+    'role_name': "COALESCE(r.role_name, '')"
+}, primary_key='employee_id')
+
+@app.route('/api/employees/with-roles', methods=['GET'])
+def get_employees_with_roles():
+    """
+    Employee list with each employee's latest role allocation attached.
+
+    Replaces one /get_employee_role/<id> call per employee with a single
+    query; role_name is the latest allocated role, or "" when the employee
+    has no allocation (same as /get_employee_role).
+    """
     try:
         conn = get_db_connection()
         if not conn:
             return jsonify({"error": "Database connection failed"}), 500
         cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT role_id, role_name FROM employee_roles")
-        roles = cursor.fetchall()
+        
+        employees, page = run_list_query(
+            cursor, EMPLOYEE_WITH_ROLES_LIST_SPEC, request.args,
+            f"FROM employees e LEFT JOIN ({LATEST_ROLE_ALLOCATION_QUERY}) r ON r.employee_id = e.employee_id"
+        )
         cursor.close()
         conn.close()
+        
+        format_date_joined(employees)
+        add_profile_thumbnails(employees)
+        
+        return jsonify(employees), 200, page_headers(page)
+        
+    except PaginationError as e:
+        return jsonify({"error": str(e)}), 400
+        
+    except mysql.connector.Error as e:
+        print(f"Database error: {e}")
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+        
+    except Exception as e:
+        print(f"An error occurred: {e}")
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+
+@app.route('/api/roles', methods=['GET'])
+def get_roles():
+    try:
+        roles = role_cache.get('roles')
+        if roles is None:
+            conn = get_db_connection()
+            if not conn:
+                return jsonify({"error": "Database connection failed"}), 500
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute("SELECT role_id, role_name FROM employee_roles")
+            roles = cursor.fetchall()
+            cursor.close()
+            conn.close()
+            role_cache.set('roles', roles)
         return jsonify(roles)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -1577,8 +2348,11 @@ def delete_employee(employee_id):
         
         # Now we can safely delete the employee
         cursor.execute("DELETE FROM employees WHERE employee_id = %s", (employee_id,))
+        update_search_index(cursor, 'employee', employee_id)
         conn.commit()
+        entity_ids.discard('employee', employee_id)
         conn.close()
+        employee_name_cache.invalidate(employee_id)
         
         return jsonify({'message': 'Employee deleted successfully'}), 200
     except Exception as e:
@@ -1589,8 +2363,63 @@ def delete_employee(employee_id):
             'message': 'This employee may have dependencies in the system. Please check if they have role allocations, tasks, or timesheets.'
         }), 400
     
+# employees column -> field name returned by GET /api/employees/<id>
+EMPLOYEE_DETAIL_ALIASES = {
+    'first_name': 'first_name',
+    'last_name': 'last_name',
+    'employee_id': 'employee_id',
+    'profile_pic': 'profile_photo',
+    'role_name': 'roleName',
+    'father_name': 'fatherName',
+    'mother_name': 'motherName',
+    'marital_status': 'maritalStatus',
+    'spouse_name': 'spouseName',
+    'permanent_address': 'permanentAddress',
+    'communication_address': 'communicationAddress',
+    'emergency_contact_person': 'emergencyContactPerson',
+    'emergency_name': 'emergencyName',
+    'emergency_contact_no': 'emergencyMobile',
+    'emergency_mobile': 'emergencyMobile',
+    'emergency_relationship': 'emergencyRelationship',
+    'alt_mobile': 'altMobile',
+    'joining_location': 'joiningLocation',
+    'doj': 'doj',
+    'email': 'email',
+    'mobile': 'mobile',
+    'gender': 'gender',
+    'dob': 'dob',
+    'nationality': 'nationality',
+    'qualification': 'qualification',
+    'created_at': 'created_at'
+}
+
+# Build the employee detail query from the columns that actually exist
+def build_employee_detail_query(registry):
+    column_names = registry.columns('employees')
+    select_parts = ["employee_id"]  # Always include employee_id
+    
+    # Add CONCAT for name if both first_name and last_name exist
+    if 'first_name' in column_names and 'last_name' in column_names:
+        select_parts.append("CONCAT(first_name, ' ', last_name) AS name")
+    
+    # Add other columns if they exist in the table
+    for db_col, api_col in EMPLOYEE_DETAIL_ALIASES.items():
+        if db_col in column_names and db_col != 'employee_id':  # employee_id already added
+            if db_col == api_col:
+                select_parts.append(db_col)
+            else:
+                select_parts.append(f"{db_col} AS {api_col}")
+    
+    return f"""
+        SELECT 
+            {', '.join(select_parts)}
+        FROM employees
+        WHERE employee_id = %s
+    """
+
 @app.route('/api/employees/<employee_id>', methods=['GET'])
 def get_employee_by_id(employee_id):
+    employee_id = canonical_id('employee', employee_id)
     try:
         print(f"Fetching employee with ID: {employee_id}")
         conn = get_db_connection()
@@ -1599,67 +2428,8 @@ def get_employee_by_id(employee_id):
         
         cursor = conn.cursor(dictionary=True)
         
-        # First, check the table structure - helps with debugging
-        print("Checking employees table structure...")
-        cursor.execute("DESCRIBE employees")
-        columns = cursor.fetchall()
-        column_names = [col['Field'] for col in columns]
-        print(f"Available columns: {column_names}")
-        
-        # Build a dynamic query based on columns that actually exist
-        existing_columns = []
-        alias_mapping = {
-            'first_name': 'first_name',
-            'last_name': 'last_name',
-            'employee_id': 'employee_id',
-            'profile_pic': 'profile_photo',
-            'role_name': 'roleName',
-            'father_name': 'fatherName',
-            'mother_name': 'motherName',
-            'marital_status': 'maritalStatus',
-            'spouse_name': 'spouseName',
-            'permanent_address': 'permanentAddress',
-            'communication_address': 'communicationAddress',
-            'emergency_contact_person': 'emergencyContactPerson',
-            'emergency_name': 'emergencyName',
-            'emergency_contact_no': 'emergencyMobile',
-            'emergency_mobile': 'emergencyMobile',
-            'emergency_relationship': 'emergencyRelationship',
-            'alt_mobile': 'altMobile',
-            'joining_location': 'joiningLocation',
-            'doj': 'doj',
-            'email': 'email',
-            'mobile': 'mobile',
-            'gender': 'gender',
-            'dob': 'dob',
-            'nationality': 'nationality',
-            'qualification': 'qualification',
-            'created_at': 'created_at'
-        }
-        
-        select_parts = ["employee_id"]  # Always include employee_id
-        
-        # Add CONCAT for name if both first_name and last_name exist
-        if 'first_name' in column_names and 'last_name' in column_names:
-            select_parts.append("CONCAT(first_name, ' ', last_name) AS name")
-        
-        # Add other columns if they exist in the table
-        for db_col, api_col in alias_mapping.items():
-            if db_col in column_names and db_col != 'employee_id':  # employee_id already added
-                if db_col == api_col:
-                    select_parts.append(db_col)
-                else:
-                    select_parts.append(f"{db_col} AS {api_col}")
-        
-        # Build the final query
-        query = f"""
-            SELECT 
-                {', '.join(select_parts)}
-            FROM employees
-            WHERE employee_id = %s
-        """
-        
-        print(f"Executing query: {query}")
+        # Query is built once from the cached employees columns
+        query = schema_registry.compiled('employee_detail', build_employee_detail_query)
         cursor.execute(query, (employee_id,))
         employee = cursor.fetchone()
         
@@ -1721,6 +2491,7 @@ def get_employee_by_id(employee_id):
         for field in expected_fields:
             if field not in employee:
                 employee[field] = ""
+        employee['profile_variants'] = profile_image_variants(employee.get('profile_photo'))
             
         print(f"Successfully fetched employee data for ID: {employee_id}")
         cursor.close()
@@ -1729,6 +2500,7 @@ def get_employee_by_id(employee_id):
         return jsonify(employee)
         
     except Exception as e:
+        schema_registry.invalidate_on_error(e)
         print(f"Error retrieving employee {employee_id}: {str(e)}")
         
         # Return detailed error information in debug mode
@@ -1741,6 +2513,7 @@ def get_employee_by_id(employee_id):
 
 @app.route('/api/product-details/<product_id>', methods=['GET'])
 def product_details(product_id):
+    product_id = canonical_id('product', product_id)
     try:
         # Get database connection
         conn = get_db_connection()
@@ -1881,7 +2654,11 @@ def update_product(product_id):
         )
         
         cursor.execute(update_query, values)
+        update_search_index(cursor, 'product', product_id)
         conn.commit()
+        entity_ids.add('product', product_id)
+        product_cache.invalidate(('name', product_id))
+        report_cache.invalidate('product')
         
         cursor.close()
         conn.close()
@@ -1908,12 +2685,14 @@ def get_product_report():
         cursor = connection.cursor()
         
         if product_id:
-            query = """
+            # Partial IDs are matched in the ID index, then fetched by key
+            condition, params = id_filter('product', 'product_id', product_id, limit=1000)
+            query = f"""
             SELECT product_id, product_name, date_of_product, product_status
             FROM products
-            WHERE product_id LIKE %s
+            WHERE {condition}
             """
-            cursor.execute(query, (f"%{product_id}%",))
+            cursor.execute(query, params)
         else:
             query = """
             SELECT product_id, product_name, date_of_product, product_status
@@ -1945,12 +2724,14 @@ def get_client_report():
         cursor = connection.cursor()
         
         if client_id:
-            query = """
+            # Partial IDs are matched in the ID index, then fetched by key
+            condition, params = id_filter('client', 'client_id', client_id, limit=1000)
+            query = f"""
             SELECT client_id, client_name, client_address, communication_email, contact_mobile
             FROM clients
-            WHERE client_id LIKE %s
+            WHERE {condition}
             """
-            cursor.execute(query, (f"%{client_id}%",))
+            cursor.execute(query, params)
         else:
             query = """
             SELECT client_id, client_name, client_address, communication_email, contact_mobile
@@ -1983,12 +2764,14 @@ def get_project_report():
         cursor = connection.cursor()
         
         if project_id:
-            query = """
+            # Partial IDs are matched in the ID index, then fetched by key
+            condition, params = id_filter('project', 'project_id', project_id, limit=1000)
+            query = f"""
             SELECT project_id, project_name, description, release_date, committed_date, estimated_cost
             FROM projects
-            WHERE project_id LIKE %s
+            WHERE {condition}
             """
-            cursor.execute(query, (f"%{project_id}%",))
+            cursor.execute(query, params)
         else:
             query = """
             SELECT project_id, project_name, description, release_date, committed_date, estimated_cost
@@ -2066,6 +2849,7 @@ def check_schema():
             
 @app.route('/api/product/<product_id>', methods=['GET'])
 def get_product_detail(product_id):
+    product_id = canonical_id('product', product_id)
     connection = get_db_connection()
     if connection is None:
         return jsonify({"error": "Database connection failed"}), 500
@@ -2095,6 +2879,7 @@ def get_product_detail(product_id):
             
 @app.route('/api/client/<client_id>', methods=['GET'])
 def get_client_detail(client_id):
+    client_id = canonical_id('client', client_id)
     connection = get_db_connection()
     if connection is None:
         return jsonify({"error": "Database connection failed"}), 500
@@ -2126,6 +2911,7 @@ def get_client_detail(client_id):
 # Project detail endpoint (for View button)
 @app.route('/api/project/<project_id>', methods=['GET'])
 def get_project_detail(project_id):
+    project_id = canonical_id('project', project_id)
     connection = get_db_connection()
     if connection is None:
         return jsonify({"error": "Database connection failed"}), 500
@@ -2153,7 +2939,15 @@ def get_project_detail(project_id):
             cursor.close()
             connection.close()
             
-@app.route('/projects', methods=['GET'])
+PROJECT_LIST_SPEC = ListSpec({
+    field: field for field in (
+        'project_id', 'project_name', 'project_client_id', 'client_name',
+        'product_id', 'product_name', 'managed_by', 'estimated_cost', 'completion_days',
+        'release_date', 'committed_date', 'description'
+    )
+}, primary_key='project_id')
+
+@app.route('/projects', methods=['GET'])
 def get_all_projects():
     try:
         conn = get_db_connection()
@@ -2161,16 +2955,13 @@ def get_all_projects():
             return jsonify({"error": "Database connection failed"}), 500
 
         cursor = conn.cursor(dictionary=True)
-        query = """SELECT project_id, project_name, project_client_id, client_name, 
-                  product_id, product_name, managed_by, estimated_cost, completion_days, 
-                  release_date, committed_date, description
-                  FROM projects"""
-        cursor.execute(query)
-        projects = cursor.fetchall()
+        projects, page = run_list_query(cursor, PROJECT_LIST_SPEC, request.args, "FROM projects")
 
         formatted_projects = [format_dates(project) for project in projects]
-        return jsonify(formatted_projects), 200
+        return jsonify(formatted_projects), 200, page_headers(page)
 
+    except PaginationError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     finally:
@@ -2178,10 +2969,38 @@ def get_all_projects():
             cursor.close()
         if 'conn' in locals() and conn.is_connected():
             conn.close()
+# Download log rows are buffered in memory and inserted in batches by a
+# background thread, so downloads never wait on the log INSERT. Rows show up
+# in download_logs within DOWNLOAD_LOG_FLUSH_INTERVAL seconds.
+DOWNLOAD_LOG_INSERT = """
+    INSERT INTO download_logs (
+        user_id, report_type, entity_id, download_format, 
+        ip_address, download_date, filter_params, record_count
+    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+def apply_download_log_rollups(cursor, rows):
+    """Count a batch of DOWNLOAD_LOG_INSERT rows into the download stats rollups"""
+    apply_download_events(cursor, [
+        (download_date, report_type, download_format, entity_id, 1, record_count or 0)
+        for _, report_type, entity_id, download_format, _, download_date, _, record_count in rows
+    ])
+
+download_log_writer = BufferedLogWriter(
+    get_db_connection,
+    DOWNLOAD_LOG_INSERT,
+    max_queue=int(os.environ.get('DOWNLOAD_LOG_QUEUE_SIZE', 10000)),
+    batch_size=int(os.environ.get('DOWNLOAD_LOG_BATCH_SIZE', 200)),
+    flush_interval=float(os.environ.get('DOWNLOAD_LOG_FLUSH_INTERVAL', 2)),
+    on_flush=apply_download_log_rollups,
+    name='download-log-writer'
+)
+atexit.register(download_log_writer.close)
+
 # Function to log downloads in the database
 def log_download(report_type, entity_id, download_format, record_count, filter_params=None):
     """
-    Log download activity to the database
+    Queue a download log row for the background writer
     
     Args:
         report_type (str): Type of report ('project', 'product', 'client')
@@ -2189,15 +3008,11 @@ def log_download(report_type, entity_id, download_format, record_count, filter_p
         download_format (str): Format of the download ('csv', 'pdf')
         record_count (int): Number of records in the report
         filter_params (dict, optional): Dictionary of filter parameters
+        
+    Returns:
+        bool: False if the row was dropped because the log buffer is full
     """
     try:
-        conn = get_db_connection()
-        if not conn:
-            print("Failed to connect to database for logging download")
-            return False
-            
-        cursor = conn.cursor()
-        
         # Get user information
         user_id = request.args.get('userId', None)  # Assuming userId might be passed as a parameter
         ip_address = request.remote_addr
@@ -2205,15 +3020,7 @@ def log_download(report_type, entity_id, download_format, record_count, filter_p
         # Convert filter params to JSON string if provided
         filter_json = json.dumps(filter_params) if filter_params else None
         
-        # Insert download log
-        insert_query = """
-            INSERT INTO download_logs (
-                user_id, report_type, entity_id, download_format, 
-                ip_address, download_date, filter_params, record_count
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-        """
-        
-        values = (
+        return download_log_writer.write((
             user_id,
             report_type,
             entity_id,
@@ -2222,242 +3029,137 @@ def log_download(report_type, entity_id, download_format, record_count, filter_p
             datetime.now(),
             filter_json,
             record_count
-        )
-        
-        cursor.execute(insert_query, values)
-        conn.commit()
-        
-        return True
+        ))
         
     except Exception as e:
         print(f"Error logging download: {str(e)}")
         return False
-        
-    finally:
-        if 'conn' in locals() and conn.is_connected():
-            cursor.close()
-            conn.close()
 
-@app.route('/api/download-project-report/<format>', methods=['GET'])
-def download_project_report(format):
-    project_id = request.args.get('projectId', '')
-    filter_params = {
-        'projectId': project_id
-    }
-    
-    print(f"Downloading project report in {format} format with projectId: '{project_id}'")
-    
-    conn = get_db_connection()
-    if conn is None:
-        print("Database connection failed when downloading project report")
-        return jsonify({"error": "Database connection failed"}), 500
-    
-    try:
-        cursor = conn.cursor(dictionary=True)
-        
-        # Debug: Get all project IDs to see what's available
-        cursor.execute("SELECT project_id FROM projects LIMIT 10")
-        available_projects = cursor.fetchall()
-        print(f"Available project IDs: {[p['project_id'] for p in available_projects]}")
-        
-        if project_id:
-            print(f"Trying both exact and partial matches for project ID: {project_id}")
-            projects = None
-            
-            # Try exact match first
-            query = """
-            SELECT project_id, project_name, project_client_id, client_name, product_id, 
-                  product_name, managed_by, estimated_cost, completion_days, 
-                  release_date, committed_date, description
-            FROM projects
-            WHERE project_id = %s
-            """
-            cursor.execute(query, (project_id,))
-            projects = cursor.fetchall()
-            
-            # If no exact match found, try LIKE match
-            if not projects:
-                print(f"No exact match found, trying LIKE match for: {project_id}")
-                query = """
-                SELECT project_id, project_name, project_client_id, client_name, product_id, 
-                      product_name, managed_by, estimated_cost, completion_days, 
-                      release_date, committed_date, description
-                FROM projects
-                WHERE project_id LIKE %s
-                """
-                cursor.execute(query, (f"%{project_id}%",))
-                projects = cursor.fetchall()
-            
-            # If P format is provided but database uses PRO format
-            if not projects and project_id.startswith('P'):
-                potential_pro_id = 'PRO' + project_id[1:]
-                print(f"Trying PRO format: {potential_pro_id}")
-                query = """
-                SELECT project_id, project_name, project_client_id, client_name, product_id, 
-                      product_name, managed_by, estimated_cost, completion_days, 
-                      release_date, committed_date, description
-                FROM projects
-                WHERE project_id = %s OR project_id LIKE %s
-                """
-                cursor.execute(query, (potential_pro_id, f"%{project_id}%"))
-                projects = cursor.fetchall()
-            
-            # If still no match, try number matching
-            if not projects and any(c.isdigit() for c in project_id):
-                # Extract digits from project_id
-                digits = ''.join(c for c in project_id if c.isdigit())
-                print(f"Trying to match by number part: {digits}")
-                query = """
-                SELECT project_id, project_name, project_client_id, client_name, product_id, 
-                      product_name, managed_by, estimated_cost, completion_days, 
-                      release_date, committed_date, description
-                FROM projects
-                WHERE project_id LIKE %s OR project_id LIKE %s
-                """
-                cursor.execute(query, (f"%{digits}%", f"%{project_id}%"))
-                projects = cursor.fetchall()
-                
-        else:
-            print("Fetching all projects")
-            query = """
-            SELECT project_id, project_name, project_client_id, client_name, product_id, 
+@app.route('/api/download-logs/writer-stats', methods=['GET'])
+def get_download_log_writer_stats():
+    """Buffered download log writer counters (buffered, written, dropped, failed)"""
+    return jsonify(download_log_writer.stats())
+
+@app.route('/api/download-logs/flush', methods=['POST'])
+def flush_download_logs():
+    """Write buffered download log rows now, e.g. before reading fresh stats"""
+    flushed = download_log_writer.flush()
+    return jsonify({"flushed": flushed, "stats": download_log_writer.stats()}), 200 if flushed else 503
+
+# Column lists shared by the buffered (PDF) and streaming (CSV) report paths
+PROJECT_REPORT_COLUMNS = """project_id, project_name, project_client_id, client_name, product_id, 
                   product_name, managed_by, estimated_cost, completion_days, 
-                  release_date, committed_date, description
-            FROM projects
-            LIMIT 1000
-            """
-            cursor.execute(query)
-            projects = cursor.fetchall()
-        
-        print(f"Found {len(projects)} projects for report")
-        if projects:
-            print(f"Project IDs found: {[p['project_id'] for p in projects]}")
-        
-        # If no projects found, return an error
-        if not projects:
-            print("No projects found with the given criteria")
-            return jsonify({"error": "No projects found with the given criteria"}), 404
-        
-        # Format dates for display
-        formatted_projects = []
-        for project in projects:
-            formatted_project = {}
-            for key, value in project.items():
-                if isinstance(value, datetime):
-                    formatted_project[key] = value.strftime('%Y-%m-%d')
-                else:
-                    formatted_project[key] = value
-            formatted_projects.append(formatted_project)
-        
-        # Log download
-        log_download(
-            report_type='project',
-            entity_id=project_id if project_id else None,
-            download_format=format.lower(),
-            record_count=len(formatted_projects),
-            filter_params=filter_params
-        )
-        
-        # Generate and return report
-        if format.lower() == 'csv':
-            print("Generating CSV report")
-            return generate_csv_report(formatted_projects, 'project_report')
-        elif format.lower() == 'pdf':
-            print("Generating PDF report")
-            return generate_pdf_report(formatted_projects, 'Project Report')
-        else:
-            print(f"Invalid format requested: {format}")
-            return jsonify({"error": "Invalid format. Use 'csv' or 'pdf'"}), 400
-            
-    except Exception as e:
-        print(f"Error in download_project_report: {str(e)}")
-        traceback.print_exc()
-        return jsonify({"error": str(e)}), 500
-    finally:
-        if conn.is_connected():
-            cursor.close()
-            conn.close()
-            print("Database connection closed")
+                  release_date, committed_date, description"""
+PRODUCT_REPORT_COLUMNS = """product_id, product_name, date_of_product, product_status,
+                  product_description, product_technical, product_specification, product_framework"""
+CLIENT_REPORT_COLUMNS = """client_id, client_name, client_description, client_address, 
+                  communication_email, contact_name, contact_designation,
+                  contact_mobile, contact_email, reporting_to"""
+
+# Report definitions shared by the download routes and background report jobs
+REPORT_SOURCES = {
+    'project': {'table': 'projects', 'key': 'project_id', 'columns': PROJECT_REPORT_COLUMNS,
+                'title': 'Project Report', 'prefix': 'project_report', 'filter': 'projectId'},
+    'product': {'table': 'products', 'key': 'product_id', 'columns': PRODUCT_REPORT_COLUMNS,
+                'title': 'Product Report', 'prefix': 'product_report', 'filter': 'productId'},
+    'client': {'table': 'clients', 'key': 'client_id', 'columns': CLIENT_REPORT_COLUMNS,
+               'title': 'Client Report', 'prefix': 'client_report', 'filter': 'clientId'},
+}
 
-@app.route('/api/download-product-report/<format>', methods=['GET'])
-def download_product_report(format):
-    product_id = request.args.get('productId', '')
-    filter_params = {
-        'productId': product_id
-    }
-    
-    print(f"Downloading product report in {format} format with productId: '{product_id}'")
-    
-    conn = get_db_connection()
-    if conn is None:
-        print("Database connection failed when downloading product report")
+# Buffered (PDF) reports over a whole table are capped at this many rows
+REPORT_ROW_LIMIT = 1000
+
+def find_project_rows(cursor, project_id):
+    """
+    Project report rows for a user-typed ID ('PRO123', 'P123', '123', ...).
+
+    The ID index ranks exact, P->PRO, number and partial matches; only the
+    best-ranked IDs are fetched, by primary key.
+    """
+    project_ids = candidate_ids('project', project_id)
+    if project_ids is None:
+        cursor.execute(f"SELECT {PROJECT_REPORT_COLUMNS} FROM projects WHERE project_id = %s", (project_id,))
+        return cursor.fetchall()
+    if not project_ids:
+        print(f"No project matches ID: {project_id}")
+        return []
+    project_ids = project_ids[:REPORT_ROW_LIMIT]
+    placeholders = ', '.join(['%s'] * len(project_ids))
+    cursor.execute(f"SELECT {PROJECT_REPORT_COLUMNS} FROM projects WHERE project_id IN ({placeholders})",
+                   project_ids)
+    return cursor.fetchall()
+
+def fetch_report_rows(cursor, report_type, entity_id=None):
+    """Rows for a project/product/client report, one entity or up to REPORT_ROW_LIMIT"""
+    source = REPORT_SOURCES[report_type]
+    if entity_id and report_type == 'project':
+        return find_project_rows(cursor, entity_id)
+    if entity_id:
+        cursor.execute(f"SELECT {source['columns']} FROM {source['table']} WHERE {source['key']} = %s",
+                       (entity_id,))
+    else:
+        cursor.execute(f"SELECT {source['columns']} FROM {source['table']} LIMIT %s", (REPORT_ROW_LIMIT,))
+    return cursor.fetchall()
+
+def fetch_item_rows(cursor, report_type, item_id):
+    """Every column of a single project/product/client, as /api/<type>-download/<id> returns"""
+    source = REPORT_SOURCES[report_type]
+    cursor.execute(f"SELECT * FROM {source['table']} WHERE {source['key']} = %s", (item_id,))
+    return cursor.fetchall()
+
+def format_report_rows(rows):
+    """Format datetimes as dates for display in CSV/PDF reports"""
+    formatted_rows = []
+    for row in rows:
+        formatted_row = {}
+        for key, value in row.items():
+            if isinstance(value, datetime):
+                formatted_row[key] = value.strftime('%Y-%m-%d')
+            else:
+                formatted_row[key] = value
+        formatted_rows.append(formatted_row)
+    return formatted_rows
+
+def stream_report_csv(report_type, query, params, filename_prefix, entity_id, filter_params):
+    """
+    Stream a CSV report straight from the database without a row limit.
+
+    Uses its own pooled connection because the unbuffered cursor stays open
+    after the view returns. The download is logged once the stream finishes,
+    with the actual number of rows sent.
+    """
+    try:
+        conn = db_pool.checkout()
+    except Error as e:
+        print(f"Database connection failed when streaming {report_type} report: {e}")
         return jsonify({"error": "Database connection failed"}), 500
     
-    try:
-        cursor = conn.cursor(dictionary=True)
-        
-        if product_id:
-            print(f"Fetching specific product with ID: {product_id}")
-            query = """
-            SELECT product_id, product_name, date_of_product, product_status,
-                  product_description, product_technical, product_specification, product_framework
-            FROM products
-            WHERE product_id = %s
-            """
-            cursor.execute(query, (product_id,))
-        else:
-            print("Fetching all products (up to 1000 records)")
-            query = """
-            SELECT product_id, product_name, date_of_product, product_status,
-                  product_description, product_technical, product_specification, product_framework
-            FROM products
-            LIMIT 1000
-            """
-            cursor.execute(query)
-        
-        # Use dictionary cursor to get products
-        products = cursor.fetchall()
-        print(f"Found {len(products)} products for report")
-        if products:
-            print(f"Product IDs sample: {[p['product_id'] for p in products[:5]]}")
-        
-        # If no products found, return an error
-        if not products:
-            return jsonify({"error": "No products found with the given criteria"}), 404
-        
-        # Format dates for display
-        formatted_products = []
-        for product in products:
-            formatted_product = {}
-            for key, value in product.items():
-                if isinstance(value, datetime):
-                    formatted_product[key] = value.strftime('%Y-%m-%d')
-                else:
-                    formatted_product[key] = value
-            formatted_products.append(formatted_product)
-        
+    def log_completed(count):
         log_download(
-            report_type='product',
-            entity_id=product_id if product_id else None,
-            download_format=format.lower(),
-            record_count=len(formatted_products),
+            report_type=report_type,
+            entity_id=entity_id,
+            download_format='csv',
+            record_count=count,
             filter_params=filter_params
         )
-        
-        if format.lower() == 'csv':
-            return generate_csv_report(formatted_products, 'product_report')
-        elif format.lower() == 'pdf':
-            return generate_pdf_report(formatted_products, 'Product Report')
-        else:
-            return jsonify({"error": "Invalid format. Use 'csv' or 'pdf'"}), 400
-            
+    
+    try:
+        response = stream_csv_response(conn, query, params, filename_prefix, on_complete=log_completed)
     except Exception as e:
+        print(f"Error streaming {report_type} report: {str(e)}")
         return jsonify({"error": str(e)}), 500
-    finally:
-        if conn.is_connected():
-            cursor.close()
-            conn.close()
-
+    
+    if response is None:
+        return jsonify({"error": f"No {report_type}s found with the given criteria"}), 404
+    return response
+
+# Rendered reports are cached on disk per (type, filters, format, data
+# version); project/product/client writes invalidate their report type.
+report_cache = ReportArtifactCache(
+    directory=os.environ.get('REPORT_CACHE_DIR'),
+    max_bytes=int(float(os.environ.get('REPORT_CACHE_MAX_MB', 256)) * 1024 * 1024),
+    ttl=float(os.environ.get('REPORT_CACHE_TTL', 600))
+)
 
 def generate_csv_report(data, filename_prefix):
     if not data:
@@ -2465,20 +3167,8 @@ def generate_csv_report(data, filename_prefix):
         return jsonify({"error": "No data to export"}), 404
     
     try:
-        # Make sure we're using StringIO from io module
-        output = StringIO()
-        writer = csv.writer(output)
-        
-        # Get the headers from the first item
-        headers = list(data[0].keys())
-        writer.writerow(headers)
-        
-        # Write the data rows
-        for row in data:
-            writer.writerow([row.get(header, '') for header in headers])
-        
         # Create response
-        response = make_response(output.getvalue())
+        response = make_response(build_csv_content(data))
         timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
         response.headers["Content-Disposition"] = f"attachment; filename={filename_prefix}_{timestamp}.csv"
         response.headers["Content-Type"] = "text/csv; charset=utf-8"
@@ -2488,9 +3178,169 @@ def generate_csv_report(data, filename_prefix):
         logger.error(f"CSV generation error: {str(e)}")
         logger.error(traceback.format_exc())
         return jsonify({"error": f"Failed to generate CSV: {str(e)}"}), 500
+
+def render_report_content(report_type, download_format, rows, source='report', entity_id=None,
+                          render_pdf=render_table_pdf):
+    """
+    Render formatted report rows.
+
+    Returns:
+        tuple: (content bytes, download file name, mimetype)
+    """
+    if source == 'item':
+        prefix = f"{report_type}_{entity_id}"
+        title = f"{report_type.capitalize()} Report"
+    else:
+        prefix = REPORT_SOURCES[report_type]['prefix']
+        title = REPORT_SOURCES[report_type]['title']
+
+    if download_format == 'pdf':
+        return render_pdf(rows, title), f"{title.replace(' ', '_')}.pdf", 'application/pdf'
+    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+    return build_csv_content(rows).encode('utf-8'), f"{prefix}_{timestamp}.csv", 'text/csv; charset=utf-8'
+
+def get_cached_report(report_type, download_format, entity_id=None, source='report',
+                      render_pdf=render_table_pdf):
+    """
+    Return the cached artifact for a report, rendering and caching it on a miss.
+
+    Returns:
+        tuple: (CachedReport or None if no rows matched, cache hit flag)
+    """
+    # 'P123' and 'PRO123' share one cache entry
+    if entity_id:
+        entity_id = canonical_id(report_type, entity_id)
+    # Key is taken before reading so a write during rendering leaves the
+    # result under the old data version
+    key = report_cache.make_key(report_type, {'entityId': entity_id or None, 'source': source}, download_format)
+    entry = report_cache.get(key)
+    if entry is not None:
+        return entry, True
+
+    conn = get_db_connection()
+    if conn is None:
+        raise ReportJobError("Database connection failed")
+    try:
+        cursor = conn.cursor(dictionary=True)
+        if source == 'item':
+            rows = fetch_item_rows(cursor, report_type, entity_id)
+        else:
+            rows = fetch_report_rows(cursor, report_type, entity_id)
+        cursor.close()
+    finally:
+        conn.close()
+
+    if not rows:
+        return None, False
+    content, filename, mimetype = render_report_content(
+        report_type, download_format, format_report_rows(rows), source, entity_id, render_pdf
+    )
+    return report_cache.put(key, report_type, content, filename, mimetype, len(rows)), False
+
+def send_report(report_type, download_format, entity_id=None, source='report', filter_params=None):
+    """Serve a report from the artifact cache (rendering it on a miss) and log the download"""
+    download_format = download_format.lower()
+    if download_format not in ('csv', 'pdf'):
+        return jsonify({"error": "Invalid format. Use 'csv' or 'pdf'"}), 400
+    if entity_id:
+        entity_id = canonical_id(report_type, entity_id)
+
+    try:
+        entry, cache_hit = get_cached_report(report_type, download_format, entity_id, source)
+    except Exception as e:
+        print(f"Error generating {report_type} report: {str(e)}")
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+    if entry is None:
+        if source == 'item':
+            return jsonify({"error": f"No {report_type} found with ID {entity_id}"}), 404
+        return jsonify({"error": f"No {report_type}s found with the given criteria"}), 404
+
+    # CSV artifacts are compressed once per encoding and kept next to the
+    # artifact; each encoding has its own ETag
+    path, etag, encoding = entry.path, entry.etag, None
+    if COMPRESS_RESPONSES and download_format == 'csv' and entry.size >= compressor.min_size and request.range is None:
+        encoding = negotiate(request.accept_encodings)
+        encoded_path = report_cache.encoded_path(entry, encoding, compressor.compress_file) if encoding else None
+        if encoded_path:
+            path, etag = encoded_path, f"{entry.etag}-{encoding}"
+        else:
+            encoding = None
+
+    # Clients revalidate with If-None-Match and get a 304 without a body
+    response = send_file(path, mimetype=entry.mimetype, as_attachment=True,
+                         download_name=entry.filename, etag=etag, conditional=True)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    if download_format == 'csv':
+        response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.headers['X-Report-Cache'] = 'HIT' if cache_hit else 'MISS'
+    response.headers['Access-Control-Allow-Origin'] = '*'
+
+    if response.status_code != 304:
+        log_download(
+            report_type=report_type,
+            entity_id=entity_id or None,
+            download_format=download_format,
+            record_count=entry.record_count,
+            filter_params=filter_params
+        )
+    return response
+
+@app.route('/api/report-cache/stats', methods=['GET'])
+def get_report_cache_stats():
+    return jsonify(report_cache.stats())
+
+@app.route('/api/report-cache/clear', methods=['POST'])
+def clear_report_cache():
+    report_cache.invalidate()
+    return jsonify({"message": "Report cache cleared"}), 200
+
+@app.route('/api/download-project-report/<format>', methods=['GET'])
+def download_project_report(format):
+    project_id = request.args.get('projectId', '')
+    filter_params = {
+        'projectId': project_id
+    }
     
-# Add these routes to get download statistics
+    print(f"Downloading project report in {format} format with projectId: '{project_id}'")
+    
+    if wants_async_report():
+        return submit_report_job_response('project', format, project_id, 'report', filter_params)
+    
+    # Full exports are streamed; ID lookups are cached like the other formats
+    if format.lower() == 'csv' and not project_id:
+        return stream_report_csv(
+            'project', f"SELECT {PROJECT_REPORT_COLUMNS} FROM projects", (),
+            'project_report', None, filter_params
+        )
+    
+    return send_report('project', format, project_id, 'report', filter_params)
+
+@app.route('/api/download-product-report/<format>', methods=['GET'])
+def download_product_report(format):
+    product_id = request.args.get('productId', '')
+    filter_params = {
+        'productId': product_id
+    }
+    
+    print(f"Downloading product report in {format} format with productId: '{product_id}'")
+    
+    if wants_async_report():
+        return submit_report_job_response('product', format, product_id, 'report', filter_params)
+    
+    # Full exports are streamed; ID lookups are cached like the other formats
+    if format.lower() == 'csv' and not product_id:
+        return stream_report_csv(
+            'product', f"SELECT {PRODUCT_REPORT_COLUMNS} FROM products", (),
+            'product_report', None, filter_params
+        )
+    
+    return send_report('product', format, product_id, 'report', filter_params)
 @app.route('/api/download-stats', methods=['GET'])
+@json_formats
 def get_download_stats():
     """Get statistics about report downloads"""
     connection = get_db_connection()
@@ -2500,13 +3350,13 @@ def get_download_stats():
     try:
         cursor = connection.cursor(dictionary=True)
         
-        # Get overall download count by type and format
+        # Get overall download count by type and format (from the daily rollup)
         query_overall = """
         SELECT 
             report_type, 
             download_format, 
-            COUNT(*) as download_count
-        FROM download_logs
+            CAST(SUM(download_count) AS UNSIGNED) as download_count
+        FROM download_stats_daily
         GROUP BY report_type, download_format
         ORDER BY report_type, download_format
         """
@@ -2530,20 +3380,9 @@ def get_download_stats():
         cursor.execute(query_recent)
         recent_downloads = cursor.fetchall()
         
-        # Format dates for JSON response
-        formatted_downloads = []
-        for download in recent_downloads:
-            formatted_download = {}
-            for key, value in download.items():
-                if isinstance(value, datetime):
-                    formatted_download[key] = value.strftime('%Y-%m-%d %H:%M:%S')
-                else:
-                    formatted_download[key] = value
-            formatted_downloads.append(formatted_download)
-        
         return jsonify({
             'overall_stats': overall_stats,
-            'recent_downloads': formatted_downloads
+            'recent_downloads': recent_downloads
         })
         
     except Error as e:
@@ -2604,6 +3443,7 @@ def repeat_download(log_id):
 # Add these API routes to support the download log admin interface
 
 @app.route('/api/download-logs', methods=['GET'])
+@json_formats
 def get_download_logs():
     """Get all download logs with optional filtering"""
     # Get filter parameters
@@ -2646,18 +3486,7 @@ def get_download_logs():
         cursor.execute(query, params)
         logs = cursor.fetchall()
         
-        # Format dates
-        formatted_logs = []
-        for log in logs:
-            formatted_log = {}
-            for key, value in log.items():
-                if isinstance(value, datetime):
-                    formatted_log[key] = value.strftime('%Y-%m-%d %H:%M:%S')
-                else:
-                    formatted_log[key] = value
-            formatted_logs.append(formatted_log)
-            
-        return jsonify(formatted_logs)
+        return jsonify(logs)
         
     except Error as e:
         return jsonify({"error": str(e)}), 500
@@ -2668,6 +3497,7 @@ def get_download_logs():
             connection.close()
 
 @app.route('/api/download-stats/summary', methods=['GET'])
+@json_formats
 def get_download_summary():
     """Get summary statistics about downloads"""
     connection = get_db_connection()
@@ -2677,18 +3507,18 @@ def get_download_summary():
     try:
         cursor = connection.cursor(dictionary=True)
         
-        # Get download count by report type
+        # All counts come from the rollups maintained as logs are written
         cursor.execute("""
-            SELECT report_type, COUNT(*) as count 
-            FROM download_logs 
+            SELECT report_type, CAST(SUM(download_count) AS UNSIGNED) as count 
+            FROM download_stats_daily 
             GROUP BY report_type
         """)
         by_report_type = cursor.fetchall()
         
         # Get download count by format
         cursor.execute("""
-            SELECT download_format, COUNT(*) as count 
-            FROM download_logs 
+            SELECT download_format, CAST(SUM(download_count) AS UNSIGNED) as count 
+            FROM download_stats_daily 
             GROUP BY download_format
         """)
         by_format = cursor.fetchall()
@@ -2696,35 +3526,22 @@ def get_download_summary():
         # Get daily downloads for the last 30 days
         cursor.execute("""
             SELECT 
-                DATE(download_date) as date, 
-                COUNT(*) as count 
-            FROM download_logs 
-            WHERE download_date >= DATE_SUB(CURDATE(), INTERVAL 30 DAY)
-            GROUP BY DATE(download_date)
+                stat_date as date, 
+                CAST(SUM(download_count) AS UNSIGNED) as count 
+            FROM download_stats_daily 
+            WHERE stat_date >= DATE_SUB(CURDATE(), INTERVAL 30 DAY)
+            GROUP BY stat_date
             ORDER BY date
         """)
         daily_counts = cursor.fetchall()
         
-        # Format dates in daily counts
-        formatted_daily = []
-        for item in daily_counts:
-            formatted_item = {}
-            for key, value in item.items():
-                if isinstance(value, date):
-                    formatted_item[key] = value.strftime('%Y-%m-%d')
-                else:
-                    formatted_item[key] = value
-            formatted_daily.append(formatted_item)
-        
         # Get top downloaded entities
         cursor.execute("""
             SELECT 
                 report_type,
                 entity_id,
-                COUNT(*) as download_count
-            FROM download_logs
-            WHERE entity_id IS NOT NULL
-            GROUP BY report_type, entity_id
+                download_count
+            FROM download_stats_entity
             ORDER BY download_count DESC
             LIMIT 10
         """)
@@ -2733,7 +3550,7 @@ def get_download_summary():
         return jsonify({
             'by_report_type': by_report_type,
             'by_format': by_format,
-            'daily_counts': formatted_daily,
+            'daily_counts': daily_counts,
             'top_entities': top_entities
         })
         
@@ -2745,6 +3562,21 @@ def get_download_summary():
             cursor.close()
             connection.close()
 
+@app.cli.command('backfill-download-stats')
+def backfill_download_stats_command():
+    """Rebuild the download stats rollups from the existing download_logs rows"""
+    download_log_writer.flush()
+    conn = get_db_connection()
+    if not conn:
+        print("Database connection failed.")
+        return
+    try:
+        counts = backfill_download_stats(conn)
+        for table, count in counts.items():
+            print(f"Rebuilt {table}: {count} rows")
+    finally:
+        conn.close()
+
 @app.route('/api/download-logs/<int:log_id>', methods=['DELETE'])
 def delete_download_log(log_id):
     """Delete a specific download log entry"""
@@ -2755,7 +3587,8 @@ def delete_download_log(log_id):
     try:
         cursor = connection.cursor()
         
-        # Delete the log entry
+        # Delete the log entry and take it out of the download stats
+        subtract_logs(cursor, "log_id = %s", (log_id,))
         cursor.execute("DELETE FROM download_logs WHERE log_id = %s", (log_id,))
         connection.commit()
         
@@ -2789,6 +3622,7 @@ def clear_download_logs():
         cursor = connection.cursor()
         
         # Clear log entries older than the specified date
+        subtract_logs(cursor, "download_date < %s", (older_than,))
         cursor.execute("DELETE FROM download_logs WHERE download_date < %s", (older_than,))
         connection.commit()
         
@@ -2810,7 +3644,8 @@ def download_project_by_id(project_id):
     format = request.args.get('format', 'csv')
     print(f"Project download requested for project_id: {project_id} in format: {format}")
     
-    # Pass the project_id directly for better identification in the reports
+    # Redirect with the canonical ID so the report and its cache entry are shared
+    project_id = canonical_id('project', project_id)
     return redirect(url_for('download_project_report', format=format, projectId=project_id))
 
 
@@ -2829,56 +3664,313 @@ def test_csv():
 def download_data(data_type, item_id):
     try:
         format_type = request.args.get("format", "pdf").lower()
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
+        if data_type not in REPORT_SOURCES:
+            return jsonify({"error": "Invalid data type"}), 400
 
-        # Choose table and column
-        if data_type == "product":
-            table, column = "products", "product_id"
-        elif data_type == "client":
-            table, column = "clients", "client_id"
-        elif data_type == "project":
-            table, column = "projects", "project_id"
+        if wants_async_report():
+            return submit_report_job_response(data_type, format_type, item_id, 'item')
+        return send_report(data_type, format_type, item_id, 'item')
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    
+# ================== REPORT JOB ROUTES ==================
+
+# Reports can be generated in the background instead of inside the request:
+# POST /api/report-jobs (or add ?async=1 to any download route) returns a job
+# id, GET /api/report-jobs/<id> reports progress (?wait=N blocks up to N
+# seconds) and /api/report-jobs/<id>/download serves the finished file.
+REPORT_JOB_WAIT_MAX = 30
+
+def build_report_artifact(job, run_cpu_bound):
+    """Fetch rows and render a report job; runs on a report worker thread"""
+    entity_id = job.params.get('entityId') or None
+    source = job.params.get('source', 'report')
+
+    def render_pdf(rows, title):
+        # CPU-bound, rendered in the process pool
+        return run_cpu_bound(render_table_pdf, rows, title)
+
+    entry, _ = get_cached_report(job.report_type, job.download_format, entity_id, source, render_pdf)
+    if entry is None:
+        raise ReportJobError(f"No {job.report_type}s found with the given criteria")
+
+    # Jobs keep their own copy so the download survives cache eviction
+    with open(entry.path, 'rb') as f:
+        content = f.read()
+    return content, entry.filename, entry.mimetype, entry.record_count
+
+def record_report_job_state(job):
+    """Create the download_logs row when a job is queued and update it as the job progresses"""
+    conn = get_db_connection()
+    if conn is None:
+        print(f"Failed to connect to database for report job {job.job_id}")
+        return
+    cursor = conn.cursor()
+    try:
+        if job.log_id is None:
+            filter_json = json.dumps(job.params.get('filters')) if job.params.get('filters') else None
+            cursor.execute("""
+                INSERT INTO download_logs (
+                    user_id, report_type, entity_id, download_format, ip_address,
+                    download_date, filter_params, record_count, job_id, job_status
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """, (
+                job.context.get('user_id'),
+                job.report_type,
+                job.params.get('entityId') or None,
+                job.download_format,
+                job.context.get('ip_address'),
+                job.queued_at,
+                filter_json,
+                0,
+                job.job_id,
+                job.state
+            ))
+            job.log_id = cursor.lastrowid
+            apply_download_events(cursor, [(job.queued_at, job.report_type, job.download_format,
+                                            job.params.get('entityId') or None, 1, 0)])
         else:
-            return jsonify({"error": "Invalid data type"}), 400
+            cursor.execute("""
+                UPDATE download_logs
+                SET job_status = %s, started_at = %s, finished_at = %s,
+                    queue_ms = %s, run_ms = %s, record_count = %s, error_message = %s,
+                    artifact_name = %s, artifact_type = %s
+                WHERE log_id = %s
+            """, (
+                job.state,
+                job.started_at,
+                job.finished_at,
+                job.queue_ms,
+                job.run_ms,
+                job.record_count or 0,
+                job.error,
+                job.filename,
+                job.mimetype,
+                job.log_id
+            ))
+            if job.state == JOB_DONE and job.record_count:
+                apply_download_events(cursor, [(job.queued_at, job.report_type, job.download_format,
+                                                None, 0, job.record_count)])
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
 
-        query = f"SELECT * FROM {table} WHERE {column} = %s"
-        cursor.execute(query, (item_id,))
-        result = cursor.fetchall()
+def load_report_job(job_id):
+    """download_logs row of a report job queued by another worker process"""
+    conn = get_db_connection()
+    if conn is None:
+        raise Error("Database connection failed")
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute("""
+            SELECT log_id, job_id, job_status, report_type, entity_id, download_format,
+                   download_date, filter_params, started_at, finished_at, queue_ms, run_ms,
+                   record_count, error_message, artifact_name, artifact_type
+            FROM download_logs
+            WHERE job_id = %s
+            ORDER BY log_id DESC
+            LIMIT 1
+        """, (job_id,))
+        return cursor.fetchone()
+    finally:
         cursor.close()
         conn.close()
 
-        if not result:
-            return jsonify({"error": f"No {data_type} found with ID {item_id}"}), 404
+# Any worker process can answer for a job: state comes from download_logs
+# and artifacts are read from REPORT_JOB_DIR, which has to be shared by all
+# workers (the default temp directory is, when they run on one host).
+report_jobs = ReportJobQueue(
+    build_report_artifact,
+    max_workers=int(os.environ.get('REPORT_JOB_WORKERS', 2)),
+    max_queue=int(os.environ.get('REPORT_JOB_QUEUE_SIZE', 20)),
+    render_processes=int(os.environ.get('REPORT_JOB_RENDER_PROCESSES', 2)),
+    artifact_dir=os.environ.get('REPORT_JOB_DIR'),
+    result_ttl=float(os.environ.get('REPORT_JOB_RESULT_TTL', 3600)),
+    on_state_change=record_report_job_state,
+    load_job=load_report_job,
+    stale_after=float(os.environ.get('REPORT_JOB_STALE_AFTER', 1800))
+)
+atexit.register(report_jobs.shutdown)
+
+def wants_async_report():
+    return str(request.args.get('async', '')).lower() in ('1', 'true', 'yes')
+
+def report_job_payload(job):
+    payload = job.to_dict()
+    payload['statusUrl'] = f"/api/report-jobs/{job.job_id}"
+    payload['downloadUrl'] = f"/api/report-jobs/{job.job_id}/download"
+    return payload
+
+def submit_report_job_response(report_type, download_format, entity_id=None, source='report', filter_params=None):
+    """Queue a report job for the current request and return the 202 response"""
+    download_format = (download_format or '').lower()
+    if report_type not in REPORT_SOURCES:
+        return jsonify({"error": "Invalid report type. Use 'project', 'product' or 'client'"}), 400
+    if download_format not in ('csv', 'pdf'):
+        return jsonify({"error": "Invalid format. Use 'csv' or 'pdf'"}), 400
+    if source == 'item' and not entity_id:
+        return jsonify({"error": "entityId is required for item downloads"}), 400
+
+    params = {'entityId': entity_id or None, 'source': source}
+    if filter_params:
+        params['filters'] = filter_params
+    context = {
+        'user_id': request.args.get('userId', None),
+        'ip_address': request.remote_addr
+    }
+    try:
+        job = report_jobs.submit(report_type, download_format, params, context)
+    except QueueFullError as e:
+        return jsonify({"error": str(e)}), 429, {'Retry-After': '5'}
+
+    return jsonify(report_job_payload(job)), 202, {'Location': f"/api/report-jobs/{job.job_id}"}
+
+@app.route('/api/report-jobs', methods=['POST'])
+def create_report_job():
+    """Queue a report; body: {"reportType", "format", "entityId" (optional), "source": "report"|"item"}"""
+    data = request.get_json(silent=True) or {}
+    report_type = data.get('reportType', '')
+    source = data.get('source', 'report')
+    if source not in ('report', 'item'):
+        return jsonify({"error": "source must be 'report' or 'item'"}), 400
+    entity_id = data.get('entityId') or None
+    filter_params = None
+    if source == 'report' and report_type in REPORT_SOURCES:
+        filter_params = {REPORT_SOURCES[report_type]['filter']: entity_id or ''}
+    return submit_report_job_response(report_type, data.get('format', 'pdf'), entity_id, source, filter_params)
+
+@app.route('/api/report-jobs', methods=['GET'])
+def list_report_jobs():
+    """Jobs held by this worker process plus its queue metrics"""
+    return jsonify({
+        'metrics': report_jobs.metrics(),
+        'jobs': [report_job_payload(job) for job in report_jobs.jobs()]
+    })
+
+@app.route('/api/report-jobs/<job_id>', methods=['GET'])
+def get_report_job(job_id):
+    job = report_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Report job not found"}), 404
 
-        # Convert result to a list of dictionaries with formatted dates
-        data = []
-        for row in result:
-            # Format dates if present
-            formatted_row = {}
-            for key, value in row.items():
-                if isinstance(value, datetime):
-                    formatted_row[key] = value.strftime('%Y-%m-%d')
-                else:
-                    formatted_row[key] = value
-            data.append(formatted_row)
-
-        # Log the download for statistics
-        log_download(data_type, item_id, format_type, len(data))
-
-        if format_type == "csv":
-            # Use the improved CSV generation
-            return generate_csv_report(data, f"{data_type}_{item_id}")
-        elif format_type == "pdf":
-            # Use the improved PDF generation
-            return generate_pdf_report(data, f"{data_type.capitalize()} Report")
-        else:
-            return jsonify({"error": "Invalid format type. Use 'csv' or 'pdf'"}), 400
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    try:
+        wait = min(float(request.args.get('wait', 0)), REPORT_JOB_WAIT_MAX)
+    except ValueError:
+        return jsonify({"error": "wait must be a number of seconds"}), 400
+    if wait > 0:
+        job = report_jobs.wait(job, wait)
+
+    return jsonify(report_job_payload(job))
+
+@app.route('/api/report-jobs/<job_id>/download', methods=['GET'])
+def download_report_job(job_id):
+    job = report_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Report job not found"}), 404
+    if job.state == JOB_FAILED:
+        return jsonify({"error": job.error, "status": job.state}), 422
+    if job.state != JOB_DONE:
+        return jsonify({"error": "Report is not ready yet", "status": job.state}), 409, {'Retry-After': '2'}
+    if not job.artifact_path or not os.path.exists(job.artifact_path):
+        return jsonify({"error": "Report file has expired", "status": job.state}), 410
+
+    response = send_file(job.artifact_path, mimetype=job.mimetype, as_attachment=True,
+                         download_name=job.filename)
+    response.headers['Access-Control-Allow-Origin'] = '*'
+    return response
     
+# ================== SEARCH ==================
+
+SEARCH_MAX_LIMIT = 50
+SEARCH_TIMEOUT_MS = int(os.environ.get('SEARCH_TIMEOUT_MS', 500))
+
+def update_search_index(cursor, entity_type, *entity_ids):
+    """Refresh search documents in the caller's transaction; a failure only logs"""
+    try:
+        reindex_entities(cursor, entity_type, entity_ids, schema_registry.columns)
+    except Error as e:
+        print(f"Error updating search index for {entity_type} {entity_ids}: {e}")
+
+@app.route('/api/search', methods=['GET'])
+def search_entities():
+    """
+    Ranked search over employees, projects, products, clients and tasks.
+    
+    Query params: q (at least one term of 2+ characters), types (comma-separated
+    subset of employee, project, product, client, task) and limit (default 10,
+    max 50).
+    """
+    query = request.args.get('q', '').strip()
+    types = [t.strip() for t in request.args.get('types', '').split(',') if t.strip()]
+    unknown = [t for t in types if t not in SEARCH_TYPES]
+    if unknown:
+        return jsonify({"error": f"Unknown types: {', '.join(unknown)}", "types": list(SEARCH_TYPES)}), 400
+    try:
+        limit = min(max(int(request.args.get('limit', 10)), 1), SEARCH_MAX_LIMIT)
+    except ValueError:
+        return jsonify({"error": "limit must be a number"}), 400
+    if not query:
+        return jsonify({"error": "Missing required parameter 'q'"}), 400
+    
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+    cursor = conn.cursor(dictionary=True)
+    started = time.perf_counter()
+    try:
+        results = search(cursor, query, types, limit, SEARCH_TIMEOUT_MS)
+        return jsonify({
+            "query": query,
+            "results": results,
+            "took_ms": round((time.perf_counter() - started) * 1000, 1)
+        }), 200
+    except Error as e:
+        print(f"Error searching for {query!r}: {e}")
+        return jsonify({"error": str(e)}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+@app.cli.command('rebuild-search-index')
+def rebuild_search_index_command():
+    """Regenerate search_documents from employees, projects, products, clients and tasks"""
+    conn = get_db_connection()
+    if not conn:
+        print("Database connection failed.")
+        return
+    try:
+        counts = rebuild_search_index(conn, schema_registry.columns)
+        for entity_type, count in counts.items():
+            print(f"Indexed {count} {entity_type} documents")
+    finally:
+        conn.close()
+
 # ================== TASK ROUTES ==================
 
+TASK_LIST_SPEC = ListSpec({
+    'taskId': 't.task_id',
+    'taskName': 't.task_name',
+    'taskDescription': 't.task_description',
+    'projectId': 't.project_id',
+    'projectName': 't.project_name',
+    'productName': 't.product_name',
+    'clientName': 't.client_name',
+    'initiativeDate': 't.initiative_date',
+    'targetCompletionDate': 't.target_completion_date',
+    'actualCompletionDate': 't.actual_completion_date',
+    'status': 't.status',
+    'currentStatus': 'cs.task_status',
+    'statusUpdatedAt': 'cs.updated_at'
+}, primary_key='taskId')
+
+# Tasks joined with their latest status update (primary-key lookup per task)
+TASK_LIST_FROM = """
+    FROM tasks t
+    LEFT JOIN projects p ON t.project_id = p.project_id
+    LEFT JOIN task_current_status cs ON cs.task_id = t.task_id
+"""
+
 # Get all tasks
 @app.route('/tasks', methods=['GET'])
 def get_all_tasks():
@@ -2890,30 +3982,16 @@ def get_all_tasks():
         cursor = conn.cursor(dictionary=True)
         
         try:
-            cursor.execute("""
-                SELECT 
-                    t.task_id as taskId, 
-                    t.task_name as taskName, 
-                    t.task_description as taskDescription,
-                    t.project_id as projectId,
-                    t.project_name as projectName,
-                    t.product_name as productName,
-                    t.client_name as clientName,
-                    t.initiative_date as initiativeDate,
-                    t.target_completion_date as targetCompletionDate,
-                    t.actual_completion_date as actualCompletionDate,
-                    t.status
-                FROM tasks t
-                LEFT JOIN projects p ON t.project_id = p.project_id
-            """)
-            
-            tasks = cursor.fetchall()
+            tasks, page = run_list_query(cursor, TASK_LIST_SPEC, request.args, TASK_LIST_FROM)
             
             # Format date fields
             for task in tasks:
                 format_dates(task)
             
-            return jsonify({"success": True, "tasks": tasks})
+            return jsonify({"success": True, "tasks": tasks}), 200, page_headers(page)
+        
+        except PaginationError as e:
+            return jsonify({"success": False, "error": str(e), "tasks": []}), 400
         
         except Exception as e:
             logger.error(f"Query error in get_all_tasks: {e}")
@@ -3028,7 +4106,9 @@ def create_task():
         )
         
         cursor.execute(insert_query, values)
+        update_search_index(cursor, 'task', task_data['taskId'])
         connection.commit()
+        entity_ids.add('task', task_data['taskId'])
         
         logger.info(f"Task {task_data['taskId']} created successfully")
         
@@ -3104,6 +4184,7 @@ def update_task(task_id):
             data['targetCompletionDate'],
             task_id
         ))
+        update_search_index(cursor, 'task', task_id)
         
         cursor.close()
         conn.close()
@@ -3118,6 +4199,8 @@ def update_task(task_id):
 def delete_task(task_id):
     try:
         conn = get_db_connection()
+        if not conn:
+            return jsonify({"error": "Database connection failed"}), 500
         cursor = conn.cursor()
         
         # Check if task exists
@@ -3129,6 +4212,9 @@ def delete_task(task_id):
         
         # Delete the task
         cursor.execute("DELETE FROM tasks WHERE task_id = %s", (task_id,))
+        update_search_index(cursor, 'task', task_id)
+        conn.commit()
+        entity_ids.discard('task', task_id)
         
         cursor.close()
         conn.close()
@@ -3211,6 +4297,7 @@ def update_task_status():
             task_id, task_name, task_status, reason,
             allocate_by, employee_id, assigned_date, target_date
         ))
+        record_task_status(cursor, cursor.lastrowid)
 
         # Commit changes to the database
         connection.commit()
@@ -3235,6 +4322,19 @@ def update_task_status():
             connection.close()
         return jsonify({'success': False, 'message': f"An error occurred: {str(e)}"}), 500
 
+@app.cli.command('rebuild-task-status')
+def rebuild_task_status_command():
+    """Regenerate task_current_status from the task_update history"""
+    conn = get_db_connection()
+    if not conn:
+        print("Database connection failed.")
+        return
+    try:
+        count = rebuild_task_status(conn)
+        print(f"Rebuilt task_current_status: {count} tasks")
+    finally:
+        conn.close()
+
 # Get tasks for a specific project
 @app.route('/projects/<project_id>/tasks', methods=['GET'])
 def get_project_tasks(project_id):
@@ -3280,6 +4380,20 @@ def get_project_tasks(project_id):
     
     
     
+TASK_ALLOCATION_LIST_SPEC = ListSpec({
+    **{field: f'ta.{field}' for field in (
+        'task_id', 'task_name', 'project_name', 'product_name', 'client_name',
+        'initiative_date', 'target_completion_date', 'employee_id', 'employee_name',
+        'role_name', 'reporting_person_id', 'assigned_date', 'target_date', 'remarks',
+        'created_at', 'updated_at'
+    )},
+    'current_status': 'cs.task_status',
+    'status_updated_at': 'cs.updated_at'
+}, primary_key='task_id', default_sort='-created_at',
+   select_all='ta.*, cs.task_status AS current_status, cs.updated_at AS status_updated_at')
+
+TASK_ALLOCATION_FROM = "FROM task_allocation ta LEFT JOIN task_current_status cs ON cs.task_id = ta.task_id"
+
 @app.route('/api/task-allocation', methods=['GET'])
 def get_task_allocations():
     """Get all task allocations with optional filtering"""
@@ -3296,32 +4410,29 @@ def get_task_allocations():
         
         cursor = conn.cursor(dictionary=True)
         
-        # Base query
-        query = "SELECT * FROM task_allocation WHERE 1=1"
+        # Optional filters
+        where = []
         params = []
         
         # Add filters if provided
         if employee_id:
-            query += " AND employee_id = %s"
+            where.append("ta.employee_id = %s")
             params.append(employee_id)
         
         if project_name:
-            query += " AND project_name = %s"
+            where.append("ta.project_name = %s")
             params.append(project_name)
             
         if product_name:
-            query += " AND product_name = %s"
+            where.append("ta.product_name = %s")
             params.append(product_name)
             
         if client_name:
-            query += " AND client_name = %s"
+            where.append("ta.client_name = %s")
             params.append(client_name)
         
-        # Add ordering
-        query += " ORDER BY created_at DESC"
-        
-        cursor.execute(query, params)
-        tasks = cursor.fetchall()
+        tasks, page = run_list_query(cursor, TASK_ALLOCATION_LIST_SPEC, request.args,
+                                     TASK_ALLOCATION_FROM, where, params)
         
         # Convert dates to string format for JSON serialization
         for task in tasks:
@@ -3332,8 +4443,10 @@ def get_task_allocations():
         cursor.close()
         conn.close()
         
-        return jsonify(tasks), 200
+        return jsonify(tasks), 200, page_headers(page)
         
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
     except Error as e:
         return jsonify({'error': f'Database error: {str(e)}'}), 500
     except Exception as e:
@@ -3350,9 +4463,11 @@ def get_task_allocation(task_id):
 
         # Fetch from task_allocation
         cursor.execute("""
-            SELECT task_name, employee_name, employee_id, assigned_date, target_date
-            FROM task_allocation
-            WHERE task_id = %s
+            SELECT ta.task_name, ta.employee_name, ta.employee_id, ta.assigned_date, ta.target_date,
+                   cs.task_status AS current_status
+            FROM task_allocation ta
+            LEFT JOIN task_current_status cs ON cs.task_id = ta.task_id
+            WHERE ta.task_id = %s
         """, (task_id,))
         task = cursor.fetchone()
 
@@ -3607,339 +4722,9 @@ def allocate_task():
     finally:
         if 'connection' in locals() and connection.is_connected():
             cursor.close()
-            connection.close()
-            
-            
-
-def generate_pdf_report(data, report_title):
-    if not data:
-        logger.error("No data to export")
-        return jsonify({"error": "No data to export"}), 404
-    
-    try:
-        # Create a modern, professional PDF report with refined styling
-        buffer = BytesIO()
-        
-        # Use landscape for wider tables, optimized margins
-        doc = SimpleDocTemplate(
-            buffer, 
-            pagesize=landscape(A4),
-            leftMargin=25,    # Balanced margins
-            rightMargin=25,   # Balanced margins
-            topMargin=80,     # Space for header
-            bottomMargin=50
-        )
-        
-        # Corporate color palette (blue tones)
-        corporate_dark_blue = colors.HexColor("#003366")  # Deep blue for headers
-        corporate_light_blue = colors.HexColor("#E6EFF6")  # Light blue for alternate rows
-        corporate_accent = colors.HexColor("#4F81BD")  # Medium blue for accents
-        
-        # Document elements list
-        elements = []
-        
-        # Add space at top to avoid header overlap
-        elements.append(Spacer(1, 15))
-        
-        # Add report summary section
-        if data:
-            # Summary data
-            records_count = len(data)
-            current_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            
-            # Create summary title
-            title_style = ParagraphStyle(
-                name='SectionTitle',
-                fontName='Helvetica-Bold',
-                fontSize=12,
-                textColor=corporate_dark_blue,
-                alignment=1,  # Center alignment
-                spaceAfter=10
-            )
-            elements.append(Paragraph('Report Summary', title_style))
-            
-            # Create summary table with clean styling
-            summary_data = [
-                ["Records", str(records_count)],
-                ["Report Type", report_title],
-                ["Generated At", current_date]
-            ]
-            
-            # Summary table styling
-            summary_table = Table(summary_data, colWidths=[120, 200])
-            summary_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (0, -1), corporate_light_blue),
-                ('BACKGROUND', (1, 0), (1, -1), colors.white),
-                ('TEXTCOLOR', (0, 0), (0, -1), corporate_dark_blue),
-                ('TEXTCOLOR', (1, 0), (1, -1), colors.black),
-                ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-                ('ALIGN', (1, 0), (1, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-                ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 0), (0, -1), 9),
-                ('FONTSIZE', (1, 0), (1, -1), 9),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('INNERGRID', (0, 0), (-1, -1), 0.25, colors.lightgrey),
-                ('BOX', (0, 0), (-1, -1), 0.25, corporate_accent),
-                ('TOPPADDING', (0, 0), (-1, -1), 6),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-            ]))
-            
-            # Create container for centered summary table
-            summary_container = Table([[summary_table]], colWidths=[doc.width])
-            summary_container.setStyle(TableStyle([
-                ('ALIGN', (0, 0), (0, 0), 'CENTER'),
-                ('VALIGN', (0, 0), (0, 0), 'MIDDLE'),
-            ]))
-            elements.append(summary_container)
-            elements.append(Spacer(1, 20))
-            
-            # Create data table with modern styling
-            headers = list(data[0].keys())
-            
-            # Enhanced column mapping for better readability - map DB column names to display names
-            header_mapping = {
-                # Project report mappings
-                'project_id': 'Project ID',
-                'project_name': 'Project Name',
-                'project_client_id': 'Client ID',
-                'managed_by': 'Managed By',
-                'estimated_cost': 'Est. Cost',
-                'completion_days': 'Compl Days',
-                'release_date': 'Release Date',
-                'committed_date': 'Commit Date',
-                'description': 'Description',
-                
-                # Product report mappings
-                'product_id': 'Product ID',
-                'product_name': 'Product Name',
-                'date_of_product': 'Date',
-                'product_status': 'Status',
-                'product_description': 'Description',
-                'product_technical': 'Technical',
-                'product_specification': 'Specification',
-                'product_framework': 'Framework'
-            }
-            
-            # Generate display headers with proper capitalization and spacing
-            display_headers = []
-            header_style = ParagraphStyle(
-                'HeaderStyle',
-                fontName='Helvetica-Bold',
-                fontSize=9.5,
-                textColor=colors.white,
-                alignment=1,  # Center alignment
-                spaceAfter=0,
-                spaceBefore=0,
-                leading=11
-            )
-
-            for h in headers:
-                h_lower = h.lower()
-                if h_lower in header_mapping:
-                    display_headers.append(Paragraph(header_mapping[h_lower], header_style))
-                else:
-                    # Clean up any headers not in our mapping
-                    text = ' '.join(word.capitalize() for word in h.replace('_', ' ').split())
-                    display_headers.append(Paragraph(text, header_style))
-            
-            # Table data with display headers
-            table_data = [display_headers]
-            
-            # Format the data rows
-            for row in data:
-                table_row = []
-                for header in headers:
-                    value = row.get(header, '')
-                    # Right-align numeric fields
-                    if isinstance(value, (int, float)):
-                        cell_style = ParagraphStyle(
-                            'RightAligned',
-                            parent=None,
-                            alignment=2,  # Right alignment
-                            fontSize=9
-                        )
-                        if isinstance(value, int):
-                            cell_text = "{:,}".format(value)
-                        else:
-                            cell_text = "{:,.2f}".format(value)
-                        table_row.append(Paragraph(cell_text, cell_style))
-                    elif header.lower().endswith('date') and value:
-                        # Center align dates
-                        cell_style = ParagraphStyle(
-                            'CenterAligned',
-                            parent=None,
-                            alignment=1,  # Center alignment
-                            fontSize=9
-                        )
-                        table_row.append(Paragraph(str(value), cell_style))
-                    else:
-                        # Left-align text
-                        cell_style = ParagraphStyle(
-                            'LeftAligned',
-                            parent=None,
-                            alignment=0,  # Left alignment
-                            fontSize=9
-                        )
-                        table_row.append(Paragraph(str(value), cell_style))
-                table_data.append(table_row)
-            
-            # Optimized column widths - try to make it fit nicely
-            col_widths = []
-            page_width = doc.width
-            
-            # Determine number of columns to calculate proportional widths
-            num_columns = len(headers)
-            default_width = page_width / num_columns
-            
-            # Special case handling for certain column types
-            for i, header in enumerate(headers):
-                header_lower = header.lower()
-                if header_lower.endswith('_id'):
-                    col_widths.append(min(default_width * 0.8, page_width * 0.08))  # IDs are generally short
-                elif header_lower.endswith('_name'):
-                    col_widths.append(min(default_width * 1.3, page_width * 0.15))  # Names may be longer
-                elif header_lower.endswith('_date'):
-                    col_widths.append(min(default_width * 0.9, page_width * 0.09))  # Dates have fixed width
-                elif header_lower.endswith('description'):
-                    col_widths.append(min(default_width * 1.5, page_width * 0.18))  # Descriptions need more space
-                elif header_lower in ['estimated_cost', 'completion_days']:
-                    col_widths.append(min(default_width * 0.7, page_width * 0.07))  # Numbers can be smaller
-                else:
-                    col_widths.append(default_width)  # Default column width
-            
-            # Create data table
-            table = Table(
-                table_data,
-                colWidths=col_widths,
-                repeatRows=1,  # Repeat header row on each page
-                hAlign='CENTER'
-            )
-            
-            # Professional table styling
-            table_style = [
-                # Header row styling
-                ('BACKGROUND', (0, 0), (-1, 0), corporate_dark_blue),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-                ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-                ('VALIGN', (0, 0), (-1, 0), 'MIDDLE'),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-                ('TOPPADDING', (0, 0), (-1, 0), 8),
-                ('LEFTPADDING', (0, 0), (-1, -1), 4),
-                ('RIGHTPADDING', (0, 0), (-1, -1), 4),
-                
-                # Grid styling
-                ('GRID', (0, 0), (-1, -1), 0.5, colors.lightgrey),
-                ('BOX', (0, 0), (-1, -1), 1, corporate_dark_blue),
-                ('LINEBELOW', (0, 0), (-1, 0), 1.5, corporate_dark_blue),
-                
-                # Vertical alignment for data rows
-                ('VALIGN', (0, 1), (-1, -1), 'MIDDLE'),
-                
-                # Row height
-                ('BOTTOMPADDING', (0, 1), (-1, -1), 6),
-                ('TOPPADDING', (0, 1), (-1, -1), 6),
-            ]
-            
-            # Zebra striping for data rows
-            for i in range(1, len(table_data)):
-                if i % 2 == 0:
-                    table_style.append(('BACKGROUND', (0, i), (-1, i), corporate_light_blue))
-                else:
-                    table_style.append(('BACKGROUND', (0, i), (-1, i), colors.white))
-            
-            # Apply style to table
-            table.setStyle(TableStyle(table_style))
-            
-            # Add data table to document
-            elements.append(table)
-            
-            # Add note at bottom
-            note_style = ParagraphStyle(
-                name='Note',
-                fontSize=8,
-                textColor=colors.gray,
-                alignment=1,  # Center alignment
-                spaceBefore=15
-            )
-            elements.append(Paragraph(f"Data accurate as of {datetime.now().strftime('%Y-%m-%d %H:%M')}", note_style))
-        
-        else:
-            # No data message
-            elements.append(Paragraph("No data available for this report", 
-                ParagraphStyle(
-                    name='NoData',
-                    fontSize=12,
-                    alignment=1,
-                    spaceBefore=30,
-                    spaceAfter=30,
-                    textColor=colors.gray
-                )
-            ))
-        
-        # Define header and footer function
-        def header_footer(canvas, doc):
-            # Save canvas state
-            canvas.saveState()
-            
-            # Get page dimensions
-            width, height = landscape(A4)
-            
-            # Draw top header bar
-            canvas.setFillColor(corporate_dark_blue)
-            canvas.rect(0, height - 60, width, 60, fill=1, stroke=0)
-            
-            # Add logo/title text
-            canvas.setFillColor(colors.white)
-            canvas.setFont("Helvetica-Bold", 22)
-            canvas.drawString(doc.leftMargin, height - 35, "LCODE - INFINITE POSSIBILITIES")
-            
-            # Add report title
-            canvas.setFont("Helvetica-Bold", 16)
-            canvas.drawRightString(width - doc.rightMargin, height - 30, report_title)
-            
-            # Add timestamp
-            canvas.setFont("Helvetica", 10)
-            canvas.drawRightString(width - doc.rightMargin, height - 45, 
-                               f"Generated on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-            
-            # Add footer
-            canvas.setStrokeColor(corporate_dark_blue)
-            canvas.setLineWidth(1)
-            canvas.line(doc.leftMargin, 40, width - doc.rightMargin, 40)
-            
-            # Footer text
-            canvas.setFont("Helvetica-Bold", 9)
-            canvas.setFillColor(corporate_dark_blue)
-            canvas.drawString(doc.leftMargin, 25, "LCODE")
-            
-            # Page number
-            canvas.drawRightString(width - doc.rightMargin, 25, f"Page {canvas.getPageNumber()}")
-            
-            # Center text
-            canvas.setFillColor(colors.gray)
-            canvas.setFont("Helvetica", 8)
-            canvas.drawCentredString(width/2, 25, f"Powered by LCODE • {datetime.now().strftime('%Y-%m-%d')}")
-            
-            # Restore canvas state
-            canvas.restoreState()
-        
-        # Build PDF with header/footer
-        doc.build(elements, onFirstPage=header_footer, onLaterPages=header_footer)
-        
-        # Prepare response
-        buffer.seek(0)
-        response = make_response(buffer.getvalue())
-        response.headers['Content-Type'] = 'application/pdf'
-        response.headers['Content-Disposition'] = f'attachment; filename="{report_title.replace(" ", "_")}.pdf"'
-        response.headers['Access-Control-Allow-Origin'] = '*'
-        
-        return response
-        
-    except Exception as e:
-        logger.error(f"PDF generation error: {str(e)}")
-        logger.error(traceback.format_exc())
-        return jsonify({"error": f"Failed to generate PDF: {str(e)}"}), 500
+            connection.close()
+            
+            
 
 @app.route('/api/download-client-report/<format>', methods=['GET'])
 def download_client_report(format):
@@ -3950,76 +4735,20 @@ def download_client_report(format):
     
     print(f"Downloading client report in {format} format with clientId: '{client_id}'")
     
-    conn = get_db_connection()
-    if conn is None:
-        print("Database connection failed when downloading client report")
-        return jsonify({"error": "Database connection failed"}), 500
+    if wants_async_report():
+        return submit_report_job_response('client', format, client_id, 'report', filter_params)
     
-    try:
-        cursor = conn.cursor(dictionary=True)
-        
-        if client_id:
-            print(f"Fetching specific client with ID: {client_id}")
-            query = """
-            SELECT client_id, client_name, client_description, client_address, 
-                  communication_email, contact_name, contact_designation,
-                  contact_mobile, contact_email, reporting_to
-            FROM clients
-            WHERE client_id = %s
-            """
-            cursor.execute(query, (client_id,))
-        else:
-            print("Fetching all clients (up to 1000 records)")
-            query = """
-            SELECT client_id, client_name, client_description, client_address, 
-                  communication_email, contact_name, contact_designation,
-                  contact_mobile, contact_email, reporting_to
-            FROM clients
-            LIMIT 1000
-            """
-            cursor.execute(query)
-        
-        # Use dictionary cursor to get clients
-        clients = cursor.fetchall()
-        
-        # If no clients found, return an error
-        if not clients:
-            return jsonify({"error": "No clients found with the given criteria"}), 404
-        
-        # Format dates for display
-        formatted_clients = []
-        for client in clients:
-            formatted_client = {}
-            for key, value in client.items():
-                if isinstance(value, datetime):
-                    formatted_client[key] = value.strftime('%Y-%m-%d')
-                else:
-                    formatted_client[key] = value
-            formatted_clients.append(formatted_client)
-        
-        log_download(
-            report_type='client',
-            entity_id=client_id if client_id else None,
-            download_format=format.lower(),
-            record_count=len(formatted_clients),
-            filter_params=filter_params
+    # Full exports are streamed; ID lookups are cached like the other formats
+    if format.lower() == 'csv' and not client_id:
+        return stream_report_csv(
+            'client', f"SELECT {CLIENT_REPORT_COLUMNS} FROM clients", (),
+            'client_report', None, filter_params
         )
-        
-        if format.lower() == 'csv':
-            return generate_csv_report(formatted_clients, 'client_report')
-        elif format.lower() == 'pdf':
-            return generate_pdf_report(formatted_clients, 'Client Report')
-        else:
-            return jsonify({"error": "Invalid format. Use 'csv' or 'pdf'"}), 400
-            
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
-    finally:
-        if conn.is_connected():
-            cursor.close()
-            conn.close()
+    
+    return send_report('client', format, client_id, 'report', filter_params)
 
 @app.route('/get_task_status_history/<task_id>', methods=['GET'])
+@json_formats
 def get_task_status_history(task_id):
     """Get status history for a specific task"""
     try:
@@ -4040,14 +4769,6 @@ def get_task_status_history(task_id):
         """, (task_id,))
         
         status_history = cursor.fetchall()
-        
-        # Format dates for JSON response
-        for status in status_history:
-            for key, value in status.items():
-                if isinstance(value, datetime):
-                    status[key] = value.strftime('%Y-%m-%d %H:%M:%S')
-                elif isinstance(value, date):
-                    status[key] = value.strftime('%Y-%m-%d')
 
         cursor.close()
         connection.close()
@@ -4082,32 +4803,8 @@ def get_employee_incomplete_tasks(employee_id):
             
             allocations = cursor.fetchall()
             
-            # Get the latest status of these tasks from task_update table
-            task_statuses = {}
-            if allocations:
-                # Extract task IDs
-                task_ids = [allocation['task_id'] for allocation in allocations]
-                
-                # Build placeholders for SQL IN clause
-                placeholders = ', '.join(['%s'] * len(task_ids))
-                
-                # Query for latest status updates
-                cursor.execute(f"""
-                    SELECT t1.task_id, t1.task_name, t1.task_status, t1.reason, t1.created_at
-                    FROM task_update t1
-                    INNER JOIN (
-                        SELECT task_id, MAX(created_at) as max_date
-                        FROM task_update
-                        WHERE task_id IN ({placeholders})
-                        GROUP BY task_id
-                    ) t2 ON t1.task_id = t2.task_id AND t1.created_at = t2.max_date
-                """, task_ids)
-                
-                status_results = cursor.fetchall()
-                
-                # Store as dictionary for easy lookup
-                for status in status_results:
-                    task_statuses[status['task_id']] = status
+            # Get the latest status of these tasks from the task_current_status projection
+            task_statuses = current_statuses(cursor, [allocation['task_id'] for allocation in allocations])
             
             # Now, merge allocation and status data
             incomplete_tasks = []
@@ -4128,7 +4825,7 @@ def get_employee_incomplete_tasks(employee_id):
                 if task_id in task_statuses:
                     task['task_status'] = task_statuses[task_id]['task_status']
                     task['reason'] = task_statuses[task_id]['reason']
-                    task['updated_at'] = task_statuses[task_id]['created_at'].strftime('%Y-%m-%d %H:%M:%S') if isinstance(task_statuses[task_id]['created_at'], datetime) else task_statuses[task_id]['created_at']
+                    task['updated_at'] = task_statuses[task_id]['updated_at'].strftime('%Y-%m-%d %H:%M:%S') if isinstance(task_statuses[task_id]['updated_at'], datetime) else task_statuses[task_id]['updated_at']
                 else:
                     task['task_status'] = 'Assigned'
                     task['reason'] = None
@@ -4149,12 +4846,12 @@ def get_employee_incomplete_tasks(employee_id):
                 
                 incomplete_tasks.append(task)
             
-            # Now check for tasks in task_update table directly tied to this employee
+            # Now check for tasks whose latest status update is tied to this employee
             cursor.execute("""
-                SELECT task_id, task_name, task_status, reason, created_at 
-                FROM task_update
+                SELECT task_id, task_name, task_status, reason, updated_at AS created_at
+                FROM task_current_status
                 WHERE employee_id = %s AND task_status != 'Completed'
-                ORDER BY created_at DESC
+                ORDER BY updated_at DESC
             """, (employee_id,))
             
             direct_tasks = cursor.fetchall()
@@ -4258,6 +4955,8 @@ def submit_timesheet():
         
         cursor.execute(insert_query, values)
         entry_id = cursor.lastrowid
+        sync_entry_task_lines(cursor, entry_id)
+        refresh_rollups(cursor, [(data['employeeId'], data['entryDate'])])
         conn.commit()
         
         cursor.close()
@@ -4273,7 +4972,16 @@ def submit_timesheet():
         print(f"Error submitting timesheet: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+TIMESHEET_ENTRY_LIST_SPEC = ListSpec({
+    field: field for field in (
+        'entry_id', 'employee_id', 'employee_name', 'entry_date', 'in_time', 'out_time',
+        'total_hours', 'assigned_tasks', 'misc_tasks', 'status', 'approved_by',
+        'approval_date', 'rejection_reason', 'created_at', 'updated_at'
+    )
+}, primary_key='entry_id', default_sort='-entry_date', select_all='*')
+
 @app.route('/api/timesheet/entries/<employee_id>', methods=['GET'])
+@json_formats
 def get_employee_timesheets(employee_id):
     """Get all timesheet entries for a specific employee"""
     try:
@@ -4289,73 +4997,26 @@ def get_employee_timesheets(employee_id):
         cursor = conn.cursor(dictionary=True)
         
         # Build query with optional filters
-        query = "SELECT * FROM time_sheet_entries WHERE employee_id = %s"
+        where = ["employee_id = %s"]
         params = [employee_id]
         
         if start_date:
-            query += " AND entry_date >= %s"
+            where.append("entry_date >= %s")
             params.append(start_date)
         
         if end_date:
-            query += " AND entry_date <= %s"
+            where.append("entry_date <= %s")
             params.append(end_date)
         
         if status:
-            query += " AND status = %s"
+            where.append("status = %s")
             params.append(status)
         
-        query += " ORDER BY entry_date DESC"
-        
-        cursor.execute(query, params)
-        entries = cursor.fetchall()
+        entries, page = run_list_query(cursor, TIMESHEET_ENTRY_LIST_SPEC, request.args,
+                                       "FROM time_sheet_entries", where, params)
         
-        # Convert dates and JSON strings to appropriate formats
-        for entry in entries:
-            if 'entry_date' in entry and entry['entry_date']:
-                entry['entry_date'] = entry['entry_date'].strftime('%Y-%m-%d')
-            
-            # Format TIME fields that might be timedelta objects
-            if 'in_time' in entry and entry['in_time']:
-                if hasattr(entry['in_time'], 'strftime'):
-                    entry['in_time'] = entry['in_time'].strftime('%H:%M:%S')
-                elif hasattr(entry['in_time'], 'total_seconds'):
-                    # Handle timedelta objects
-                    total_seconds = int(entry['in_time'].total_seconds())
-                    hours, remainder = divmod(total_seconds, 3600)
-                    minutes, seconds = divmod(remainder, 60)
-                    entry['in_time'] = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
-            
-            if 'out_time' in entry and entry['out_time']:
-                if hasattr(entry['out_time'], 'strftime'):
-                    entry['out_time'] = entry['out_time'].strftime('%H:%M:%S')
-                elif hasattr(entry['out_time'], 'total_seconds'):
-                    # Handle timedelta objects
-                    total_seconds = int(entry['out_time'].total_seconds())
-                    hours, remainder = divmod(total_seconds, 3600)
-                    minutes, seconds = divmod(remainder, 60)
-                    entry['out_time'] = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
-            
-            if 'approval_date' in entry and entry['approval_date']:
-                entry['approval_date'] = entry['approval_date'].strftime('%Y-%m-%d %H:%M:%S')
-            
-            if 'created_at' in entry and entry['created_at']:
-                entry['created_at'] = entry['created_at'].strftime('%Y-%m-%d %H:%M:%S')
-            
-            if 'updated_at' in entry and entry['updated_at']:
-                entry['updated_at'] = entry['updated_at'].strftime('%Y-%m-%d %H:%M:%S')
-            
-            # Parse JSON fields
-            if 'assigned_tasks' in entry and entry['assigned_tasks']:
-                try:
-                    entry['assigned_tasks'] = json.loads(entry['assigned_tasks'])
-                except:
-                    entry['assigned_tasks'] = []
-            
-            if 'misc_tasks' in entry and entry['misc_tasks']:
-                try:
-                    entry['misc_tasks'] = json.loads(entry['misc_tasks'])
-                except:
-                    entry['misc_tasks'] = []
+        # Dates and TIME columns are formatted by jsonify()
+        raw_json_columns(entries, 'assigned_tasks', 'misc_tasks')
         
         cursor.close()
         conn.close()
@@ -4363,13 +5024,16 @@ def get_employee_timesheets(employee_id):
         return jsonify({
             'success': True,
             'entries': entries
-        })
+        }), 200, page_headers(page)
         
+    except PaginationError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         print(f"Error retrieving timesheet entries: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/timesheet/entry/<entry_id>', methods=['GET'])
+@json_formats
 def get_timesheet_entry(entry_id):
     """Get a specific timesheet entry by ID"""
     try:
@@ -4387,52 +5051,8 @@ def get_timesheet_entry(entry_id):
         if not entry:
             return jsonify({'success': False, 'error': 'Timesheet entry not found'}), 404
         
-        # Format dates
-        if 'entry_date' in entry and entry['entry_date']:
-            entry['entry_date'] = entry['entry_date'].strftime('%Y-%m-%d')
-        
-        # Format TIME fields that might be timedelta objects
-        if 'in_time' in entry and entry['in_time']:
-            if hasattr(entry['in_time'], 'strftime'):
-                entry['in_time'] = entry['in_time'].strftime('%H:%M:%S')
-            elif hasattr(entry['in_time'], 'total_seconds'):
-                # Handle timedelta objects
-                total_seconds = int(entry['in_time'].total_seconds())
-                hours, remainder = divmod(total_seconds, 3600)
-                minutes, seconds = divmod(remainder, 60)
-                entry['in_time'] = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
-        
-        if 'out_time' in entry and entry['out_time']:
-            if hasattr(entry['out_time'], 'strftime'):
-                entry['out_time'] = entry['out_time'].strftime('%H:%M:%S')
-            elif hasattr(entry['out_time'], 'total_seconds'):
-                # Handle timedelta objects
-                total_seconds = int(entry['out_time'].total_seconds())
-                hours, remainder = divmod(total_seconds, 3600)
-                minutes, seconds = divmod(remainder, 60)
-                entry['out_time'] = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
-        
-        if 'approval_date' in entry and entry['approval_date']:
-            entry['approval_date'] = entry['approval_date'].strftime('%Y-%m-%d %H:%M:%S')
-        
-        if 'created_at' in entry and entry['created_at']:
-            entry['created_at'] = entry['created_at'].strftime('%Y-%m-%d %H:%M:%S')
-        
-        if 'updated_at' in entry and entry['updated_at']:
-            entry['updated_at'] = entry['updated_at'].strftime('%Y-%m-%d %H:%M:%S')
-        
-        # Parse JSON fields
-        if 'assigned_tasks' in entry and entry['assigned_tasks']:
-            try:
-                entry['assigned_tasks'] = json.loads(entry['assigned_tasks'])
-            except:
-                entry['assigned_tasks'] = []
-        
-        if 'misc_tasks' in entry and entry['misc_tasks']:
-            try:
-                entry['misc_tasks'] = json.loads(entry['misc_tasks'])
-            except:
-                entry['misc_tasks'] = []
+        # Dates and TIME columns are formatted by jsonify()
+        raw_json_columns([entry], 'assigned_tasks', 'misc_tasks')
         
         cursor.close()
         conn.close()
@@ -4446,6 +5066,9 @@ def get_timesheet_entry(entry_id):
         print(f"Error retrieving timesheet entry: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+# Entry fields copied into time_sheet_task_lines; changing any of them rewrites the lines
+TIMESHEET_LINE_FIELDS = ('assignedTasks', 'miscTasks', 'employeeId', 'entryDate')
+
 @app.route('/api/timesheet/entry/<entry_id>', methods=['PUT'])
 def update_timesheet_entry(entry_id):
     """Update an existing timesheet entry"""
@@ -4459,8 +5082,9 @@ def update_timesheet_entry(entry_id):
         cursor = conn.cursor()
         
         # Check if entry exists
-        cursor.execute("SELECT entry_id FROM time_sheet_entries WHERE entry_id = %s", (entry_id,))
-        if not cursor.fetchone():
+        cursor.execute("SELECT employee_id, entry_date FROM time_sheet_entries WHERE entry_id = %s", (entry_id,))
+        previous = cursor.fetchone()
+        if not previous:
             cursor.close()
             conn.close()
             return jsonify({'success': False, 'error': 'Timesheet entry not found'}), 404
@@ -4530,6 +5154,13 @@ def update_timesheet_entry(entry_id):
         params.append(entry_id)
         
         cursor.execute(update_query, params)
+        if any(field in data for field in TIMESHEET_LINE_FIELDS):
+            sync_entry_task_lines(cursor, entry_id)
+            # The entry may have moved to another employee or date
+            current = (data.get('employeeId', previous[0]), data.get('entryDate', previous[1]))
+            refresh_rollups(cursor, [previous, current])
+        elif 'status' in data:
+            refresh_rollups(cursor, [previous])
         conn.commit()
         
         cursor.close()
@@ -4564,8 +5195,9 @@ def update_timesheet_status(entry_id):
         cursor = conn.cursor()
         
         # Check if entry exists
-        cursor.execute("SELECT entry_id FROM time_sheet_entries WHERE entry_id = %s", (entry_id,))
-        if not cursor.fetchone():
+        cursor.execute("SELECT employee_id, entry_date FROM time_sheet_entries WHERE entry_id = %s", (entry_id,))
+        entry = cursor.fetchone()
+        if not entry:
             cursor.close()
             conn.close()
             return jsonify({'success': False, 'error': 'Timesheet entry not found'}), 404
@@ -4595,6 +5227,8 @@ def update_timesheet_status(entry_id):
         params.append(entry_id)
         
         cursor.execute(update_query, params)
+        # Approved hours in the rollups follow the entry status
+        refresh_rollups(cursor, [entry])
         conn.commit()
         
         cursor.close()
@@ -4609,7 +5243,15 @@ def update_timesheet_status(entry_id):
         print(f"Error updating timesheet status: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+PENDING_TIMESHEET_LIST_SPEC = ListSpec({
+    field: field for field in (
+        'entry_id', 'employee_id', 'employee_name', 'entry_date',
+        'total_hours', 'created_at', 'updated_at'
+    )
+}, primary_key='entry_id', default_sort='-entry_date')
+
 @app.route('/api/timesheet/pending-approval', methods=['GET'])
+@json_formats
 def get_pending_timesheets():
     """Get all timesheet entries pending approval"""
     try:
@@ -4619,60 +5261,179 @@ def get_pending_timesheets():
         
         cursor = conn.cursor(dictionary=True)
         
-        query = """
-            SELECT entry_id, employee_id, employee_name, entry_date, 
-                   total_hours, created_at, updated_at
-            FROM time_sheet_entries 
-            WHERE status = 'submitted'
-            ORDER BY entry_date DESC
-        """
+        entries, page = run_list_query(cursor, PENDING_TIMESHEET_LIST_SPEC, request.args,
+                                       "FROM time_sheet_entries", ["status = 'submitted'"])
         
-        cursor.execute(query)
-        entries = cursor.fetchall()
+        cursor.close()
+        conn.close()
         
-        # Format dates
-        for entry in entries:
-            if 'entry_date' in entry and entry['entry_date']:
-                entry['entry_date'] = entry['entry_date'].strftime('%Y-%m-%d')
-            
-            # Format TIME fields that might be timedelta objects
-            if 'in_time' in entry and entry['in_time']:
-                if hasattr(entry['in_time'], 'strftime'):
-                    entry['in_time'] = entry['in_time'].strftime('%H:%M:%S')
-                elif hasattr(entry['in_time'], 'total_seconds'):
-                    # Handle timedelta objects
-                    total_seconds = int(entry['in_time'].total_seconds())
-                    hours, remainder = divmod(total_seconds, 3600)
-                    minutes, seconds = divmod(remainder, 60)
-                    entry['in_time'] = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
-            
-            if 'out_time' in entry and entry['out_time']:
-                if hasattr(entry['out_time'], 'strftime'):
-                    entry['out_time'] = entry['out_time'].strftime('%H:%M:%S')
-                elif hasattr(entry['out_time'], 'total_seconds'):
-                    # Handle timedelta objects
-                    total_seconds = int(entry['out_time'].total_seconds())
-                    hours, remainder = divmod(total_seconds, 3600)
-                    minutes, seconds = divmod(remainder, 60)
-                    entry['out_time'] = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
-            
-            if 'created_at' in entry and entry['created_at']:
-                entry['created_at'] = entry['created_at'].strftime('%Y-%m-%d %H:%M:%S')
-            
-            if 'updated_at' in entry and entry['updated_at']:
-                entry['updated_at'] = entry['updated_at'].strftime('%Y-%m-%d %H:%M:%S')
+        return jsonify({
+            'success': True,
+            'entries': entries
+        }), 200, page_headers(page)
+        
+    except PaginationError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        print(f"Error retrieving pending timesheets: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+# Hours aggregated from time_sheet_task_lines; group -> (SELECT list, GROUP BY, extra condition)
+TIMESHEET_HOURS_GROUPS = {
+    'task': ("""
+        l.task_id, MAX(l.task_name) AS task_name, MAX(l.project_id) AS project_id,
+        SUM(l.time_spent) AS hours, COUNT(DISTINCT l.entry_id) AS entries,
+        COUNT(DISTINCT l.employee_id) AS employees
+    """, "l.task_id", "l.line_type = 'assigned' AND l.task_id IS NOT NULL"),
+    'project': ("""
+        l.project_id, SUM(l.time_spent) AS hours, COUNT(DISTINCT l.task_id) AS tasks,
+        COUNT(DISTINCT l.entry_id) AS entries, COUNT(DISTINCT l.employee_id) AS employees
+    """, "l.project_id", "l.line_type = 'assigned' AND l.project_id IS NOT NULL"),
+    'employee': ("""
+        l.employee_id,
+        SUM(CASE WHEN l.line_type = 'assigned' THEN l.time_spent ELSE 0 END) AS assigned_hours,
+        SUM(CASE WHEN l.line_type = 'misc' THEN l.time_spent ELSE 0 END) AS misc_hours,
+        SUM(l.time_spent) AS hours, COUNT(DISTINCT l.entry_id) AS entries
+    """, "l.employee_id", None),
+}
+
+@app.route('/api/timesheet/hours/by-<group>', methods=['GET'])
+def get_timesheet_hours(group):
+    """
+    Hours per task, project or employee for a date range.
+
+    Query parameters: startDate and endDate (YYYY-MM-DD, default the current
+    month), optional employeeId, projectId, taskId and status (entry status).
+    """
+    if group not in TIMESHEET_HOURS_GROUPS:
+        return jsonify({'success': False, 'error': "Group must be 'task', 'project' or 'employee'"}), 400
+    
+    today = date.today()
+    try:
+        start_date = datetime.strptime(request.args.get('startDate') or today.replace(day=1).isoformat(),
+                                       '%Y-%m-%d').date()
+        end_date = datetime.strptime(request.args.get('endDate') or today.isoformat(), '%Y-%m-%d').date()
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Dates must be YYYY-MM-DD'}), 400
+    
+    select_sql, group_by, condition = TIMESHEET_HOURS_GROUPS[group]
+    where = ["l.entry_date BETWEEN %s AND %s"]
+    params = [start_date, end_date]
+    if condition:
+        where.append(condition)
+    for arg, column in (('employeeId', 'l.employee_id'), ('projectId', 'l.project_id'), ('taskId', 'l.task_id')):
+        if request.args.get(arg):
+            where.append(f"{column} = %s")
+            params.append(request.args.get(arg))
+    
+    from_sql = "FROM time_sheet_task_lines l"
+    if request.args.get('status'):
+        from_sql += " JOIN time_sheet_entries e ON e.entry_id = l.entry_id"
+        where.append("e.status = %s")
+        params.append(request.args.get('status'))
+    
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({'success': False, 'error': 'Database connection failed'}), 500
         
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(f"""
+            SELECT {select_sql}
+            {from_sql}
+            WHERE {' AND '.join(where)}
+            GROUP BY {group_by}
+            ORDER BY hours DESC
+        """, params)
+        rows = cursor.fetchall()
         cursor.close()
         conn.close()
         
+        for row in rows:
+            for key in ('hours', 'assigned_hours', 'misc_hours'):
+                if row.get(key) is not None:
+                    row[key] = float(row[key])
+        
         return jsonify({
             'success': True,
-            'entries': entries
+            'group': group,
+            'startDate': start_date.strftime('%Y-%m-%d'),
+            'endDate': end_date.strftime('%Y-%m-%d'),
+            'totalHours': round(sum(row['hours'] for row in rows), 2),
+            'rows': rows
         })
         
     except Exception as e:
-        print(f"Error retrieving pending timesheets: {e}")
+        print(f"Error aggregating timesheet hours: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.cli.command('backfill-timesheet-lines')
+def backfill_timesheet_lines_command():
+    """Rebuild time_sheet_task_lines from the JSON task columns of time_sheet_entries"""
+    conn = get_db_connection()
+    if not conn:
+        print("Database connection failed.")
+        return
+    try:
+        cursor = conn.cursor()
+        cursor.execute(CREATE_TASK_LINES_TABLE)
+        cursor.close()
+        result = backfill_task_lines(conn)
+        print(f"Backfilled {result['lines']} task lines from {result['entries']} timesheet entries")
+    finally:
+        conn.close()
+
+@app.cli.command('rebuild-timesheet-rollups')
+def rebuild_timesheet_rollups_command():
+    """Regenerate the daily/weekly/monthly timesheet rollup tables"""
+    conn = get_db_connection()
+    if not conn:
+        print("Database connection failed.")
+        return
+    try:
+        counts = rebuild_rollups(conn)
+        for period, count in counts.items():
+            print(f"Rebuilt {ROLLUP_TABLES[period]}: {count} rows")
+    finally:
+        conn.close()
+
+@app.route('/api/timesheet/rollups/<employee_id>', methods=['GET'])
+def get_timesheet_rollups(employee_id):
+    """
+    Hours of one employee for recent days, weeks or months, read from the
+    rollup tables.
+
+    Query params: period (day|week|month, default month), date (any day of the
+    latest period, default today), count (number of periods, default 1, max 24)
+    and projectId (default: all projects).
+    """
+    period = request.args.get('period', 'month')
+    if period not in ROLLUP_TABLES:
+        return jsonify({'success': False, 'error': 'period must be one of: day, week, month'}), 400
+    try:
+        day = datetime.strptime(request.args['date'], '%Y-%m-%d').date() if request.args.get('date') else date.today()
+        count = min(max(int(request.args.get('count', 1)), 1), 24)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'date must be YYYY-MM-DD and count a number'}), 400
+    project_id = request.args.get('projectId') or ALL_PROJECTS
+    
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'success': False, 'error': 'Database connection failed'}), 500
+    cursor = conn.cursor()
+    try:
+        periods = []
+        for _ in range(count):
+            row = read_rollup(cursor, employee_id, period, day, project_id)
+            periods.append(row)
+            day = datetime.strptime(row['periodStart'], '%Y-%m-%d').date() - timedelta(days=1)
+        return jsonify({'success': True, 'employeeId': employee_id, 'periods': periods})
+    except Exception as e:
+        print(f"Error reading timesheet rollups: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
+    finally:
+        cursor.close()
+        conn.close()
 
 @app.route('/api/timesheet/project-mappings/<employee_id>', methods=['GET'])
 def get_timesheet_project_mappings(employee_id):
@@ -4719,6 +5480,7 @@ def get_timesheet_project_mappings(employee_id):
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/get_role_allocation/<allocation_id>', methods=['GET'])
+@json_formats
 def get_role_allocation(allocation_id):
     """Get a specific role allocation by ID"""
     try:
@@ -4739,10 +5501,6 @@ def get_role_allocation(allocation_id):
         if not allocation:
             return jsonify({"error": "Role allocation not found"}), 404
         
-        # Format dates for consistent output
-        if 'allocated_date' in allocation and allocation['allocated_date']:
-            allocation['allocated_date'] = allocation['allocated_date'].strftime('%Y-%m-%d')
-        
         cursor.close()
         conn.close()
         
@@ -4752,10 +5510,17 @@ def get_role_allocation(allocation_id):
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/role_allocations', methods=['GET'])
+@json_formats
 def get_role_allocations():
-    """Get all role allocations with optional filtering"""
+    """
+    Get all role allocations with optional filtering.
+    
+    Pass include_stats=1 to also get the global counters (total, recent,
+    roleDistribution); paging without it only runs the filtered query.
+    """
     try:
         # Get query parameters for filtering
+        include_stats = request.args.get('include_stats', '').lower() in ('1', 'true', 'yes')
         employee_id = request.args.get('employee_id')
         role_id = request.args.get('role_id')
         from_date = request.args.get('from_date')
@@ -4796,40 +5561,14 @@ def get_role_allocations():
         cursor.execute(query, params)
         allocations = cursor.fetchall()
         
-        # Format dates for JSON response
-        for allocation in allocations:
-            if 'allocated_date' in allocation and allocation['allocated_date']:
-                allocation['allocated_date'] = allocation['allocated_date'].strftime('%Y-%m-%d')
-            if 'created_at' in allocation and allocation['created_at']:
-                allocation['created_at'] = allocation['created_at'].strftime('%Y-%m-%d %H:%M:%S')
-        
-        # Get counts for statistics
-        cursor.execute("SELECT COUNT(*) as total FROM employee_role_allocations")
-        total_count = cursor.fetchone()['total']
-        
-        # Count recent allocations (last 30 days)
-        cursor.execute(
-            "SELECT COUNT(*) as recent FROM employee_role_allocations WHERE allocated_date >= DATE_SUB(CURDATE(), INTERVAL 30 DAY)"
-        )
-        recent_count = cursor.fetchone()['recent']
-        
-        # Count by role for distribution
-        cursor.execute(
-            "SELECT role_id, COUNT(*) as count FROM employee_role_allocations GROUP BY role_id ORDER BY count DESC"
-        )
-        role_distribution = cursor.fetchall()
+        response = {"allocations": allocations}
+        if include_stats:
+            response["stats"] = read_allocation_stats(cursor)
         
         cursor.close()
         conn.close()
         
-        return jsonify({
-            "allocations": allocations,
-            "stats": {
-                "total": total_count,
-                "recent": recent_count,
-                "roleDistribution": role_distribution
-            }
-        }), 200
+        return jsonify(response), 200
     except Exception as e:
         print(f"Error getting role allocations: {e}")
         return jsonify({"error": str(e)}), 500
@@ -4860,8 +5599,10 @@ def update_role_allocation():
         cursor = conn.cursor()
         
         # Check if allocation exists
-        cursor.execute("SELECT id FROM employee_role_allocations WHERE id = %s", (allocation_id,))
-        if not cursor.fetchone():
+        cursor.execute("SELECT allocated_date, role_id, employee_id FROM employee_role_allocations "
+                       "WHERE id = %s FOR UPDATE", (allocation_id,))
+        previous = cursor.fetchone()
+        if not previous:
             cursor.close()
             conn.close()
             return jsonify({"error": "Role allocation not found"}), 404
@@ -4888,7 +5629,12 @@ def update_role_allocation():
             allocation_id
         ))
         
+        # Move the allocation between counters
+        count_allocation(cursor, previous[0], previous[1], -1)
+        count_allocation(cursor, allocated_date, role_id, 1)
+        
         conn.commit()
+        refresh_reporting_lines(cursor, previous[2], employee_id)
         cursor.close()
         conn.close()
         
@@ -4907,48 +5653,174 @@ def get_role_allocations_stats():
         
         cursor = conn.cursor(dictionary=True)
         
-        # Get total count
-        cursor.execute("SELECT COUNT(*) as total FROM employee_role_allocations")
-        total_count = cursor.fetchone()['total']
-        
-        # Get recent count (last 30 days)
-        cursor.execute(
-            "SELECT COUNT(*) as recent FROM employee_role_allocations WHERE allocated_date >= DATE_SUB(CURDATE(), INTERVAL 30 DAY)"
-        )
-        recent_count = cursor.fetchone()['recent']
-        
-        # Get role distribution
-        cursor.execute(
-            "SELECT role_id, COUNT(*) as count FROM employee_role_allocations GROUP BY role_id ORDER BY count DESC LIMIT 5"
-        )
-        role_distribution = cursor.fetchall()
+        # Counters maintained by the allocation write routes
+        stats = read_allocation_stats(cursor, top=5)
         
         # Get trend data (allocations per month for the last 6 months)
-        cursor.execute("""
-            SELECT 
-                DATE_FORMAT(allocated_date, '%Y-%m') as month,
-                COUNT(*) as count
-            FROM employee_role_allocations
-            WHERE allocated_date >= DATE_SUB(CURDATE(), INTERVAL 6 MONTH)
-            GROUP BY DATE_FORMAT(allocated_date, '%Y-%m')
-            ORDER BY month
-        """)
-        trend_data = cursor.fetchall()
+        trend_data = allocation_trend(cursor, months=6)
         
         cursor.close()
         conn.close()
         
         return jsonify({
-            "total": total_count,
-            "recent": recent_count,
+            "total": stats["total"],
+            "recent": stats["recent"],
             "pending": 0,  # Placeholder for future implementation
-            "roleDistribution": role_distribution,
+            "roleDistribution": stats["roleDistribution"],
             "trend": trend_data
         }), 200
     except Exception as e:
         print(f"Error getting role allocation stats: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.cli.command('rebuild-allocation-stats')
+def rebuild_allocation_stats_command():
+    """Recount the role allocation counters from employee_role_allocations"""
+    conn = get_db_connection()
+    if not conn:
+        print("Database connection failed.")
+        return
+    try:
+        counts = rebuild_allocation_stats(conn)
+        for table, count in counts.items():
+            print(f"Rebuilt {table}: {count} rows")
+    finally:
+        conn.close()
+
+# ================== REPORTING LINES ==================
+
+# Who reports to whom, from the reporting_person of each employee's latest
+# role allocation, kept in memory with its closure. The allocation write
+# routes re-read the latest allocation of the employees they touch.
+def resolve_manager_id(raw_id):
+    # Exact or normalized ('emp-001') matches only: a deleted or mistyped
+    # manager stays its own root instead of being attached to a look-alike
+    return canonical_id('employee', raw_id, max_tier=NORMALIZED)
+
+def load_reporting_rows():
+    conn = get_db_connection()
+    if not conn:
+        raise Error("Database connection failed")
+    cursor = conn.cursor()
+    try:
+        return reporting_rows(manager_lines(fetch_latest_allocations(cursor), resolve_manager_id))
+    finally:
+        cursor.close()
+        conn.close()
+
+reporting_graph = ReportingGraphService(load_reporting_rows, ttl=float(os.environ.get('REPORTING_GRAPH_TTL', 300)))
+
+def refresh_reporting_lines(cursor, *employee_ids):
+    """Apply the latest allocations of some employees; a failure drops the graph so it reloads"""
+    employee_ids = [e for e in employee_ids if e]
+    try:
+        allocations = fetch_latest_allocations(cursor, employee_ids)
+        reporting_graph.apply_allocations(manager_lines(allocations, resolve_manager_id), employee_ids)
+    except Error as e:
+        print(f"Error updating reporting lines for {employee_ids}: {e}")
+        reporting_graph.invalidate()
+
+def reporting_tree_for(employee_id):
+    """
+    (tree, canonical employee ID, None) or (None, None, error response) for
+    routes that look up one employee's reporting line
+    """
+    try:
+        tree = reporting_graph.tree()
+    except Error as e:
+        print(f"Error loading reporting lines: {e}")
+        return None, None, (jsonify({"error": str(e)}), 500)
+    if employee_id is None:
+        return tree, None, None
+    employee_id = canonical_id('employee', employee_id)
+    if employee_id not in tree:
+        return None, None, (jsonify({"error": "Employee has no reporting line"}), 404)
+    return tree, employee_id, None
+
+@app.route('/api/reporting-lines', methods=['GET'])
+def get_reporting_lines():
+    """Every reporting line as nested trees, one per top-level employee"""
+    tree, _, error = reporting_tree_for(None)
+    if error:
+        return error
+    return jsonify({
+        "employeeCount": len(tree),
+        "roots": [tree.nested(root) for root in tree.roots()]
+    }), 200
+
+@app.route('/api/reporting-lines/<employee_id>/direct-reports', methods=['GET'])
+def get_direct_reports(employee_id):
+    tree, employee_id, error = reporting_tree_for(employee_id)
+    if error:
+        return error
+    return jsonify({
+        "employeeId": employee_id,
+        "directReports": [tree.node(e) for e in tree.direct_reports(employee_id)]
+    }), 200
+
+@app.route('/api/reporting-lines/<employee_id>/subtree', methods=['GET'])
+def get_reporting_subtree(employee_id):
+    """
+    Everyone under an employee, nested; ?flat=true lists them instead and
+    ?depth=N stops N levels down.
+    """
+    tree, employee_id, error = reporting_tree_for(employee_id)
+    if error:
+        return error
+    try:
+        max_depth = int(request.args['depth']) if request.args.get('depth') else None
+    except ValueError:
+        return jsonify({"error": "depth must be a number"}), 400
+    if request.args.get('flat', '').lower() in ('1', 'true', 'yes'):
+        base = tree.depth(employee_id)
+        reports = [tree.node(e) for e in tree.descendants(employee_id)
+                   if max_depth is None or tree.depth(e) - base <= max_depth]
+        return jsonify({"employeeId": employee_id, "reports": reports}), 200
+    return jsonify(tree.nested(employee_id, max_depth)), 200
+
+@app.route('/api/reporting-lines/<employee_id>/chain', methods=['GET'])
+def get_reporting_chain(employee_id):
+    """Managers from the employee's own manager up to the top"""
+    tree, employee_id, error = reporting_tree_for(employee_id)
+    if error:
+        return error
+    return jsonify({
+        "employeeId": employee_id,
+        "depth": tree.depth(employee_id),
+        "chain": [tree.node(manager) for manager in tree.ancestors[employee_id]]
+    }), 200
+
+@app.route('/api/reporting-lines/headcount', methods=['GET'])
+def get_reporting_headcount():
+    """
+    Direct and total reports per manager, largest first. ?managerId= returns
+    one manager, ?top=N the N largest.
+    """
+    manager_id = request.args.get('managerId')
+    tree, manager_id, error = reporting_tree_for(manager_id)
+    if error:
+        return error
+    if manager_id is not None:
+        return jsonify(tree.headcount(manager_id)), 200
+    try:
+        top = int(request.args['top']) if request.args.get('top') else None
+    except ValueError:
+        return jsonify({"error": "top must be a number"}), 400
+    sizes = tree.subtree_sizes()
+    managers = sorted(sizes, key=lambda m: (-sizes[m], m))
+    if top:
+        managers = managers[:top]
+    return jsonify([tree.headcount(m) for m in managers]), 200
+
+@app.route('/api/reporting-lines/reload', methods=['POST'])
+def reload_reporting_lines():
+    """Rebuild the reporting lines from employee_role_allocations"""
+    try:
+        reporting_graph.reload()
+    except Error as e:
+        return jsonify({"error": str(e)}), 500
+    return jsonify(reporting_graph.stats()), 200
+
 def init_db():
     """Initialize the database with required tables"""
     conn = get_db_connection()
@@ -5051,6 +5923,7 @@ def allocate_role_api():
             additional_employee_id,
             additional_employee_name
         ))
+        count_allocation(cursor, allocated_date, role_id, 1)
         
         # Also update the employee's role in the employees table
         try:
@@ -5067,6 +5940,7 @@ def allocate_role_api():
             # Continue even if this update fails - the allocation is still valid
         
         conn.commit()
+        refresh_reporting_lines(cursor, employee_id)
         cursor.close()
         conn.close()
         
@@ -5086,15 +5960,19 @@ def delete_role_allocation(allocation_id):
         cursor = conn.cursor()
         
         # Check if allocation exists
-        cursor.execute("SELECT id FROM employee_role_allocations WHERE id = %s", (allocation_id,))
-        if not cursor.fetchone():
+        cursor.execute("SELECT allocated_date, role_id, employee_id FROM employee_role_allocations "
+                       "WHERE id = %s FOR UPDATE", (allocation_id,))
+        allocation = cursor.fetchone()
+        if not allocation:
             cursor.close()
             conn.close()
             return jsonify({"error": "Role allocation not found"}), 404
         
         # Delete the allocation
         cursor.execute("DELETE FROM employee_role_allocations WHERE id = %s", (allocation_id,))
+        count_allocation(cursor, allocation[0], allocation[1], -1)
         conn.commit()
+        refresh_reporting_lines(cursor, allocation[2])
         
         cursor.close()
         conn.close()
@@ -5191,6 +6069,7 @@ def save_timesheet_summary():
             summary_id = cursor.lastrowid
             message = 'Timesheet summary saved successfully'
         
+        refresh_rollups(cursor, [(data['employee_id'], data['entry_date'])])
         conn.commit()
         cursor.close()
         conn.close()
@@ -5205,6 +6084,145 @@ def save_timesheet_summary():
         print(f"Error saving timesheet summary: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+# Upper bound for rows accepted by the bulk summary endpoint
+TIMESHEET_SUMMARY_BULK_MAX = 1000
+
+TIMESHEET_SUMMARY_UPSERT = """
+    INSERT INTO time_sheet_summary (
+        employee_id, employee_name, task_id, task_name,
+        project_id, entry_date, in_time, out_time, total_hours
+    ) VALUES {values}
+    ON DUPLICATE KEY UPDATE
+        employee_name = VALUES(employee_name),
+        task_name = VALUES(task_name),
+        project_id = VALUES(project_id),
+        in_time = VALUES(in_time),
+        out_time = VALUES(out_time),
+        total_hours = VALUES(total_hours),
+        updated_at = CURRENT_TIMESTAMP
+"""
+
+def validate_timesheet_summary_row(row):
+    """Return (normalized values tuple, None) or (None, error message) for one summary row"""
+    if not isinstance(row, dict):
+        return None, 'Entry must be an object'
+    for field in ('employee_id', 'employee_name', 'entry_date', 'in_time', 'out_time', 'total_hours'):
+        if row.get(field) in (None, ''):
+            return None, f'Missing required field: {field}'
+    try:
+        entry_date = datetime.strptime(str(row['entry_date'])[:10], '%Y-%m-%d').date()
+    except ValueError:
+        return None, 'entry_date must be YYYY-MM-DD'
+    try:
+        total_hours = float(row['total_hours'])
+    except (TypeError, ValueError):
+        return None, 'total_hours must be a number'
+    # task_id is compared with the VARCHAR task_key, so 5 and '5' are the
+    # same task; 0 is a real ID
+    task_id = row.get('task_id')
+    task_id = None if task_id in (None, '') else str(task_id)
+    return (
+        str(row['employee_id']),
+        row['employee_name'],
+        task_id,
+        row.get('task_name'),
+        row.get('project_id'),
+        entry_date,
+        row['in_time'],
+        row['out_time'],
+        total_hours
+    ), None
+
+def summary_key(employee_id, entry_date, task_id):
+    return (str(employee_id), entry_date.strftime('%Y-%m-%d'), '' if task_id is None else str(task_id))
+
+def fetch_summary_ids(cursor, keys, lock=False):
+    """summary_id for each (employee_id, entry_date, task_key) that exists"""
+    placeholders = ', '.join(['(%s, %s, %s)'] * len(keys))
+    query = f"""
+        SELECT summary_id, employee_id, entry_date, task_key
+        FROM time_sheet_summary
+        WHERE (employee_id, entry_date, task_key) IN ({placeholders})
+    """
+    if lock:
+        query += " FOR UPDATE"
+    cursor.execute(query, [value for key in keys for value in key])
+    return {summary_key(employee_id, entry_date, task_key): summary_id
+            for summary_id, employee_id, entry_date, task_key in cursor.fetchall()}
+
+@app.route('/api/timesheet-summary/bulk', methods=['POST'])
+def save_timesheet_summaries_bulk():
+    """
+    Upsert many timesheet summary rows in one transaction.
+
+    Body: {"entries": [{employee_id, employee_name, task_id, task_name, project_id,
+    entry_date, in_time, out_time, total_hours}, ...]} (a bare array is accepted too).
+    Rows are keyed on (employee_id, entry_date, task_id). The response has one
+    result per input row, in order, with status inserted, updated, duplicate
+    (a later row in the request has the same key) or error.
+    """
+    data = request.get_json(silent=True)
+    entries = data.get('entries') if isinstance(data, dict) else data
+    if not isinstance(entries, list) or not entries:
+        return jsonify({'success': False, 'error': 'entries must be a non-empty array'}), 400
+    if len(entries) > TIMESHEET_SUMMARY_BULK_MAX:
+        return jsonify({'success': False, 'error': f'At most {TIMESHEET_SUMMARY_BULK_MAX} entries per request'}), 400
+
+    results = [{'index': i} for i in range(len(entries))]
+    rows_by_key = {}
+    for i, entry in enumerate(entries):
+        values, error = validate_timesheet_summary_row(entry)
+        if error:
+            results[i].update({'status': 'error', 'error': error})
+            continue
+        key = summary_key(values[0], values[5], values[2])
+        if key in rows_by_key:
+            # The last row for a key wins, as it would with sequential saves
+            previous = rows_by_key[key][0]
+            results[previous].update({'status': 'duplicate', 'supersededBy': i})
+        rows_by_key[key] = (i, values)
+
+    if rows_by_key:
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({'success': False, 'error': 'Database connection failed'}), 500
+        cursor = conn.cursor()
+        keys = list(rows_by_key)
+        try:
+            existing = fetch_summary_ids(cursor, keys, lock=True)
+            values_sql = ', '.join(['(%s, %s, %s, %s, %s, %s, %s, %s, %s)'] * len(keys))
+            cursor.execute(TIMESHEET_SUMMARY_UPSERT.format(values=values_sql),
+                           [value for key in keys for value in rows_by_key[key][1]])
+            summary_ids = fetch_summary_ids(cursor, keys)
+            refresh_rollups(cursor, [(employee_id, entry_date) for employee_id, entry_date, _ in keys])
+            conn.commit()
+        except Error as e:
+            conn.rollback()
+            print(f"Error saving timesheet summaries: {e}")
+            for index, _ in rows_by_key.values():
+                results[index].update({'status': 'error', 'error': 'Database error'})
+            return jsonify({'success': False, 'error': str(e), 'results': results}), 500
+        finally:
+            cursor.close()
+            conn.close()
+
+        for key, (index, _) in rows_by_key.items():
+            results[index].update({
+                'status': 'updated' if key in existing else 'inserted',
+                'summary_id': summary_ids.get(key)
+            })
+
+    inserted = sum(1 for r in results if r.get('status') == 'inserted')
+    updated = sum(1 for r in results if r.get('status') == 'updated')
+    failed = sum(1 for r in results if r.get('status') == 'error')
+    return jsonify({
+        'success': failed == 0,
+        'inserted': inserted,
+        'updated': updated,
+        'failed': failed,
+        'results': results
+    }), 200
+
 @app.route('/api/timesheet-summary/<employee_id>', methods=['GET'])
 def get_timesheet_summary(employee_id):
     """Get timesheet summary entries for a specific employee"""
@@ -5286,6 +6304,7 @@ def export_employee_profile(employee_id, format):
     Returns:
         A CSV or PDF file with the employee's information
     """
+    employee_id = canonical_id('employee', employee_id)
     try:
         print(f"Exporting employee profile for ID: {employee_id} in format: {format}")
         
@@ -5621,7 +6640,7 @@ def get_employee_assignments(employee_id):
                     t.task_id,
                     t.task_name,
                     t.description,
-                    t.status as task_status,
+                    COALESCE(cs.task_status, t.status) as task_status,
                     p.project_id,
                     p.project_name,
                     ta.allocated_date as start_date,
@@ -5630,6 +6649,7 @@ def get_employee_assignments(employee_id):
                 FROM task_allocations ta
                 JOIN tasks t ON ta.task_id = t.task_id
                 LEFT JOIN projects p ON t.project_id = p.project_id
+                LEFT JOIN task_current_status cs ON cs.task_id = t.task_id
                 WHERE ta.employee_id = %s
                 ORDER BY t.target_completion_date ASC
             """, (employee_id,))
@@ -5650,22 +6670,9 @@ def get_employee_assignments(employee_id):
             # Continue with empty task_allocations rather than failing
         
         try:
-            # Get statistics data
-            current_month = datetime.now().month
-            current_year = datetime.now().year
-            
-            # Try to get monthly hours from timesheet summary
-            cursor.execute("""
-                SELECT SUM(total_hours) as total_hours
-                FROM time_sheet_summary
-            WHERE employee_id = %s
-                  AND MONTH(entry_date) = %s
-                  AND YEAR(entry_date) = %s
-            """, (employee_id, current_month, current_year))
-            
-            hours_result = cursor.fetchone()
-            if hours_result and hours_result['total_hours']:
-                response["total_monthly_hours"] = float(hours_result['total_hours'])
+            # Monthly hours from the timesheet summary rollup (primary-key lookup)
+            monthly = read_rollup(cursor, employee_id, 'month', date.today())
+            response["total_monthly_hours"] = monthly['summaryHours']
                 
             # Count active projects
             cursor.execute("""
@@ -5699,6 +6706,50 @@ def get_employee_assignments(employee_id):
             "active_tasks_count": 0
         }), 200
 
+# Map the frontend field names to database column names for PUT /api/employees/<id>
+EMPLOYEE_UPDATE_FIELDS = {
+    'firstName': 'first_name',
+    'lastName': 'last_name',
+    'first_name': 'first_name',
+    'last_name': 'last_name',
+    'dob': 'dob',
+    'gender': 'gender',
+    'nationality': 'nationality',
+    'permanentAddress': 'permanent_address',
+    'permanent_address': 'permanent_address',
+    'communicationAddress': 'communication_address',
+    'communication_address': 'communication_address',
+    'address': 'permanent_address',  # Map general address to permanent address
+    'mobile': 'mobile',
+    'altMobile': 'alt_mobile',
+    'alt_mobile': 'alt_mobile',
+    'email': 'email',
+    'qualification': 'qualification',
+    'department': 'department',
+    'emergencyContactPerson': 'emergency_contact_person',
+    'emergency_contact_person': 'emergency_contact_person',
+    'emergencyMobile': 'emergency_contact_no',
+    'emergency_mobile': 'emergency_contact_no',
+    'emergencyRelationship': 'emergency_relationship',
+    'emergency_relationship': 'emergency_relationship',
+    'fatherName': 'father_name',
+    'father_name': 'father_name',
+    'motherName': 'mother_name',
+    'mother_name': 'mother_name',
+    'maritalStatus': 'marital_status',
+    'marital_status': 'marital_status',
+    'spouseName': 'spouse_name',
+    'spouse_name': 'spouse_name',
+    'joiningLocation': 'joining_location',
+    'joining_location': 'joining_location',
+    'doj': 'doj',
+    'profile_photo': 'profile_pic',
+    'profilePic': 'profile_pic',
+    'role_name': 'role_name',
+    'roleName': 'role_name',
+    'status': 'status'
+}
+
 @app.route('/api/employees/<employee_id>', methods=['PUT'])
 def update_employee(employee_id):
     """Update an employee's details
@@ -5737,68 +6788,20 @@ def update_employee(employee_id):
         update_fields = []
         update_values = []
         
-        # Map the frontend field names to database column names
-        field_mapping = {
-            'firstName': 'first_name',
-            'lastName': 'last_name',
-            'first_name': 'first_name',
-            'last_name': 'last_name',
-            'dob': 'dob',
-            'gender': 'gender',
-            'nationality': 'nationality',
-            'permanentAddress': 'permanent_address',
-            'permanent_address': 'permanent_address',
-            'communicationAddress': 'communication_address',
-            'communication_address': 'communication_address',
-            'address': 'permanent_address',  # Map general address to permanent address
-            'mobile': 'mobile',
-            'altMobile': 'alt_mobile',
-            'alt_mobile': 'alt_mobile',
-            'email': 'email',
-            'qualification': 'qualification',
-            'department': 'department',
-            'emergencyContactPerson': 'emergency_contact_person',
-            'emergency_contact_person': 'emergency_contact_person',
-            'emergencyMobile': 'emergency_contact_no',
-            'emergency_mobile': 'emergency_contact_no',
-            'emergencyRelationship': 'emergency_relationship',
-            'emergency_relationship': 'emergency_relationship',
-            'fatherName': 'father_name',
-            'father_name': 'father_name',
-            'motherName': 'mother_name',
-            'mother_name': 'mother_name',
-            'maritalStatus': 'marital_status',
-            'marital_status': 'marital_status',
-            'spouseName': 'spouse_name',
-            'spouse_name': 'spouse_name',
-            'joiningLocation': 'joining_location',
-            'joining_location': 'joining_location',
-            'doj': 'doj',
-            'profile_photo': 'profile_pic',
-            'profilePic': 'profile_pic',
-            'role_name': 'role_name',
-            'roleName': 'role_name',
-            'status': 'status'
-        }
-        
-        # Check which columns actually exist in the employees table
-        cursor.execute("DESCRIBE employees")
-        columns = cursor.fetchall()
-        valid_columns = [col['Field'] for col in columns]
-        
-        print(f"Valid database columns: {valid_columns}")
+        # Only fields whose column exists in the employees table (cached)
+        field_mapping = schema_registry.compiled(
+            'employee_update_fields',
+            lambda registry: {key: column for key, column in EMPLOYEE_UPDATE_FIELDS.items()
+                              if registry.has_column('employees', column)}
+        )
         
         # Process each field in the request data
         for key, value in data.items():
-            # Skip fields that aren't mapped to database columns
+            # Skip fields that aren't mapped to existing database columns
             if key not in field_mapping:
                 continue
                 
             db_column = field_mapping[key]
-            
-            # Skip if the database column doesn't exist
-            if db_column not in valid_columns:
-                continue
                 
             # Add to the update query
             update_fields.append(f"{db_column} = %s")
@@ -5825,7 +6828,9 @@ def update_employee(employee_id):
         print(f"With values: {update_values}")
         
         cursor.execute(query, update_values)
+        update_search_index(cursor, 'employee', employee_id)
         conn.commit()
+        employee_name_cache.invalidate(employee_id)
                 
         # Get the updated employee data
         cursor.execute("SELECT * FROM employees WHERE employee_id = %s", (employee_id,))
@@ -5845,6 +6850,7 @@ def update_employee(employee_id):
         }), 200
         
     except Exception as e:
+        schema_registry.invalidate_on_error(e)
         print(f"Error updating employee: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
@@ -5887,26 +6893,21 @@ def upload_profile_image(employee_id):
         if file.filename == '':
             return jsonify({"error": "No file selected"}), 400
             
-        # Check if the file has an allowed extension
-        if not allowed_file(file.filename):
-            return jsonify({"error": "Invalid file type. Only PNG, JPG, JPEG allowed."}), 400
-            
-        # Generate a unique filename
-        ext = file.filename.rsplit('.', 1)[1].lower()
-        unique_name = f"profile_{employee_id}_{uuid.uuid4().hex}.{ext}"
-        
-        # Create upload folder if it doesn't exist
-        if not os.path.exists(app.config['UPLOAD_FOLDER']):
-            os.makedirs(app.config['UPLOAD_FOLDER'])
-            
-        # Save the file
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], unique_name)
-        file.save(filepath)
+        # Validate the image; the resized variants are queued after the commit
+        stem = f"profile_{secure_filename(employee_id)}_{uuid.uuid4().hex}"
+        try:
+            data = read_profile_image(file)
+        except ProfileImageError as e:
+            cursor.close()
+            conn.close()
+            return jsonify({"error": str(e)}), 400
+        unique_name = variant_name(stem, *PRIMARY_VARIANT)
         
         # Update the employee record with the new profile picture
         update_query = "UPDATE employees SET profile_pic = %s WHERE employee_id = %s"
         cursor.execute(update_query, (unique_name, employee_id))
         conn.commit()
+        queue_profile_image(stem, data)
         
         cursor.close()
         conn.close()
@@ -5915,7 +6916,9 @@ def upload_profile_image(employee_id):
         return jsonify({
             "message": "Profile image uploaded successfully",
             "filename": unique_name,
-            "url": url_for('uploaded_file', filename=unique_name, _external=True)
+            "url": url_for('uploaded_file', filename=unique_name, _external=True),
+            "variants": profile_image_variants(unique_name),
+            "processing": profile_images.is_pending(stem)
         }), 200
         
     except Exception as e:
@@ -5926,6 +6929,11 @@ def upload_profile_image(employee_id):
             conn.close()
         return jsonify({"error": str(e)}), 500
 
+EMPLOYEE_NAME_LIST_SPEC = ListSpec({
+    'id': 'employee_id',
+    'name': "CONCAT(first_name, ' ', last_name)"
+}, primary_key='id', default_sort='name')
+
 @app.route('/get_all_employees', methods=['GET'])
 def get_all_employees():
     try:
@@ -5935,19 +6943,14 @@ def get_all_employees():
         cursor = conn.cursor(dictionary=True)
         
         # Fetch all employees with their names
-        cursor.execute("""
-            SELECT 
-                employee_id as id, 
-                CONCAT(first_name, ' ', last_name) AS name
-            FROM employees
-            ORDER BY name
-        """)
-        
-        employees = cursor.fetchall()
+        employees, page = run_list_query(cursor, EMPLOYEE_NAME_LIST_SPEC, request.args, "FROM employees")
         cursor.close()
         conn.close()
         
-        return jsonify({"employees": employees})
+        return jsonify({"employees": employees}), 200, page_headers(page)
+        
+    except PaginationError as e:
+        return jsonify({"error": str(e)}), 400
         
     except mysql.connector.Error as e:
         print(f"Database error: {e}")
@@ -5962,4 +6965,9 @@ def get_all_employees():
 if __name__ == "__main__":
     # Create required tables when app starts
     create_tables()
+    # Cache the schema before serving requests
+    try:
+        schema_registry.load()
+    except Error as e:
+        print(f"Schema cache will be loaded on first use: {e}")
     app.run(debug=True, port=5000)
\ No newline at end of file
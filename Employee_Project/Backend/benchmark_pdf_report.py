@@ -0,0 +1,409 @@
+"""
+Benchmark the PDF table renderer against the previous implementation.
+
+Renders synthetic project-report rows at several sizes with both renderers
+and prints wall time, pages per second and peak Python memory (tracemalloc).
+
+Usage:
+    python benchmark_pdf_report.py [--rows 100,1000,10000] [--repeat 1]
+"""
+import argparse
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+from io import BytesIO
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import landscape, A4
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+
+from pdf_report import render_table_pdf
+
+DEFAULT_ROW_COUNTS = (100, 1000, 10000)
+
+
+def make_rows(count):
+    """Synthetic rows shaped like the project report (mixed short and wrapping text)"""
+    base = date(2024, 1, 1)
+    rows = []
+    for i in range(count):
+        rows.append({
+            'project_id': f"PRO{i:05d}",
+            'project_name': f"Project {i}",
+            'project_client_id': f"CLI{i % 97:03d}",
+            'managed_by': f"EMP{i % 41:03d}",
+            'estimated_cost': 1000.5 * (i % 300),
+            'completion_days': i % 365,
+            'release_date': base + timedelta(days=i % 700),
+            'committed_date': base + timedelta(days=(i * 3) % 700),
+            'description': ("Short note" if i % 3 else
+                            "Longer description that needs to wrap across more than one line of the cell "
+                            f"to exercise paragraph layout for row {i}")
+        })
+    return rows
+
+
+def render_legacy(data, report_title):
+    """The renderer generate_pdf_report used before pdf_report.py (kept verbatim as the baseline)"""
+    # Create a modern, professional PDF report with refined styling
+    buffer = BytesIO()
+
+    # Use landscape for wider tables, optimized margins
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=landscape(A4),
+        leftMargin=25,    # Balanced margins
+        rightMargin=25,   # Balanced margins
+        topMargin=80,     # Space for header
+        bottomMargin=50
+    )
+
+    # Corporate color palette (blue tones)
+    corporate_dark_blue = colors.HexColor("#003366")  # Deep blue for headers
+    corporate_light_blue = colors.HexColor("#E6EFF6")  # Light blue for alternate rows
+    corporate_accent = colors.HexColor("#4F81BD")  # Medium blue for accents
+
+    # Document elements list
+    elements = []
+
+    # Add space at top to avoid header overlap
+    elements.append(Spacer(1, 15))
+
+    # Add report summary section
+    if data:
+        # Summary data
+        records_count = len(data)
+        current_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+        # Create summary title
+        title_style = ParagraphStyle(
+            name='SectionTitle',
+            fontName='Helvetica-Bold',
+            fontSize=12,
+            textColor=corporate_dark_blue,
+            alignment=1,  # Center alignment
+            spaceAfter=10
+        )
+        elements.append(Paragraph('Report Summary', title_style))
+
+        # Create summary table with clean styling
+        summary_data = [
+            ["Records", str(records_count)],
+            ["Report Type", report_title],
+            ["Generated At", current_date]
+        ]
+
+        # Summary table styling
+        summary_table = Table(summary_data, colWidths=[120, 200])
+        summary_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (0, -1), corporate_light_blue),
+            ('BACKGROUND', (1, 0), (1, -1), colors.white),
+            ('TEXTCOLOR', (0, 0), (0, -1), corporate_dark_blue),
+            ('TEXTCOLOR', (1, 0), (1, -1), colors.black),
+            ('ALIGN', (0, 0), (0, -1), 'LEFT'),
+            ('ALIGN', (1, 0), (1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+            ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 0), (0, -1), 9),
+            ('FONTSIZE', (1, 0), (1, -1), 9),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('INNERGRID', (0, 0), (-1, -1), 0.25, colors.lightgrey),
+            ('BOX', (0, 0), (-1, -1), 0.25, corporate_accent),
+            ('TOPPADDING', (0, 0), (-1, -1), 6),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+        ]))
+
+        # Create container for centered summary table
+        summary_container = Table([[summary_table]], colWidths=[doc.width])
+        summary_container.setStyle(TableStyle([
+            ('ALIGN', (0, 0), (0, 0), 'CENTER'),
+            ('VALIGN', (0, 0), (0, 0), 'MIDDLE'),
+        ]))
+        elements.append(summary_container)
+        elements.append(Spacer(1, 20))
+
+        # Create data table with modern styling
+        headers = list(data[0].keys())
+
+        # Enhanced column mapping for better readability - map DB column names to display names
+        header_mapping = {
+            # Project report mappings
+            'project_id': 'Project ID',
+            'project_name': 'Project Name',
+            'project_client_id': 'Client ID',
+            'managed_by': 'Managed By',
+            'estimated_cost': 'Est. Cost',
+            'completion_days': 'Compl Days',
+            'release_date': 'Release Date',
+            'committed_date': 'Commit Date',
+            'description': 'Description',
+
+            # Product report mappings
+            'product_id': 'Product ID',
+            'product_name': 'Product Name',
+            'date_of_product': 'Date',
+            'product_status': 'Status',
+            'product_description': 'Description',
+            'product_technical': 'Technical',
+            'product_specification': 'Specification',
+            'product_framework': 'Framework'
+        }
+
+        # Generate display headers with proper capitalization and spacing
+        display_headers = []
+        header_style = ParagraphStyle(
+            'HeaderStyle',
+            fontName='Helvetica-Bold',
+            fontSize=9.5,
+            textColor=colors.white,
+            alignment=1,  # Center alignment
+            spaceAfter=0,
+            spaceBefore=0,
+            leading=11
+        )
+
+        for h in headers:
+            h_lower = h.lower()
+            if h_lower in header_mapping:
+                display_headers.append(Paragraph(header_mapping[h_lower], header_style))
+            else:
+                # Clean up any headers not in our mapping
+                text = ' '.join(word.capitalize() for word in h.replace('_', ' ').split())
+                display_headers.append(Paragraph(text, header_style))
+
+        # Table data with display headers
+        table_data = [display_headers]
+
+        # Format the data rows
+        for row in data:
+            table_row = []
+            for header in headers:
+                value = row.get(header, '')
+                # Right-align numeric fields
+                if isinstance(value, (int, float)):
+                    cell_style = ParagraphStyle(
+                        'RightAligned',
+                        parent=None,
+                        alignment=2,  # Right alignment
+                        fontSize=9
+                    )
+                    if isinstance(value, int):
+                        cell_text = "{:,}".format(value)
+                    else:
+                        cell_text = "{:,.2f}".format(value)
+                    table_row.append(Paragraph(cell_text, cell_style))
+                elif header.lower().endswith('date') and value:
+                    # Center align dates
+                    cell_style = ParagraphStyle(
+                        'CenterAligned',
+                        parent=None,
+                        alignment=1,  # Center alignment
+                        fontSize=9
+                    )
+                    table_row.append(Paragraph(str(value), cell_style))
+                else:
+                    # Left-align text
+                    cell_style = ParagraphStyle(
+                        'LeftAligned',
+                        parent=None,
+                        alignment=0,  # Left alignment
+                        fontSize=9
+                    )
+                    table_row.append(Paragraph(str(value), cell_style))
+            table_data.append(table_row)
+
+        # Optimized column widths - try to make it fit nicely
+        col_widths = []
+        page_width = doc.width
+
+        # Determine number of columns to calculate proportional widths
+        num_columns = len(headers)
+        default_width = page_width / num_columns
+
+        # Special case handling for certain column types
+        for i, header in enumerate(headers):
+            header_lower = header.lower()
+            if header_lower.endswith('_id'):
+                col_widths.append(min(default_width * 0.8, page_width * 0.08))  # IDs are generally short
+            elif header_lower.endswith('_name'):
+                col_widths.append(min(default_width * 1.3, page_width * 0.15))  # Names may be longer
+            elif header_lower.endswith('_date'):
+                col_widths.append(min(default_width * 0.9, page_width * 0.09))  # Dates have fixed width
+            elif header_lower.endswith('description'):
+                col_widths.append(min(default_width * 1.5, page_width * 0.18))  # Descriptions need more space
+            elif header_lower in ['estimated_cost', 'completion_days']:
+                col_widths.append(min(default_width * 0.7, page_width * 0.07))  # Numbers can be smaller
+            else:
+                col_widths.append(default_width)  # Default column width
+
+        # Create data table
+        table = Table(
+            table_data,
+            colWidths=col_widths,
+            repeatRows=1,  # Repeat header row on each page
+            hAlign='CENTER'
+        )
+
+        # Professional table styling
+        table_style = [
+            # Header row styling
+            ('BACKGROUND', (0, 0), (-1, 0), corporate_dark_blue),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+            ('VALIGN', (0, 0), (-1, 0), 'MIDDLE'),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
+            ('TOPPADDING', (0, 0), (-1, 0), 8),
+            ('LEFTPADDING', (0, 0), (-1, -1), 4),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 4),
+
+            # Grid styling
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.lightgrey),
+            ('BOX', (0, 0), (-1, -1), 1, corporate_dark_blue),
+            ('LINEBELOW', (0, 0), (-1, 0), 1.5, corporate_dark_blue),
+
+            # Vertical alignment for data rows
+            ('VALIGN', (0, 1), (-1, -1), 'MIDDLE'),
+
+            # Row height
+            ('BOTTOMPADDING', (0, 1), (-1, -1), 6),
+            ('TOPPADDING', (0, 1), (-1, -1), 6),
+        ]
+
+        # Zebra striping for data rows
+        for i in range(1, len(table_data)):
+            if i % 2 == 0:
+                table_style.append(('BACKGROUND', (0, i), (-1, i), corporate_light_blue))
+            else:
+                table_style.append(('BACKGROUND', (0, i), (-1, i), colors.white))
+
+        # Apply style to table
+        table.setStyle(TableStyle(table_style))
+
+        # Add data table to document
+        elements.append(table)
+
+        # Add note at bottom
+        note_style = ParagraphStyle(
+            name='Note',
+            fontSize=8,
+            textColor=colors.gray,
+            alignment=1,  # Center alignment
+            spaceBefore=15
+        )
+        elements.append(Paragraph(f"Data accurate as of {datetime.now().strftime('%Y-%m-%d %H:%M')}", note_style))
+
+    else:
+        # No data message
+        elements.append(Paragraph("No data available for this report",
+            ParagraphStyle(
+                name='NoData',
+                fontSize=12,
+                alignment=1,
+                spaceBefore=30,
+                spaceAfter=30,
+                textColor=colors.gray
+            )
+        ))
+
+    # Define header and footer function
+    def header_footer(canvas, doc):
+        # Save canvas state
+        canvas.saveState()
+
+        # Get page dimensions
+        width, height = landscape(A4)
+
+        # Draw top header bar
+        canvas.setFillColor(corporate_dark_blue)
+        canvas.rect(0, height - 60, width, 60, fill=1, stroke=0)
+
+        # Add logo/title text
+        canvas.setFillColor(colors.white)
+        canvas.setFont("Helvetica-Bold", 22)
+        canvas.drawString(doc.leftMargin, height - 35, "LCODE - INFINITE POSSIBILITIES")
+
+        # Add report title
+        canvas.setFont("Helvetica-Bold", 16)
+        canvas.drawRightString(width - doc.rightMargin, height - 30, report_title)
+
+        # Add timestamp
+        canvas.setFont("Helvetica", 10)
+        canvas.drawRightString(width - doc.rightMargin, height - 45,
+                           f"Generated on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+
+        # Add footer
+        canvas.setStrokeColor(corporate_dark_blue)
+        canvas.setLineWidth(1)
+        canvas.line(doc.leftMargin, 40, width - doc.rightMargin, 40)
+
+        # Footer text
+        canvas.setFont("Helvetica-Bold", 9)
+        canvas.setFillColor(corporate_dark_blue)
+        canvas.drawString(doc.leftMargin, 25, "LCODE")
+
+        # Page number
+        canvas.drawRightString(width - doc.rightMargin, 25, f"Page {canvas.getPageNumber()}")
+
+        # Center text
+        canvas.setFillColor(colors.gray)
+        canvas.setFont("Helvetica", 8)
+        canvas.drawCentredString(width/2, 25, f"Powered by LCODE • {datetime.now().strftime('%Y-%m-%d')}")
+
+        # Restore canvas state
+        canvas.restoreState()
+
+    # Build PDF with header/footer
+    doc.build(elements, onFirstPage=header_footer, onLaterPages=header_footer)
+    return buffer.getvalue()
+
+
+def count_pages(pdf_bytes):
+    return pdf_bytes.count(b'/Type /Page') - pdf_bytes.count(b'/Type /Pages')
+
+
+def measure(renderer, rows, repeat):
+    best = None
+    for _ in range(repeat):
+        tracemalloc.start()
+        started = time.perf_counter()
+        pdf_bytes = renderer(rows, "Project Report")
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        if best is None or elapsed < best[0]:
+            best = (elapsed, peak, pdf_bytes)
+    elapsed, peak, pdf_bytes = best
+    pages = count_pages(pdf_bytes)
+    return {
+        'seconds': elapsed,
+        'pages': pages,
+        'pages_per_sec': pages / elapsed if elapsed else 0,
+        'peak_mb': peak / (1024 * 1024),
+        'size_kb': len(pdf_bytes) / 1024
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PDF report rendering")
+    parser.add_argument('--rows', default=','.join(str(n) for n in DEFAULT_ROW_COUNTS),
+                        help="Comma separated row counts")
+    parser.add_argument('--repeat', type=int, default=1, help="Runs per size; the fastest is reported")
+    args = parser.parse_args()
+
+    row_counts = [int(n) for n in args.rows.split(',') if n.strip()]
+    print(f"{'rows':>7} {'renderer':>9} {'seconds':>9} {'pages':>6} {'pages/s':>9} {'peak MB':>9} {'size KB':>9}")
+    for count in row_counts:
+        rows = make_rows(count)
+        results = {}
+        for name, renderer in (('legacy', render_legacy), ('fast', render_table_pdf)):
+            results[name] = measure(renderer, rows, args.repeat)
+            r = results[name]
+            print(f"{count:>7} {name:>9} {r['seconds']:>9.2f} {r['pages']:>6} "
+                  f"{r['pages_per_sec']:>9.1f} {r['peak_mb']:>9.1f} {r['size_kb']:>9.0f}")
+        speedup = results['legacy']['seconds'] / results['fast']['seconds'] if results['fast']['seconds'] else 0
+        print(f"{count:>7} {'speedup':>9} {speedup:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
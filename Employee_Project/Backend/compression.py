@@ -0,0 +1,212 @@
+import gzip
+import os
+import threading
+import time
+import zlib
+
+try:
+    import brotli
+except ImportError:  # optional; gzip only without it
+    brotli = None
+
+# Types worth compressing. Images, PDFs and archives are already compressed.
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript', 'application/xml',
+                      'image/svg+xml')
+
+# Streams are flushed to the client once this much input has accumulated;
+# flushing tiny chunks costs more bytes than it saves
+STREAM_FLUSH_BYTES = 8192
+
+# Preferred first when the client accepts both with the same q-value
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def is_compressible(mimetype):
+    return bool(mimetype) and mimetype.startswith(COMPRESSIBLE_TYPES)
+
+
+def negotiate(accept_encodings, available=ENCODINGS):
+    """
+    Best encoding in ``available`` for a request's Accept-Encoding, or None.
+
+    Args:
+        accept_encodings: werkzeug Accept object (request.accept_encodings)
+    """
+    best, best_q = None, 0
+    for encoding in available:
+        q = accept_encodings.quality(encoding)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class _Stats:
+    def __init__(self):
+        self.responses = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cpu_ms = 0.0
+
+    def as_dict(self):
+        return {
+            'responses': self.responses,
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+            'ratio': round(self.bytes_out / self.bytes_in, 4) if self.bytes_in else None,
+            'cpu_ms': round(self.cpu_ms, 1),
+            'cpu_ms_per_mb': round(self.cpu_ms / (self.bytes_in / 1048576), 1) if self.bytes_in else None
+        }
+
+
+class ResponseCompressor:
+    """
+    gzip/brotli compression of Flask responses, negotiated per request.
+
+    Buffered responses under ``min_size`` bytes are sent as is, since the
+    headers and CPU cost more than the bytes saved. Streamed responses (CSV
+    exports) are compressed chunk by chunk and flushed every few KB, so
+    the client still receives rows while the query runs. File responses
+    from send_file are left alone; cached report artifacts are compressed
+    once by compress_file() instead.
+
+    Ratio (bytes out / bytes in) and CPU time are kept per encoding and
+    separately for the pre-compressed files.
+
+    Args:
+        min_size (int): Smallest buffered body that is compressed
+        gzip_level (int): zlib level for responses
+        brotli_quality (int): Brotli quality for responses
+        static_gzip_level (int): zlib level for pre-compressed files
+        static_brotli_quality (int): Brotli quality for pre-compressed files
+    """
+
+    def __init__(self, min_size=1024, gzip_level=6, brotli_quality=5,
+                 static_gzip_level=9, static_brotli_quality=11):
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.static_gzip_level = static_gzip_level
+        self.static_brotli_quality = static_brotli_quality
+        self._lock = threading.Lock()
+        self._stats = {}
+        self.skipped = {}
+
+    def _record(self, key, bytes_in, bytes_out, cpu_seconds):
+        with self._lock:
+            stats = self._stats.setdefault(key, _Stats())
+            stats.responses += 1
+            stats.bytes_in += bytes_in
+            stats.bytes_out += bytes_out
+            stats.cpu_ms += cpu_seconds * 1000
+
+    def _skip(self, reason):
+        with self._lock:
+            self.skipped[reason] = self.skipped.get(reason, 0) + 1
+
+    def compress_bytes(self, data, encoding, static=False):
+        if encoding == 'br':
+            return brotli.compress(data, quality=self.static_brotli_quality if static else self.brotli_quality)
+        return gzip.compress(data, compresslevel=self.static_gzip_level if static else self.gzip_level, mtime=0)
+
+    def _compressor(self, encoding):
+        """(compress(chunk), flush(), finish()) for a stream"""
+        if encoding == 'br':
+            compressor = brotli.Compressor(quality=self.brotli_quality)
+            return compressor.process, compressor.flush, compressor.finish
+        compressor = zlib.compressobj(self.gzip_level, zlib.DEFLATED, 31)
+        return (compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH),
+                lambda: compressor.flush(zlib.Z_FINISH))
+
+    def compress_response(self, response, accept_encodings, range_requested=False):
+        """Compress ``response`` in place if the client and the payload allow it"""
+        if (response.status_code < 200 or response.status_code in (204, 206, 304)
+                or 'Content-Encoding' in response.headers or response.direct_passthrough):
+            return response
+        if not is_compressible(response.mimetype):
+            return response
+        if 'no-transform' in response.headers.get('Cache-Control', ''):
+            self._skip('no_transform')
+            return response
+        if not response.is_streamed and response.calculate_content_length() < self.min_size:
+            self._skip('below_threshold')
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = negotiate(accept_encodings)
+        if encoding is None:
+            self._skip('not_accepted')
+            return response
+        if range_requested:
+            self._skip('range')
+            return response
+
+        if response.is_streamed:
+            response.response = self._stream(response.response, encoding)
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            started = time.thread_time()
+            compressed = self.compress_bytes(data, encoding)
+            self._record(encoding, len(data), len(compressed), time.thread_time() - started)
+            if len(compressed) >= len(data):
+                self._skip('not_smaller')
+                return response
+            response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag:
+            response.set_etag(f"{etag}-{encoding}", weak)
+        return response
+
+    def _stream(self, chunks, encoding):
+        compress, flush, finish = self._compressor(encoding)
+        bytes_in = bytes_out = unflushed = 0
+        cpu = 0.0
+        try:
+            for chunk in chunks:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode('utf-8')
+                if not chunk:
+                    continue
+                started = time.thread_time()
+                out = compress(chunk)
+                unflushed += len(chunk)
+                if unflushed >= STREAM_FLUSH_BYTES:
+                    out += flush()
+                    unflushed = 0
+                cpu += time.thread_time() - started
+                bytes_in += len(chunk)
+                bytes_out += len(out)
+                if out:
+                    yield out
+            started = time.thread_time()
+            out = finish()
+            cpu += time.thread_time() - started
+            bytes_out += len(out)
+            yield out
+        finally:
+            if hasattr(chunks, 'close'):
+                chunks.close()
+            self._record(f"{encoding}_stream", bytes_in, bytes_out, cpu)
+
+    def compress_file(self, source_path, target_path, encoding):
+        """Write a compressed copy of ``source_path``; returns its size"""
+        with open(source_path, 'rb') as f:
+            data = f.read()
+        started = time.thread_time()
+        compressed = self.compress_bytes(data, encoding, static=True)
+        self._record(f"{encoding}_precompressed", len(data), len(compressed), time.thread_time() - started)
+        tmp_path = f"{target_path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(compressed)
+        os.replace(tmp_path, target_path)
+        return len(compressed)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'min_size': self.min_size,
+                'encodings': list(ENCODINGS),
+                'compressed': {key: stats.as_dict() for key, stats in sorted(self._stats.items())},
+                'skipped': dict(self.skipped)
+            }
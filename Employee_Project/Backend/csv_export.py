@@ -0,0 +1,99 @@
+import csv
+from datetime import datetime
+from io import StringIO
+
+from flask import Response, stream_with_context
+
+# Rows fetched from MySQL and written to the client per chunk
+CSV_CHUNK_ROWS = 1000
+
+
+def format_csv_value(value):
+    """Match the formatting the buffered report routes used for CSV cells"""
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d')
+    return value
+
+
+def build_csv_content(data):
+    """CSV text for a list of row dicts, headers taken from the first row"""
+    output = StringIO()
+    writer = csv.writer(output)
+    headers = list(data[0].keys())
+    writer.writerow(headers)
+    for row in data:
+        writer.writerow([row.get(header, '') for header in headers])
+    return output.getvalue()
+
+
+def _close_quietly(cursor, conn):
+    try:
+        cursor.close()
+    except Exception:
+        # An unbuffered cursor with unread rows refuses to close; the pool
+        # discards the connection instead of reusing it
+        pass
+    conn.close()
+
+
+def stream_csv_response(conn, query, params, filename_prefix, chunk_size=CSV_CHUNK_ROWS, on_complete=None):
+    """
+    Stream the result of ``query`` to the client as CSV with constant memory.
+
+    The query runs on an unbuffered cursor, so MySQL sends rows as they are
+    fetched and at most ``chunk_size`` rows are held in memory. The first
+    chunk is fetched up front so an empty result can still be reported
+    before the response starts.
+
+    Args:
+        conn: A dedicated pooled connection; it is closed when the stream ends
+        query (str): SELECT statement
+        params (tuple): Query parameters
+        filename_prefix (str): Download file name prefix
+        chunk_size (int): Rows per fetch
+        on_complete: Optional callable receiving the number of rows written,
+            called inside the request context once the stream finishes
+
+    Returns:
+        Response, or None if the query returned no rows
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute(query, params)
+        headers = [column[0] for column in cursor.description]
+        first_chunk = cursor.fetchmany(chunk_size)
+    except Exception:
+        _close_quietly(cursor, conn)
+        raise
+
+    if not first_chunk:
+        _close_quietly(cursor, conn)
+        return None
+
+    def generate():
+        buffer = StringIO()
+        writer = csv.writer(buffer)
+        count = 0
+        try:
+            writer.writerow(headers)
+            chunk = first_chunk
+            while chunk:
+                for row in chunk:
+                    writer.writerow([format_csv_value(value) for value in row])
+                count += len(chunk)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate(0)
+                chunk = cursor.fetchmany(chunk_size)
+        finally:
+            _close_quietly(cursor, conn)
+        if on_complete:
+            on_complete(count)
+
+    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+    response = Response(stream_with_context(generate()), mimetype='text/csv')
+    response.headers["Content-Disposition"] = f"attachment; filename={filename_prefix}_{timestamp}.csv"
+    response.headers["Content-Type"] = "text/csv; charset=utf-8"
+    return response
@@ -0,0 +1,250 @@
+import threading
+import time
+from collections import deque
+
+import mysql.connector
+from mysql.connector import Error
+
+
+class PoolTimeoutError(Error):
+    """Raised when no connection becomes available within the checkout timeout"""
+
+
+class PooledConnection:
+    """
+    Thin proxy around a raw mysql.connector connection.
+
+    Calling close() hands the connection back to the pool instead of tearing
+    down the socket, so existing route code that does ``conn.close()`` keeps
+    working unchanged. Every other attribute is delegated to the real
+    connection.
+    """
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+        self._released = False
+
+    def close(self):
+        if not self._released:
+            self._released = True
+            self._pool._release(self._raw)
+
+    def is_connected(self):
+        if self._released:
+            return False
+        return self._raw.is_connected()
+
+    def __getattr__(self, name):
+        if self._released:
+            raise Error(msg="Connection has already been returned to the pool")
+        return getattr(self._raw, name)
+
+
+class RequestConnection(PooledConnection):
+    """
+    Connection bound to a single Flask request.
+
+    Routes may call get_db_connection() and close() several times while
+    handling one request; they all share this object and close() is a no-op.
+    The connection goes back to the pool in the app-context teardown.
+    """
+
+    def close(self):
+        pass
+
+    def release(self):
+        PooledConnection.close(self)
+
+
+class ConnectionPool:
+    """
+    Bounded MySQL connection pool.
+
+    Args:
+        pool_size (int): Maximum number of open connections
+        checkout_timeout (float): Seconds to wait for a free connection
+        pre_ping_after (float): Idle seconds after which a connection is
+            pinged before being handed out
+        recycle_after (float): Age in seconds after which a connection is
+            closed and replaced instead of being reused
+        **connect_kwargs: Passed through to mysql.connector.connect()
+    """
+
+    def __init__(self, pool_size=10, checkout_timeout=10.0, pre_ping_after=30.0,
+                 recycle_after=3600.0, **connect_kwargs):
+        self.pool_size = pool_size
+        self.checkout_timeout = checkout_timeout
+        self.pre_ping_after = pre_ping_after
+        self.recycle_after = recycle_after
+        self.connect_kwargs = connect_kwargs
+
+        self._lock = threading.Condition(threading.Lock())
+        self._idle = deque()  # (raw_connection, created_at, returned_at)
+        self._created_at = {}
+        self._open = 0
+        self._in_use = 0
+        self._waiting = 0
+
+        # Metrics
+        self._checkouts = 0
+        self._timeouts = 0
+        self._connects = 0
+        self._discarded = 0
+        self._latencies = deque(maxlen=1000)
+        self._max_latency = 0.0
+
+    def _connect(self):
+        raw = mysql.connector.connect(**self.connect_kwargs)
+        self._connects += 1
+        return raw
+
+    def _discard(self, raw):
+        self._discarded += 1
+        self._created_at.pop(id(raw), None)
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def _ping(self, raw):
+        try:
+            raw.ping(reconnect=False)
+        except Exception:
+            return False
+        return True
+
+    def _reserve(self, timeout, deadline):
+        """
+        Take an idle connection, or a slot for a new one, waiting until ``deadline``.
+
+        Returns:
+            tuple: (raw connection, whether it must be pinged first), or
+                (None, False) when a slot was reserved for a new connection
+        """
+        with self._lock:
+            self._waiting += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    while self._idle:
+                        raw, created_at, returned_at = self._idle.pop()
+                        if self.recycle_after and now - created_at > self.recycle_after:
+                            self._open -= 1
+                            self._discard(raw)
+                            continue
+                        self._in_use += 1
+                        return raw, now - returned_at >= self.pre_ping_after
+
+                    if self._open < self.pool_size:
+                        self._open += 1
+                        self._in_use += 1
+                        return None, False
+
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeoutError(
+                            msg=f"Timed out after {timeout}s waiting for a database connection "
+                                f"(pool size {self.pool_size})"
+                        )
+                    self._lock.wait(remaining)
+            finally:
+                self._waiting -= 1
+
+    def _checkout_raw(self, timeout):
+        start = time.monotonic()
+        deadline = start + timeout
+
+        # Idle connections are pinged outside the lock so a slow server does
+        # not hold up other checkouts and returns
+        while True:
+            raw, needs_ping = self._reserve(timeout, deadline)
+            if raw is None:
+                break
+            if not needs_ping or self._ping(raw):
+                return raw, start
+            with self._lock:
+                self._open -= 1
+                self._in_use -= 1
+                self._lock.notify()
+            self._discard(raw)
+
+        # The slot is reserved; connect outside the lock
+        try:
+            raw = self._connect()
+        except Exception:
+            with self._lock:
+                self._open -= 1
+                self._in_use -= 1
+                self._lock.notify()
+            raise
+        self._created_at[id(raw)] = time.monotonic()
+        return raw, start
+
+    def _record_latency(self, start):
+        latency = time.monotonic() - start
+        with self._lock:
+            self._checkouts += 1
+            self._latencies.append(latency)
+            if latency > self._max_latency:
+                self._max_latency = latency
+
+    def checkout(self, timeout=None, wrapper=PooledConnection):
+        """Borrow a connection, waiting up to ``timeout`` seconds for one to free up"""
+        if timeout is None:
+            timeout = self.checkout_timeout
+        raw, start = self._checkout_raw(timeout)
+        self._record_latency(start)
+        return wrapper(self, raw)
+
+    def _release(self, raw):
+        # Never hand an open transaction to the next borrower
+        healthy = True
+        try:
+            if raw.is_connected():
+                if raw.in_transaction:
+                    raw.rollback()
+            else:
+                healthy = False
+        except Exception:
+            healthy = False
+
+        with self._lock:
+            self._in_use -= 1
+            if healthy:
+                created_at = self._created_at.get(id(raw), time.monotonic())
+                self._idle.append((raw, created_at, time.monotonic()))
+            else:
+                self._open -= 1
+                self._discard(raw)
+            self._lock.notify()
+
+    def dispose(self):
+        """Close every idle connection; borrowed ones are closed when returned"""
+        with self._lock:
+            while self._idle:
+                raw, _, _ = self._idle.pop()
+                self._open -= 1
+                self._discard(raw)
+
+    def metrics(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            count = len(latencies)
+            return {
+                'pool_size': self.pool_size,
+                'open': self._open,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'waiting': self._waiting,
+                'checkouts': self._checkouts,
+                'timeouts': self._timeouts,
+                'connects': self._connects,
+                'discarded': self._discarded,
+                'checkout_latency_ms': {
+                    'avg': round(sum(latencies) / count * 1000, 3) if count else 0,
+                    'p95': round(latencies[int(count * 0.95) - 1 if count > 1 else 0] * 1000, 3) if count else 0,
+                    'max': round(self._max_latency * 1000, 3)
+                }
+            }
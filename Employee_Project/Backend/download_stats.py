@@ -0,0 +1,143 @@
+from collections import defaultdict
+
+# Download counts kept up to date as download_logs rows are written, so the
+# stats endpoints never aggregate the whole log.
+CREATE_DOWNLOAD_STATS_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS download_stats_daily (
+        stat_date DATE NOT NULL,
+        report_type VARCHAR(50) NOT NULL,
+        download_format VARCHAR(10) NOT NULL,
+        download_count INT NOT NULL DEFAULT 0,
+        record_count BIGINT NOT NULL DEFAULT 0,
+        PRIMARY KEY (stat_date, report_type, download_format)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS download_stats_entity (
+        report_type VARCHAR(50) NOT NULL,
+        entity_id VARCHAR(50) NOT NULL,
+        download_count INT NOT NULL DEFAULT 0,
+        last_download DATETIME,
+        PRIMARY KEY (report_type, entity_id),
+        INDEX idx_download_count (download_count)
+    )
+    """
+]
+
+DAILY_UPSERT = """
+    INSERT INTO download_stats_daily (stat_date, report_type, download_format, download_count, record_count)
+    VALUES (%s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        download_count = download_count + VALUES(download_count),
+        record_count = record_count + VALUES(record_count)
+"""
+
+ENTITY_UPSERT = """
+    INSERT INTO download_stats_entity (report_type, entity_id, download_count, last_download)
+    VALUES (%s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        download_count = download_count + VALUES(download_count),
+        last_download = CASE
+            WHEN VALUES(last_download) IS NULL THEN last_download
+            WHEN last_download IS NULL OR VALUES(last_download) > last_download THEN VALUES(last_download)
+            ELSE last_download
+        END
+"""
+
+
+def create_download_stats_tables(cursor):
+    for statement in CREATE_DOWNLOAD_STATS_TABLES:
+        cursor.execute(statement)
+
+
+def apply_download_events(cursor, events):
+    """
+    Add download events to the rollups, one upsert per distinct key.
+
+    Args:
+        cursor: Cursor in the transaction that writes (or deletes) the logs
+        events: Iterable of (download_date, report_type, download_format,
+            entity_id, downloads, records); negative counts subtract
+    """
+    daily = defaultdict(lambda: [0, 0])
+    entities = {}
+    for download_date, report_type, download_format, entity_id, downloads, records in events:
+        day = download_date.date() if hasattr(download_date, 'date') else download_date
+        totals = daily[(day, report_type, download_format)]
+        totals[0] += downloads
+        totals[1] += records or 0
+        if entity_id and downloads:
+            key = (report_type, str(entity_id))
+            count, last = entities.get(key, (0, None))
+            if downloads > 0:
+                last = download_date if last is None else max(last, download_date)
+            entities[key] = (count + downloads, last)
+
+    daily_rows = [(day, rt, fmt, counts[0], counts[1]) for (day, rt, fmt), counts in sorted(daily.items())
+                  if counts[0] or counts[1]]
+    entity_rows = [(rt, eid, count, last) for (rt, eid), (count, last) in sorted(entities.items()) if count]
+    if daily_rows:
+        cursor.executemany(DAILY_UPSERT, daily_rows)
+    if entity_rows:
+        cursor.executemany(ENTITY_UPSERT, entity_rows)
+    if any(row[3] < 0 for row in daily_rows) or any(row[2] < 0 for row in entity_rows):
+        cursor.execute("DELETE FROM download_stats_daily WHERE download_count <= 0 AND record_count <= 0")
+        cursor.execute("DELETE FROM download_stats_entity WHERE download_count <= 0")
+
+
+def subtract_logs(cursor, where_sql, params):
+    """
+    Remove the download_logs rows matching ``where_sql`` from the rollups.
+
+    Call it before deleting those rows, in the same transaction.
+    """
+    cursor.execute(f"""
+        SELECT download_date, report_type, download_format, entity_id, record_count
+        FROM download_logs WHERE {where_sql}
+        FOR UPDATE
+    """, params)
+    events = []
+    for row in cursor.fetchall():
+        if isinstance(row, dict):
+            row = (row['download_date'], row['report_type'], row['download_format'], row['entity_id'], row['record_count'])
+        download_date, report_type, download_format, entity_id, record_count = row
+        events.append((download_date, report_type, download_format, entity_id, -1, -(record_count or 0)))
+    apply_download_events(cursor, events)
+    return len(events)
+
+
+def backfill_download_stats(conn):
+    """
+    Rebuild both rollup tables from download_logs in one transaction.
+
+    Returns:
+        dict: Rows written per table
+    """
+    cursor = conn.cursor()
+    try:
+        create_download_stats_tables(cursor)
+        cursor.execute("DELETE FROM download_stats_daily")
+        cursor.execute("""
+            INSERT INTO download_stats_daily (stat_date, report_type, download_format, download_count, record_count)
+            SELECT DATE(download_date), report_type, download_format, COUNT(*), IFNULL(SUM(record_count), 0)
+            FROM download_logs
+            GROUP BY DATE(download_date), report_type, download_format
+        """)
+        daily = cursor.rowcount
+        cursor.execute("DELETE FROM download_stats_entity")
+        cursor.execute("""
+            INSERT INTO download_stats_entity (report_type, entity_id, download_count, last_download)
+            SELECT report_type, entity_id, COUNT(*), MAX(download_date)
+            FROM download_logs
+            WHERE entity_id IS NOT NULL AND entity_id <> ''
+            GROUP BY report_type, entity_id
+        """)
+        entities = cursor.rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return {'download_stats_daily': daily, 'download_stats_entity': entities}
@@ -0,0 +1,242 @@
+import re
+import threading
+import time
+from collections import defaultdict
+
+# Tables whose IDs the resolver knows. Users type these IDs by hand ('P123'
+# for 'PRO123', '123', 'pro-0123'), so lookups go through the resolver
+# instead of a chain of leading-wildcard LIKE queries.
+ID_SOURCES = {
+    'employee': ('employees', 'employee_id'),
+    'project': ('projects', 'project_id'),
+    'product': ('products', 'product_id'),
+    'client': ('clients', 'client_id'),
+    'task': ('tasks', 'task_id'),
+}
+
+SEPARATORS = re.compile(r'[\s\-_/.]+')
+ID_PARTS = re.compile(r'^([A-Z]*)(.*?)(\d*)$')
+
+# Match tiers, best first. resolve() and candidates() only look at the best
+# tier that has any match; search() returns every tier in order, except that
+# DIGITS is only tried when nothing else matched. resolve() accepts
+# SAME_NUMBER at most: the looser tiers name a different entity ('EMP1' ->
+# 'PRO1', 'PRO12' -> 'PRO123') and are only fit for partial-match filters.
+EXACT, NORMALIZED, SAME_NUMBER, OTHER_PREFIX, CONTAINS, DIGITS = range(6)
+
+
+def normalize_id(raw):
+    """Upper-case ``raw`` and drop spaces and separators ('pro-0123' -> 'PRO0123')"""
+    return SEPARATORS.sub('', str(raw or '')).upper()
+
+
+def split_id(raw):
+    """
+    (prefix, numeric suffix) of an ID; the suffix is an int so leading zeros
+    do not matter, or None when the ID does not end in digits.
+    """
+    prefix, _, digits = ID_PARTS.match(normalize_id(raw)).groups()
+    return prefix, int(digits) if digits else None
+
+
+def _prefix_compatible(a, b):
+    # 'P' abbreviates 'PRO'; an ID typed without a prefix matches any prefix
+    return not a or not b or a.startswith(b) or b.startswith(a)
+
+
+class _IdIndex:
+    """IDs of one entity type with their normalized and numeric lookups"""
+
+    def __init__(self, ids):
+        self.ids = set()
+        self.by_normalized = defaultdict(set)
+        self.by_number = defaultdict(set)
+        self.loaded_at = time.monotonic()
+        for entity_id in ids:
+            self.add(entity_id)
+
+    def add(self, entity_id):
+        entity_id = str(entity_id)
+        if entity_id in self.ids:
+            return
+        self.ids.add(entity_id)
+        self.by_normalized[normalize_id(entity_id)].add(entity_id)
+        prefix, number = split_id(entity_id)
+        if number is not None:
+            self.by_number[number].add(entity_id)
+
+    def discard(self, entity_id):
+        entity_id = str(entity_id)
+        if entity_id not in self.ids:
+            return
+        self.ids.discard(entity_id)
+        for lookup, key in ((self.by_normalized, normalize_id(entity_id)),
+                            (self.by_number, split_id(entity_id)[1])):
+            bucket = lookup.get(key)
+            if bucket is not None:
+                bucket.discard(entity_id)
+                if not bucket:
+                    del lookup[key]
+
+    def tiers(self, raw, stop_at_first=True):
+        """Yield (tier, sorted IDs) for every tier ``raw`` matches"""
+        raw = str(raw).strip()
+        if raw in self.ids:
+            yield EXACT, [raw]
+            if stop_at_first:
+                return
+        normalized = normalize_id(raw)
+        if not normalized:
+            return
+        matches = self.by_normalized.get(normalized, set()) - {raw}
+        if matches:
+            yield NORMALIZED, sorted(matches)
+            if stop_at_first:
+                return
+
+        prefix, number = split_id(normalized)
+        seen = {raw} | matches
+        if number is not None:
+            same_number = self.by_number.get(number, set()) - seen
+            compatible = sorted(i for i in same_number if _prefix_compatible(prefix, split_id(i)[0]))
+            if compatible:
+                yield SAME_NUMBER, compatible
+                if stop_at_first:
+                    return
+            others = sorted(same_number.difference(compatible))
+            if others:
+                yield OTHER_PREFIX, others
+                if stop_at_first:
+                    return
+            seen |= same_number
+
+        # The remaining tiers scan the IDs in memory, which replaces the
+        # LIKE '%...%' fallbacks that could not use an index
+        contains = sorted(i for i in self.ids if i not in seen and normalized in normalize_id(i))
+        if contains:
+            yield CONTAINS, contains
+            if stop_at_first:
+                return
+        # Matching on the digits alone is a last resort, as the old fallback was
+        digits = ''.join(c for c in normalized if c.isdigit())
+        if digits and digits != normalized and seen == {raw} and raw not in self.ids and not contains:
+            in_digits = sorted(i for i in self.ids if i not in seen and digits in i)
+            if in_digits:
+                yield DIGITS, in_digits
+
+
+class EntityIdResolver:
+    """
+    In-memory index of entity IDs that maps user-typed IDs to canonical ones.
+
+    Each type is loaded on first use with ``loader(table, key_column)`` and
+    reloaded after ``ttl`` seconds, so other worker processes' writes show up.
+    Write routes in this process call add()/discard() so the index follows
+    them immediately. A lookup that matches nothing reloads the type once it
+    is older than ``miss_reload_after`` seconds.
+
+    Args:
+        loader: Callable returning every ID of a table's key column
+        ttl (float): Seconds before a type's index is reloaded
+        miss_reload_after (float): Minimum index age for a reload on a miss
+    """
+
+    def __init__(self, loader, ttl=300, miss_reload_after=5):
+        self.loader = loader
+        self.ttl = ttl
+        self.miss_reload_after = miss_reload_after
+        self._indexes = {}
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.misses = 0
+        self.reloads = 0
+
+    def _index(self, entity_type, reload=False):
+        if entity_type not in ID_SOURCES:
+            raise ValueError(f"Unknown entity type: {entity_type}")
+        with self._lock:
+            index = self._indexes.get(entity_type)
+            if index is not None and not reload and time.monotonic() - index.loaded_at < self.ttl:
+                return index
+        # Load outside the lock so lookups of other types are not blocked
+        table, key = ID_SOURCES[entity_type]
+        index = _IdIndex(self.loader(table, key))
+        with self._lock:
+            self._indexes[entity_type] = index
+            self.reloads += 1
+        return index
+
+    def _tiers(self, entity_type, raw, stop_at_first=True):
+        if raw is None or not str(raw).strip():
+            return []
+        self.lookups += 1
+        index = self._index(entity_type)
+        with self._lock:
+            tiers = list(index.tiers(raw, stop_at_first))
+        if not tiers and time.monotonic() - index.loaded_at >= self.miss_reload_after:
+            index = self._index(entity_type, reload=True)
+            with self._lock:
+                tiers = list(index.tiers(raw, stop_at_first))
+        if not tiers:
+            self.misses += 1
+        return tiers
+
+    def candidates(self, entity_type, raw):
+        """
+        IDs in the best matching tier for ``raw``, e.g. ['PRO123'] for 'P123'.
+
+        Returns:
+            list: Canonical IDs, empty when nothing matches
+        """
+        tiers = self._tiers(entity_type, raw)
+        return tiers[0][1] if tiers else []
+
+    def resolve(self, entity_type, raw, max_tier=SAME_NUMBER):
+        """
+        The canonical ID for ``raw``, or None if it matches none, several, or
+        only in a tier looser than ``max_tier``.
+        """
+        tiers = self._tiers(entity_type, raw)
+        if not tiers or tiers[0][0] > max_tier or len(tiers[0][1]) != 1:
+            return None
+        return tiers[0][1][0]
+
+    def search(self, entity_type, raw, limit=None):
+        """Every ID matching ``raw`` (including partial matches), best first"""
+        ids = [entity_id for _, tier in self._tiers(entity_type, raw, stop_at_first=False) for entity_id in tier]
+        return ids[:limit] if limit else ids
+
+    def add(self, entity_type, *entity_ids):
+        """Record IDs created by a write in this process"""
+        with self._lock:
+            index = self._indexes.get(entity_type)
+            if index is not None:
+                for entity_id in entity_ids:
+                    if entity_id not in (None, ''):
+                        index.add(entity_id)
+
+    def discard(self, entity_type, *entity_ids):
+        """Forget IDs deleted by a write in this process"""
+        with self._lock:
+            index = self._indexes.get(entity_type)
+            if index is not None:
+                for entity_id in entity_ids:
+                    if entity_id not in (None, ''):
+                        index.discard(entity_id)
+
+    def invalidate(self, entity_type=None):
+        """Drop one type's index, or all of them, so the next lookup reloads"""
+        with self._lock:
+            if entity_type is None:
+                self._indexes.clear()
+            else:
+                self._indexes.pop(entity_type, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'types': {t: len(index.ids) for t, index in self._indexes.items()},
+                'lookups': self.lookups,
+                'misses': self.misses,
+                'reloads': self.reloads
+            }
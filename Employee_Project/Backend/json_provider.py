@@ -0,0 +1,124 @@
+import functools
+import json
+from datetime import date, datetime, time, timedelta
+
+from flask import g, has_app_context
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional; falls back to the stdlib encoder
+    orjson = None
+
+
+class RawJSON:
+    """
+    A JSON document already encoded as text (e.g. a MySQL JSON column),
+    decoded by the provider while the response is encoded instead of with
+    json.loads in the route. ``invalid`` is sent when the text does not parse.
+    """
+
+    __slots__ = ('text', 'invalid')
+
+    def __init__(self, text, invalid=None):
+        self.text = text
+        self.invalid = invalid
+
+
+def format_timedelta(value, time_format='%H:%M:%S'):
+    """MySQL TIME columns arrive as timedelta; hours may exceed 23"""
+    total_seconds = int(value.total_seconds())
+    sign = '-' if total_seconds < 0 else ''
+    hours, remainder = divmod(abs(total_seconds), 3600)
+    minutes, seconds = divmod(remainder, 60)
+    if time_format == '%H:%M':
+        return f"{sign}{hours:02}:{minutes:02}"
+    return f"{sign}{hours:02}:{minutes:02}:{seconds:02}"
+
+
+def json_formats(view):
+    """
+    Write the dates and datetimes in ``view``'s JSON responses with the
+    provider's formats instead of Flask's HTTP dates, so the view can return
+    rows as fetched. Goes below @app.route.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        g.json_formats = True
+        return view(*args, **kwargs)
+    return wrapper
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider encoding with orjson.
+
+    Values are written as Flask's default provider writes them (dates as
+    HTTP dates, Decimal as a string) except in views marked with
+    @json_formats, where date and datetime values use the format attributes
+    below (None writes ISO 8601). time and TIME columns (timedelta) are
+    written as HH:MM:SS and RawJSON as the document it holds. Set the
+    attributes on ``app.json`` to change the output format.
+
+    Without orjson installed the same conversions run through the stdlib
+    encoder.
+    """
+
+    date_format = '%Y-%m-%d'
+    datetime_format = '%Y-%m-%d %H:%M:%S'
+    time_format = '%H:%M:%S'
+
+    def default(self, o):
+        if isinstance(o, date) and has_app_context() and g.get('json_formats'):
+            if isinstance(o, datetime):
+                return o.strftime(self.datetime_format) if self.datetime_format else o.isoformat()
+            return o.strftime(self.date_format) if self.date_format else o.isoformat()
+        if isinstance(o, time):
+            return o.strftime(self.time_format) if self.time_format else o.isoformat()
+        if isinstance(o, timedelta):
+            return format_timedelta(o, self.time_format or '%H:%M:%S')
+        if isinstance(o, RawJSON):
+            try:
+                return self.loads(o.text)
+            except ValueError:
+                return o.invalid
+        if isinstance(o, (bytes, bytearray)):
+            return o.decode('utf-8', errors='replace')
+        if isinstance(o, (set, frozenset)):
+            return list(o)
+        return super().default(o)
+
+    def _options(self, indent=False):
+        options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def encode(self, obj, indent=False):
+        """``obj`` as UTF-8 JSON bytes"""
+        if orjson is None:
+            return json.dumps(obj, default=self.default, ensure_ascii=self.ensure_ascii,
+                              sort_keys=self.sort_keys, indent=2 if indent else None,
+                              separators=None if indent else (',', ':')).encode('utf-8')
+        return orjson.dumps(obj, default=self.default, option=self._options(indent))
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs.keys() - {'default', 'sort_keys', 'indent'}:
+            kwargs.setdefault('default', self.default)
+            return super().dumps(obj, **kwargs)
+        return self.encode(obj, indent=bool(kwargs.get('indent'))).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        body = self.encode(obj, indent=indent)
+        if indent:
+            body += b'\n'
+        return self._app.response_class(body, mimetype=self.mimetype)
@@ -0,0 +1,176 @@
+import queue
+import threading
+import time
+
+from mysql.connector import Error
+
+
+class BufferedLogWriter:
+    """
+    Write-behind buffer for append-only log rows.
+
+    write() only puts the row on a bounded in-memory queue, so requests never
+    wait for the database. A background thread drains the queue and inserts
+    rows with executemany() once ``batch_size`` rows are waiting or
+    ``flush_interval`` seconds have passed. When the queue is full new rows
+    are dropped and counted instead of blocking the caller.
+
+    Args:
+        get_connection: Callable returning a DB connection (or None); the
+            connection is closed after every batch
+        insert_sql (str): INSERT statement with one placeholder per row field
+        max_queue (int): Rows buffered before write() starts dropping
+        batch_size (int): Rows per executemany() call
+        flush_interval (float): Maximum seconds a row waits in the buffer
+        on_flush: Optional callable ``(cursor, batch)`` run after the insert in
+            the same transaction, e.g. to maintain derived counters; if it
+            raises, the batch is rolled back and counted as failed
+        name (str): Name of the background thread
+    """
+
+    def __init__(self, get_connection, insert_sql, max_queue=10000, batch_size=200,
+                 flush_interval=2.0, on_flush=None, name='log-writer'):
+        self._get_connection = get_connection
+        self.insert_sql = insert_sql
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._on_flush = on_flush
+        self.name = name
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopping = threading.Event()
+        self._flush_requested = threading.Event()
+        self._idle = threading.Condition(self._lock)
+        self._pending = 0
+        self.accepted = 0
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+        self.last_error = None
+
+    def write(self, row):
+        """Buffer one row; returns False if it was dropped because the buffer is full"""
+        if self._stopping.is_set():
+            with self._lock:
+                self.dropped += 1
+            return False
+        self._ensure_started()
+        with self._lock:
+            self._pending += 1
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            with self._lock:
+                self._pending -= 1
+                self.dropped += 1
+            return False
+        with self._lock:
+            self.accepted += 1
+        if self._queue.qsize() >= self.batch_size:
+            self._flush_requested.set()
+        return True
+
+    def _ensure_started(self):
+        # Started on first use so importing the module (e.g. in worker
+        # processes) does not spawn a thread
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._flush_requested.wait(self.flush_interval)
+            self._flush_requested.clear()
+            self._drain()
+        self._drain()
+
+    def _drain(self):
+        while True:
+            batch = []
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                break
+            self._insert(batch)
+            with self._lock:
+                self._pending -= len(batch)
+                self._idle.notify_all()
+            if len(batch) < self.batch_size:
+                break
+
+    def _insert(self, batch):
+        conn = None
+        cursor = None
+        try:
+            conn = self._get_connection()
+            if not conn:
+                raise Error(msg="Database connection failed")
+            cursor = conn.cursor()
+            cursor.executemany(self.insert_sql, batch)
+            if self._on_flush:
+                self._on_flush(cursor, batch)
+            conn.commit()
+            with self._lock:
+                self.written += len(batch)
+                self.batches += 1
+        except Exception as e:
+            if conn:
+                try:
+                    conn.rollback()
+                except Exception:
+                    pass
+            with self._lock:
+                self.failed += len(batch)
+                self.last_error = str(e)
+            print(f"Error writing {len(batch)} buffered log rows: {e}")
+        finally:
+            if cursor is not None:
+                cursor.close()
+            if conn:
+                conn.close()
+
+    def flush(self, timeout=5.0):
+        """Ask the writer to insert everything buffered and wait until it has"""
+        if self._thread is None:
+            return self._queue.empty()
+        deadline = time.monotonic() + timeout
+        self._flush_requested.set()
+        with self._lock:
+            while self._pending > 0:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._idle.wait(min(remaining, 0.05))
+                self._flush_requested.set()
+        return True
+
+    def close(self, timeout=5.0):
+        """Stop accepting rows and flush what is buffered (registered with atexit)"""
+        self._stopping.set()
+        self._flush_requested.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'name': self.name,
+                'buffered': self._queue.qsize(),
+                'max_queue': self._queue.maxsize,
+                'batch_size': self.batch_size,
+                'flush_interval': self.flush_interval,
+                'accepted': self.accepted,
+                'dropped': self.dropped,
+                'written': self.written,
+                'failed': self.failed,
+                'batches': self.batches,
+                'last_error': self.last_error
+            }
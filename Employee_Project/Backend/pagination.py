@@ -0,0 +1,235 @@
+import base64
+import json
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+
+class PaginationError(ValueError):
+    """Raised for invalid limit/cursor/sort/fields query parameters"""
+
+
+class ListSpec:
+    """
+    Describes a list endpoint for run_list_query().
+
+    Args:
+        fields (dict): Public field name -> SQL expression. Every field can be
+            requested with ``fields=`` and used with ``sort=``.
+        primary_key (str): Public name of the unique key used as keyset tie-breaker
+        default_sort (str): Sort field, prefixed with '-' for descending
+        select_all (str, optional): SELECT list used when no ``fields=`` is
+            given, e.g. ``"*"`` for routes that historically returned every column
+        max_limit (int): Upper bound for the ``limit`` parameter
+    """
+
+    def __init__(self, fields, primary_key, default_sort=None, select_all=None, max_limit=1000):
+        self.fields = fields
+        self.primary_key = primary_key
+        self.default_sort = default_sort or primary_key
+        self.select_all = select_all
+        self.max_limit = max_limit
+
+
+class ListParams:
+    def __init__(self, fields, sort_field, descending, limit, cursor, include_total):
+        self.fields = fields
+        self.sort_field = sort_field
+        self.descending = descending
+        self.limit = limit
+        self.cursor = cursor
+        self.include_total = include_total
+
+    @property
+    def paginated(self):
+        return self.limit is not None
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, timedelta):
+        total_seconds = int(value.total_seconds())
+        hours, remainder = divmod(total_seconds, 3600)
+        minutes, seconds = divmod(remainder, 60)
+        return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+    if isinstance(value, Decimal):
+        return str(value)
+    return str(value)
+
+
+def encode_cursor(sort_value, key_value):
+    # The third element flags a NULL sort value, which needs its own keyset condition
+    raw = json.dumps([sort_value, key_value, 1 if sort_value is None else 0],
+                     default=_json_default, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """(sort_value, key_value, sort_is_null) from a cursor token"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if len(values) == 2:
+            # Cursors issued before the NULL flag was added
+            values = values + [1 if values[0] is None else 0]
+        sort_value, key_value, sort_is_null = values
+        return sort_value, key_value, bool(sort_is_null)
+    except (ValueError, TypeError):
+        raise PaginationError("Invalid cursor")
+
+
+def keyset_condition(sort_expr, key_expr, descending, sort_value, key_value, sort_is_null):
+    """
+    WHERE condition and params selecting the rows after a cursor.
+
+    MySQL sorts NULLs first in ascending and last in descending order, and
+    comparisons with NULL are never true, so a page that ends on a NULL sort
+    value continues among the NULL rows by key, then (ascending) moves on to
+    the non-NULL ones; a descending page on non-NULL values ends with the
+    NULL rows.
+    """
+    op = '<' if descending else '>'
+    if sort_expr == key_expr:
+        return f"{key_expr} {op} %s", [key_value]
+    if sort_is_null:
+        condition = f"({sort_expr} IS NULL AND {key_expr} {op} %s)"
+        if not descending:
+            condition = f"({condition} OR {sort_expr} IS NOT NULL)"
+        return condition, [key_value]
+    condition = f"{sort_expr} {op} %s OR ({sort_expr} = %s AND {key_expr} {op} %s)"
+    if descending:
+        condition += f" OR {sort_expr} IS NULL"
+    return f"({condition})", [sort_value, sort_value, key_value]
+
+
+def parse_list_params(args, spec):
+    """
+    Read pagination parameters from request.args.
+
+    Supported parameters:
+        limit: page size; pagination is only applied when limit or cursor is given
+        cursor: opaque token from the previous page's X-Next-Cursor header
+        sort: field name, '-field' for descending
+        fields: comma separated list of fields to return
+        include_total: '1'/'true' to also return X-Total-Count
+    """
+    fields = None
+    raw_fields = args.get('fields')
+    if raw_fields:
+        fields = [f.strip() for f in raw_fields.split(',') if f.strip()]
+        unknown = [f for f in fields if f not in spec.fields]
+        if unknown:
+            raise PaginationError(f"Unknown fields: {', '.join(unknown)}")
+
+    sort = args.get('sort') or spec.default_sort
+    descending = sort.startswith('-')
+    sort_field = sort.lstrip('-')
+    if sort_field not in spec.fields:
+        raise PaginationError(f"Cannot sort by '{sort_field}'")
+
+    cursor = args.get('cursor') or None
+    limit = args.get('limit')
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise PaginationError("limit must be an integer")
+        if limit < 1:
+            raise PaginationError("limit must be positive")
+        limit = min(limit, spec.max_limit)
+    elif cursor:
+        limit = min(100, spec.max_limit)
+
+    include_total = str(args.get('include_total', '')).lower() in ('1', 'true', 'yes')
+
+    return ListParams(fields, sort_field, descending, limit,
+                      decode_cursor(cursor) if cursor else None, include_total)
+
+
+def run_list_query(cursor, spec, args, from_sql, where=None, where_params=None):
+    """
+    Run a sorted, optionally paginated and projected list query.
+
+    Args:
+        cursor: A dictionary cursor
+        spec (ListSpec): Field definitions for this endpoint
+        args: request.args
+        from_sql (str): FROM clause including joins, e.g. "FROM tasks t LEFT JOIN ..."
+        where (list, optional): SQL conditions ANDed together
+        where_params (list, optional): Parameters for the conditions
+
+    Returns:
+        tuple: (rows, page) where page is a dict with next_cursor and total
+
+    Raises:
+        PaginationError: If a query parameter is invalid
+    """
+    params = parse_list_params(args, spec)
+    where = list(where or [])
+    where_params = list(where_params or [])
+
+    sort_expr = spec.fields[params.sort_field]
+    key_expr = spec.fields[spec.primary_key]
+    direction = 'DESC' if params.descending else 'ASC'
+
+    # Always select the sort and key columns so the next cursor can be built
+    if params.fields:
+        selected = list(dict.fromkeys(params.fields + [params.sort_field, spec.primary_key]))
+        select_sql = ', '.join(f"{spec.fields[f]} AS {f}" for f in selected)
+    elif spec.select_all:
+        select_sql = spec.select_all
+    else:
+        select_sql = ', '.join(f"{expr} AS {name}" for name, expr in spec.fields.items())
+
+    total = None
+    if params.include_total:
+        count_sql = f"SELECT COUNT(*) AS total {from_sql}"
+        if where:
+            count_sql += " WHERE " + " AND ".join(where)
+        cursor.execute(count_sql, where_params)
+        total = cursor.fetchone()['total']
+
+    page_where = list(where)
+    page_params = list(where_params)
+    if params.cursor is not None:
+        condition, condition_params = keyset_condition(sort_expr, key_expr, params.descending, *params.cursor)
+        page_where.append(condition)
+        page_params.extend(condition_params)
+
+    query = f"SELECT {select_sql} {from_sql}"
+    if page_where:
+        query += " WHERE " + " AND ".join(page_where)
+    query += f" ORDER BY {sort_expr} {direction}"
+    if sort_expr != key_expr:
+        query += f", {key_expr} {direction}"
+    if params.paginated:
+        # One extra row tells us whether there is a next page
+        query += " LIMIT %s"
+        page_params.append(params.limit + 1)
+
+    cursor.execute(query, page_params)
+    rows = cursor.fetchall()
+
+    next_cursor = None
+    if params.paginated and len(rows) > params.limit:
+        rows = rows[:params.limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last[params.sort_field], last[spec.primary_key])
+
+    if params.fields:
+        requested = set(params.fields)
+        rows = [{k: v for k, v in row.items() if k in requested} for row in rows]
+
+    return rows, {'next_cursor': next_cursor, 'total': total, 'limit': params.limit}
+
+
+def page_headers(page):
+    """Response headers describing the page, so response bodies keep their existing shape"""
+    headers = {}
+    if page.get('next_cursor'):
+        headers['X-Next-Cursor'] = page['next_cursor']
+    if page.get('total') is not None:
+        headers['X-Total-Count'] = str(page['total'])
+    if page.get('limit') is not None:
+        headers['X-Page-Limit'] = str(page['limit'])
+    return headers
@@ -0,0 +1,403 @@
+from datetime import datetime
+from io import BytesIO
+from xml.sax.saxutils import escape
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import landscape, A4
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+
+# Corporate color palette (blue tones)
+CORPORATE_DARK_BLUE = colors.HexColor("#003366")  # Deep blue for headers
+CORPORATE_LIGHT_BLUE = colors.HexColor("#E6EFF6")  # Light blue for alternate rows
+CORPORATE_ACCENT = colors.HexColor("#4F81BD")  # Medium blue for accents
+
+PAGE_SIZE = landscape(A4)
+LEFT_MARGIN = 25
+RIGHT_MARGIN = 25
+TOP_MARGIN = 80  # Space for header
+BOTTOM_MARGIN = 50
+FRAME_PADDING = 6  # SimpleDocTemplate's default frame padding on each side
+
+CELL_FONT = 'Helvetica'
+CELL_FONT_SIZE = 9
+CELL_LEADING = 11
+CELL_PADDING_H = 4
+CELL_PADDING_V = 6
+HEADER_PADDING_V = 8
+
+# Leave a little slack so rounding never pushes a page-sized table over
+PAGE_FILL_RATIO = 0.98
+
+# Styles are built once per process instead of once per cell
+TITLE_STYLE = ParagraphStyle(
+    name='SectionTitle',
+    fontName='Helvetica-Bold',
+    fontSize=12,
+    textColor=CORPORATE_DARK_BLUE,
+    alignment=1,  # Center alignment
+    spaceAfter=10
+)
+HEADER_STYLE = ParagraphStyle(
+    'HeaderStyle',
+    fontName='Helvetica-Bold',
+    fontSize=9.5,
+    textColor=colors.white,
+    alignment=1,  # Center alignment
+    spaceAfter=0,
+    spaceBefore=0,
+    leading=11
+)
+CELL_STYLES = {
+    'LEFT': ParagraphStyle('LeftAligned', fontName=CELL_FONT, fontSize=CELL_FONT_SIZE,
+                           leading=CELL_LEADING, alignment=0),
+    'CENTER': ParagraphStyle('CenterAligned', fontName=CELL_FONT, fontSize=CELL_FONT_SIZE,
+                             leading=CELL_LEADING, alignment=1),
+    'RIGHT': ParagraphStyle('RightAligned', fontName=CELL_FONT, fontSize=CELL_FONT_SIZE,
+                            leading=CELL_LEADING, alignment=2),
+}
+NOTE_STYLE = ParagraphStyle(
+    name='Note',
+    fontSize=8,
+    textColor=colors.gray,
+    alignment=1,  # Center alignment
+    spaceBefore=15
+)
+NO_DATA_STYLE = ParagraphStyle(
+    name='NoData',
+    fontSize=12,
+    alignment=1,
+    spaceBefore=30,
+    spaceAfter=30,
+    textColor=colors.gray
+)
+
+SUMMARY_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (0, -1), CORPORATE_LIGHT_BLUE),
+    ('BACKGROUND', (1, 0), (1, -1), colors.white),
+    ('TEXTCOLOR', (0, 0), (0, -1), CORPORATE_DARK_BLUE),
+    ('TEXTCOLOR', (1, 0), (1, -1), colors.black),
+    ('ALIGN', (0, 0), (0, -1), 'LEFT'),
+    ('ALIGN', (1, 0), (1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+    ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 0), (0, -1), 9),
+    ('FONTSIZE', (1, 0), (1, -1), 9),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('INNERGRID', (0, 0), (-1, -1), 0.25, colors.lightgrey),
+    ('BOX', (0, 0), (-1, -1), 0.25, CORPORATE_ACCENT),
+    ('TOPPADDING', (0, 0), (-1, -1), 6),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+])
+
+SUMMARY_CONTAINER_STYLE = TableStyle([
+    ('ALIGN', (0, 0), (0, 0), 'CENTER'),
+    ('VALIGN', (0, 0), (0, 0), 'MIDDLE'),
+])
+
+# Styling shared by every chunk of the data table
+DATA_TABLE_COMMANDS = [
+    # Header row styling
+    ('BACKGROUND', (0, 0), (-1, 0), CORPORATE_DARK_BLUE),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+    ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+    ('VALIGN', (0, 0), (-1, 0), 'MIDDLE'),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), HEADER_PADDING_V),
+    ('TOPPADDING', (0, 0), (-1, 0), HEADER_PADDING_V),
+    ('LEFTPADDING', (0, 0), (-1, -1), CELL_PADDING_H),
+    ('RIGHTPADDING', (0, 0), (-1, -1), CELL_PADDING_H),
+
+    # Grid styling
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.lightgrey),
+    ('BOX', (0, 0), (-1, -1), 1, CORPORATE_DARK_BLUE),
+    ('LINEBELOW', (0, 0), (-1, 0), 1.5, CORPORATE_DARK_BLUE),
+
+    # Plain-string data cells
+    ('FONTNAME', (0, 1), (-1, -1), CELL_FONT),
+    ('FONTSIZE', (0, 1), (-1, -1), CELL_FONT_SIZE),
+    ('LEADING', (0, 1), (-1, -1), CELL_LEADING),
+
+    # Vertical alignment for data rows
+    ('VALIGN', (0, 1), (-1, -1), 'MIDDLE'),
+
+    # Row height
+    ('BOTTOMPADDING', (0, 1), (-1, -1), CELL_PADDING_V),
+    ('TOPPADDING', (0, 1), (-1, -1), CELL_PADDING_V),
+]
+
+# Map DB column names to display names
+HEADER_MAPPING = {
+    # Project report mappings
+    'project_id': 'Project ID',
+    'project_name': 'Project Name',
+    'project_client_id': 'Client ID',
+    'managed_by': 'Managed By',
+    'estimated_cost': 'Est. Cost',
+    'completion_days': 'Compl Days',
+    'release_date': 'Release Date',
+    'committed_date': 'Commit Date',
+    'description': 'Description',
+
+    # Product report mappings
+    'product_id': 'Product ID',
+    'product_name': 'Product Name',
+    'date_of_product': 'Date',
+    'product_status': 'Status',
+    'product_description': 'Description',
+    'product_technical': 'Technical',
+    'product_specification': 'Specification',
+    'product_framework': 'Framework'
+}
+
+
+def display_header(header):
+    header_lower = header.lower()
+    if header_lower in HEADER_MAPPING:
+        return HEADER_MAPPING[header_lower]
+    # Clean up any headers not in our mapping
+    return ' '.join(word.capitalize() for word in header.replace('_', ' ').split())
+
+
+def column_widths(headers, page_width):
+    """Proportional column widths by column type"""
+    default_width = page_width / len(headers)
+    widths = []
+    for header in headers:
+        header_lower = header.lower()
+        if header_lower.endswith('_id'):
+            widths.append(min(default_width * 0.8, page_width * 0.08))  # IDs are generally short
+        elif header_lower.endswith('_name'):
+            widths.append(min(default_width * 1.3, page_width * 0.15))  # Names may be longer
+        elif header_lower.endswith('_date'):
+            widths.append(min(default_width * 0.9, page_width * 0.09))  # Dates have fixed width
+        elif header_lower.endswith('description'):
+            widths.append(min(default_width * 1.5, page_width * 0.18))  # Descriptions need more space
+        elif header_lower in ['estimated_cost', 'completion_days']:
+            widths.append(min(default_width * 0.7, page_width * 0.07))  # Numbers can be smaller
+        else:
+            widths.append(default_width)  # Default column width
+    return widths
+
+
+def column_alignment(header, data):
+    """Dates are centered, numeric columns right-aligned, everything else left"""
+    if header.lower().endswith('date'):
+        return 'CENTER'
+    values = [row.get(header) for row in data if row.get(header) not in (None, '')]
+    if values and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+        return 'RIGHT'
+    return 'LEFT'
+
+
+def format_cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, int) and not isinstance(value, bool):
+        return "{:,}".format(value)
+    if isinstance(value, float):
+        return "{:,.2f}".format(value)
+    return str(value)
+
+
+def build_cell(text, width, alignment):
+    """
+    Return (cell, height) for one data cell.
+
+    Text that fits on one line stays a plain string, which the table draws
+    directly; only text that needs wrapping becomes a Paragraph.
+    """
+    inner_width = width - 2 * CELL_PADDING_H
+    if '\n' not in text and stringWidth(text, CELL_FONT, CELL_FONT_SIZE) <= inner_width:
+        return text, CELL_LEADING
+    paragraph = Paragraph(escape(text).replace('\n', '<br/>'), CELL_STYLES[alignment])
+    _, height = paragraph.wrap(inner_width, 1e6)
+    return paragraph, height
+
+
+def flowable_height(flowable, width, height):
+    _, h = flowable.wrap(width, height)
+    return h + flowable.getSpaceBefore() + flowable.getSpaceAfter()
+
+
+def make_header_footer(report_title):
+    """
+    Page decoration callback.
+
+    The header bar, titles and footer text are identical on every page, so
+    they are drawn once into a PDF form object and stamped on each page;
+    only the page number is drawn per page.
+    """
+    generated_at = datetime.now()
+    generated_label = f"Generated on {generated_at.strftime('%Y-%m-%d %H:%M:%S')}"
+    powered_label = f"Powered by LCODE • {generated_at.strftime('%Y-%m-%d')}"
+    form_name = 'reportPageDecoration'
+    state = {'form_defined': False}
+
+    def draw_static(canvas, doc):
+        width, height = PAGE_SIZE
+
+        # Draw top header bar
+        canvas.setFillColor(CORPORATE_DARK_BLUE)
+        canvas.rect(0, height - 60, width, 60, fill=1, stroke=0)
+
+        # Add logo/title text
+        canvas.setFillColor(colors.white)
+        canvas.setFont("Helvetica-Bold", 22)
+        canvas.drawString(doc.leftMargin, height - 35, "LCODE - INFINITE POSSIBILITIES")
+
+        # Add report title and timestamp
+        canvas.setFont("Helvetica-Bold", 16)
+        canvas.drawRightString(width - doc.rightMargin, height - 30, report_title)
+        canvas.setFont("Helvetica", 10)
+        canvas.drawRightString(width - doc.rightMargin, height - 45, generated_label)
+
+        # Add footer
+        canvas.setStrokeColor(CORPORATE_DARK_BLUE)
+        canvas.setLineWidth(1)
+        canvas.line(doc.leftMargin, 40, width - doc.rightMargin, 40)
+        canvas.setFont("Helvetica-Bold", 9)
+        canvas.setFillColor(CORPORATE_DARK_BLUE)
+        canvas.drawString(doc.leftMargin, 25, "LCODE")
+
+        # Center text
+        canvas.setFillColor(colors.gray)
+        canvas.setFont("Helvetica", 8)
+        canvas.drawCentredString(width / 2, 25, powered_label)
+
+    def header_footer(canvas, doc):
+        canvas.saveState()
+        if not state['form_defined']:
+            canvas.beginForm(form_name)
+            draw_static(canvas, doc)
+            canvas.endForm()
+            state['form_defined'] = True
+        canvas.doForm(form_name)
+
+        # Page number
+        width, _ = PAGE_SIZE
+        canvas.setFont("Helvetica-Bold", 9)
+        canvas.setFillColor(CORPORATE_DARK_BLUE)
+        canvas.drawRightString(width - doc.rightMargin, 25, f"Page {canvas.getPageNumber()}")
+        canvas.restoreState()
+
+    return header_footer
+
+
+def render_table_pdf(data, report_title):
+    """
+    Render a list of row dicts as a landscape A4 table report.
+
+    Row heights are computed once up front and the rows are packed into
+    page-sized tables, so reportlab never has to re-measure and split one
+    huge table page after page.
+
+    Args:
+        data (list): Row dictionaries; keys of the first row are the columns
+        report_title (str): Title shown in the page header and summary
+
+    Returns:
+        bytes: The PDF document
+    """
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=PAGE_SIZE,
+        leftMargin=LEFT_MARGIN,
+        rightMargin=RIGHT_MARGIN,
+        topMargin=TOP_MARGIN,
+        bottomMargin=BOTTOM_MARGIN
+    )
+    frame_width = doc.width - 2 * FRAME_PADDING
+    frame_height = doc.height - 2 * FRAME_PADDING
+
+    elements = [Spacer(1, 15)]
+
+    if not data:
+        elements.append(Paragraph("No data available for this report", NO_DATA_STYLE))
+        doc.build(elements, onFirstPage=make_header_footer(report_title),
+                  onLaterPages=make_header_footer(report_title))
+        return buffer.getvalue()
+
+    # Report summary section
+    elements.append(Paragraph('Report Summary', TITLE_STYLE))
+    summary_table = Table([
+        ["Records", str(len(data))],
+        ["Report Type", report_title],
+        ["Generated At", datetime.now().strftime('%Y-%m-%d %H:%M:%S')]
+    ], colWidths=[120, 200])
+    summary_table.setStyle(SUMMARY_TABLE_STYLE)
+    summary_container = Table([[summary_table]], colWidths=[doc.width])
+    summary_container.setStyle(SUMMARY_CONTAINER_STYLE)
+    elements.append(summary_container)
+    elements.append(Spacer(1, 20))
+
+    used_height = sum(flowable_height(f, frame_width, frame_height) for f in elements)
+
+    headers = list(data[0].keys())
+    widths = column_widths(headers, doc.width)
+    alignments = [column_alignment(header, data) for header in headers]
+
+    header_cells = []
+    header_height = 0
+    for header, width in zip(headers, widths):
+        paragraph = Paragraph(escape(display_header(header)), HEADER_STYLE)
+        _, h = paragraph.wrap(width - 2 * CELL_PADDING_H, 1e6)
+        header_height = max(header_height, h)
+        header_cells.append(paragraph)
+    header_height += 2 * HEADER_PADDING_V
+
+    base_commands = DATA_TABLE_COMMANDS + [
+        ('ALIGN', (i, 1), (i, -1), alignment) for i, alignment in enumerate(alignments)
+    ]
+
+    def emit_chunk(rows, heights, start_index):
+        # Zebra striping continues across chunks: even data rows are white
+        stripes = [colors.white, CORPORATE_LIGHT_BLUE]
+        if start_index % 2:
+            stripes.reverse()
+        table = Table(
+            [header_cells] + rows,
+            colWidths=widths,
+            rowHeights=[header_height] + heights,
+            repeatRows=1,  # Repeat header row if a chunk still has to split
+            hAlign='CENTER'
+        )
+        table.setStyle(TableStyle(base_commands + [('ROWBACKGROUNDS', (0, 1), (-1, -1), stripes)]))
+        elements.append(table)
+
+    limit = (frame_height - used_height) * PAGE_FILL_RATIO
+    if limit < header_height + 3 * (CELL_LEADING + 2 * CELL_PADDING_V):
+        # Not enough room under the summary; start the table on a fresh page
+        limit = frame_height * PAGE_FILL_RATIO
+
+    chunk_rows, chunk_heights, chunk_start = [], [], 0
+    chunk_total = header_height
+    for index, row in enumerate(data):
+        cells = []
+        row_height = CELL_LEADING
+        for header, width, alignment in zip(headers, widths, alignments):
+            cell, h = build_cell(format_cell(row.get(header, '')), width, alignment)
+            cells.append(cell)
+            if h > row_height:
+                row_height = h
+        row_height += 2 * CELL_PADDING_V
+
+        if chunk_rows and chunk_total + row_height > limit:
+            emit_chunk(chunk_rows, chunk_heights, chunk_start)
+            chunk_rows, chunk_heights, chunk_start = [], [], index
+            chunk_total = header_height
+            limit = frame_height * PAGE_FILL_RATIO
+
+        chunk_rows.append(cells)
+        chunk_heights.append(row_height)
+        chunk_total += row_height
+
+    if chunk_rows:
+        emit_chunk(chunk_rows, chunk_heights, chunk_start)
+
+    elements.append(Paragraph(f"Data accurate as of {datetime.now().strftime('%Y-%m-%d %H:%M')}", NOTE_STYLE))
+
+    header_footer = make_header_footer(report_title)
+    doc.build(elements, onFirstPage=header_footer, onLaterPages=header_footer)
+    return buffer.getvalue()
@@ -0,0 +1,265 @@
+import os
+import queue
+import re
+import threading
+import time
+from io import BytesIO
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+# Every profile photo is stored as these square-bounded sizes in both
+# formats; the original upload is never served. List views use the 64 px
+# thumbnails, detail views 256 px and the 1024 px JPEG stands in for the
+# original (it is what employees.profile_pic points at).
+VARIANT_SIZES = (64, 256, 1024)
+VARIANT_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+PRIMARY_VARIANT = (1024, 'jpg')
+
+# Decoders accepted for uploads, whatever the file extension claims
+ACCEPTED_FORMATS = {'JPEG', 'PNG', 'WEBP'}
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_MAX_PIXELS = 40_000_000
+
+VARIANT_NAME = re.compile(r'^(?P<stem>[\w-]+)_(?P<size>\d+)\.(?P<ext>jpg|webp)$')
+
+
+class ProfileImageError(ValueError):
+    """The upload is not an image the pipeline accepts"""
+
+
+def variant_name(stem, size, ext):
+    return f"{stem}_{size}.{ext}"
+
+
+def variant_names(stem):
+    """{size: {ext: file name}} for every variant of ``stem``"""
+    return {size: {ext: variant_name(stem, size, ext) for ext in VARIANT_FORMATS} for size in VARIANT_SIZES}
+
+
+def parse_variant(name):
+    """(stem, size, ext) if ``name`` is a generated variant, else None"""
+    match = VARIANT_NAME.match(os.path.basename(name or ''))
+    if not match or int(match.group('size')) not in VARIANT_SIZES:
+        return None
+    return match.group('stem'), int(match.group('size')), match.group('ext')
+
+
+def validate_upload(data, max_bytes=DEFAULT_MAX_BYTES, max_pixels=DEFAULT_MAX_PIXELS):
+    """
+    Check that ``data`` is a complete JPEG/PNG/WebP within the limits.
+
+    Only the header is parsed and the file structure verified; the pixels
+    are decoded later by the worker.
+
+    Returns:
+        tuple: (Pillow format name, (width, height))
+
+    Raises:
+        ProfileImageError: Empty, too large, not an image, or not accepted
+    """
+    if not data:
+        raise ProfileImageError("The uploaded file is empty")
+    if len(data) > max_bytes:
+        raise ProfileImageError(f"Image is larger than {max_bytes // (1024 * 1024)} MB")
+    try:
+        with Image.open(BytesIO(data)) as image:
+            image_format, size = image.format, image.size
+            if image_format not in ACCEPTED_FORMATS:
+                raise ProfileImageError("Only PNG, JPG, JPEG and WebP images are allowed")
+            if size[0] * size[1] > max_pixels:
+                raise ProfileImageError(f"Image is larger than {max_pixels} pixels")
+            image.verify()
+    except ProfileImageError:
+        raise
+    except (UnidentifiedImageError, OSError, SyntaxError, Image.DecompressionBombError) as e:
+        raise ProfileImageError(f"Invalid image file: {e}")
+    return image_format, size
+
+
+def _decode(data):
+    with Image.open(BytesIO(data)) as image:
+        image.draft('RGB', (max(VARIANT_SIZES), max(VARIANT_SIZES)))
+        # Apply the EXIF rotation before the metadata is dropped
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel('A'))
+            return background
+        return image.convert('RGB')
+
+
+def _save_atomic(image, path, pil_format, options):
+    tmp_path = f"{path}.tmp"
+    image.save(tmp_path, pil_format, **options)
+    os.replace(tmp_path, path)
+
+
+def render_variants(data, directory, stem):
+    """
+    Decode an upload once and write every size/format variant of it.
+
+    Each size is downscaled from the previous, larger one. Variants are
+    re-encoded from pixels only, so EXIF (including GPS), ICC and XMP
+    metadata are not carried over. Images smaller than a size are not
+    upscaled.
+
+    Returns:
+        list: Written file names
+    """
+    image = _decode(data)
+    written = []
+    for size in sorted(VARIANT_SIZES, reverse=True):
+        image.thumbnail((size, size), Image.LANCZOS)
+        for ext, (pil_format, options) in VARIANT_FORMATS.items():
+            name = variant_name(stem, size, ext)
+            _save_atomic(image, os.path.join(directory, name), pil_format, options)
+            written.append(name)
+    return written
+
+
+class ProfileImageWorker:
+    """
+    Background threads that turn stored uploads into variants.
+
+    submit() only records the job; the upload itself is already on disk in
+    ``incoming_dir``, so a restart loses nothing (process_pending() picks
+    leftovers up). wait() lets a request for a variant that is still being
+    rendered block briefly instead of returning 404. When the queue is full
+    the job runs in the caller's thread.
+
+    Args:
+        directory (str): Where variants are written (the served uploads folder)
+        incoming_dir (str): Where raw uploads wait; must not be served
+        workers (int): Number of threads
+        max_queue (int): Jobs waiting before submit() runs them inline
+    """
+
+    def __init__(self, directory, incoming_dir, workers=2, max_queue=100):
+        self.directory = directory
+        self.incoming_dir = incoming_dir
+        self.workers = workers
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._threads = []
+        self._pending = {}
+        self.processed = 0
+        self.failed = 0
+        self.inline = 0
+        self.last_error = None
+        self.total_ms = 0.0
+
+    def incoming_path(self, stem):
+        return os.path.join(self.incoming_dir, stem)
+
+    def store(self, stem, data):
+        """Write the raw upload where the worker will pick it up"""
+        os.makedirs(self.incoming_dir, exist_ok=True)
+        path = self.incoming_path(stem)
+        with open(f"{path}.tmp", 'wb') as f:
+            f.write(data)
+        os.replace(f"{path}.tmp", path)
+
+    def submit(self, stem):
+        with self._lock:
+            if stem in self._pending:
+                return
+            self._pending[stem] = threading.Event()
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(stem)
+        except queue.Full:
+            with self._lock:
+                self.inline += 1
+            self._process(stem)
+
+    def wait(self, stem, timeout):
+        """True once ``stem`` is no longer pending (done, failed or unknown)"""
+        with self._lock:
+            event = self._pending.get(stem)
+        return event is None or event.wait(timeout)
+
+    def is_pending(self, stem):
+        with self._lock:
+            return stem in self._pending
+
+    def process_pending(self, inline=False):
+        """
+        Queue every upload left in ``incoming_dir``, e.g. after a restart.
+
+        Args:
+            inline (bool): Render in the calling thread instead, for
+                commands that exit when they return
+
+        Returns:
+            int: Uploads queued, or (processed, failed) when ``inline``
+        """
+        stems = []
+        if os.path.isdir(self.incoming_dir):
+            stems = [n for n in os.listdir(self.incoming_dir) if not n.endswith(('.tmp', '.failed'))]
+        if not inline:
+            for stem in stems:
+                self.submit(stem)
+            return len(stems)
+        processed, failed = self.processed, self.failed
+        for stem in stems:
+            with self._lock:
+                if stem in self._pending:
+                    continue
+                self._pending[stem] = threading.Event()
+            self._process(stem)
+        return self.processed - processed, self.failed - failed
+
+    def _ensure_started(self):
+        if self._threads:
+            return
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f'profile-images-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _run(self):
+        while True:
+            self._process(self._queue.get())
+
+    def _process(self, stem):
+        path = self.incoming_path(stem)
+        started = time.perf_counter()
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            render_variants(data, self.directory, stem)
+            os.remove(path)
+            with self._lock:
+                self.processed += 1
+                self.total_ms += (time.perf_counter() - started) * 1000
+        except Exception as e:
+            print(f"Error processing profile image {stem}: {e}")
+            # Kept for inspection, but not retried by process_pending()
+            if os.path.exists(path):
+                os.replace(path, f"{path}.failed")
+            with self._lock:
+                self.failed += 1
+                self.last_error = str(e)
+        finally:
+            with self._lock:
+                event = self._pending.pop(stem, None)
+            if event is not None:
+                event.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'pending': len(self._pending),
+                'processed': self.processed,
+                'failed': self.failed,
+                'inline': self.inline,
+                'avg_ms': round(self.total_ms / self.processed, 1) if self.processed else None,
+                'last_error': self.last_error
+            }
@@ -0,0 +1,641 @@
+import ast
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+# Statements that read rows and can be EXPLAINed. Plain INSERT ... VALUES is
+# skipped; INSERT ... SELECT is kept.
+SQL_START = re.compile(r'^\s*\(?\s*(SELECT|WITH|UPDATE|DELETE|INSERT|REPLACE)\b', re.I)
+INSERT_VALUES = re.compile(r'^\s*(INSERT|REPLACE)\b(?!.*\bSELECT\b)', re.I | re.S)
+DYNAMIC_MARK = '{?}'
+FORMAT_FIELD = re.compile(r'\{[A-Za-z_]\w*\}')
+
+TABLE_REF = re.compile(
+    r'\b(?:FROM|JOIN|UPDATE|INTO)\s+`?(\w+)`?'
+    r'(?:\s+(?:AS\s+)?(?!(?:ON|WHERE|JOIN|LEFT|RIGHT|INNER|OUTER|CROSS|GROUP|ORDER|LIMIT|SET|USING|'
+    r'UNION|HAVING|FOR|VALUES|SELECT|STRAIGHT_JOIN)\b)(\w+))?',
+    re.I
+)
+EQ_LEFT = re.compile(r'(?<![\w.(])(?:(\w+)\.)?(\w+)\s*(?:=|<=>|\bIN\s*\()', re.I)
+EQ_RIGHT = re.compile(r'=\s*(\w+)\.(\w+)\b')
+RANGE_PRED = re.compile(r'(?<![\w.(])(?:(\w+)\.)?(\w+)\s*(?:>=|<=|<(?!=)|>(?!=)|\bBETWEEN\b|\bLIKE\b)', re.I)
+NON_SARGABLE = re.compile(
+    r'\b(DATE|MONTH|YEAR|LOWER|UPPER|TRIM|CAST|IFNULL|COALESCE|CONCAT)\(\s*(?:\w+\.)?(\w+)[^()]*\)\s*'
+    r'(?:=|<|>|\bIN\b|\bBETWEEN\b|\bLIKE\b)',
+    re.I
+)
+CLAUSE_LIST = {
+    'order': re.compile(r'\bORDER\s+BY\s+(.+?)(?:\bLIMIT\b|\bFOR\s+UPDATE\b|\)|$)', re.I | re.S),
+    'group': re.compile(r'\bGROUP\s+BY\s+(.+?)(?:\bHAVING\b|\bORDER\b|\bLIMIT\b|\bWITH\s+ROLLUP\b|\)|$)', re.I | re.S),
+}
+SQL_WORDS = {
+    'select', 'from', 'where', 'and', 'or', 'not', 'null', 'is', 'on', 'as', 'in', 'set', 'case',
+    'when', 'then', 'else', 'end', 'limit', 'offset', 'values', 'interval', 'distinct', 'like',
+    'between', 'by', 'asc', 'desc', 'join', 'left', 'inner', 'using', 'exists'
+}
+
+# Weight of each plan problem when ranking recommendations
+FLAG_WEIGHTS = {
+    'full_scan': 1.0,
+    'full_index_scan': 0.4,
+    'join_buffer': 0.8,
+    'filesort': 0.5,
+    'temporary': 0.5,
+}
+
+
+def normalize_sql(sql):
+    return ' '.join(sql.split())
+
+
+def statement_id(sql):
+    return hashlib.sha1(normalize_sql(sql).lower().encode('utf-8')).hexdigest()[:12]
+
+
+def is_sql(text):
+    return bool(text) and bool(SQL_START.match(text)) and not INSERT_VALUES.match(text)
+
+
+# ---------------------------------------------------------------------------
+# Static scan
+# ---------------------------------------------------------------------------
+
+def _string_value(node):
+    """(text, dynamic) for a str constant or f-string node, else (None, False)"""
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value, bool(FORMAT_FIELD.search(node.value))
+    if isinstance(node, ast.JoinedStr):
+        parts = []
+        for value in node.values:
+            if isinstance(value, ast.Constant):
+                parts.append(str(value.value))
+            else:
+                parts.append(DYNAMIC_MARK)
+        return ''.join(parts), True
+    return None, False
+
+
+class _FunctionScanner(ast.NodeVisitor):
+    """Collects SQL strings, called names and referenced names of one function"""
+
+    def __init__(self):
+        self.sql = []
+        self.calls = set()
+        self.names = set()
+        self._by_var = {}
+        self._appended = set()
+
+    def visit_FunctionDef(self, node):
+        # Nested functions are scanned on their own; the parent calls them by name
+        pass
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_Call(self, node):
+        if isinstance(node.func, ast.Name):
+            self.calls.add(node.func.id)
+        elif isinstance(node.func, ast.Attribute) and isinstance(node.func.value, ast.Name):
+            self.names.add(node.func.value.id)
+        self.generic_visit(node)
+
+    def visit_Name(self, node):
+        self.names.add(node.id)
+
+    def visit_Assign(self, node):
+        text, dynamic = _string_value(node.value)
+        if is_sql(text):
+            entry = {'sql': text, 'line': node.value.lineno, 'dynamic': dynamic}
+            self.sql.append(entry)
+            self._appended.add(id(node.value))
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    self._by_var[target.id] = entry
+        self.generic_visit(node)
+
+    def visit_AugAssign(self, node):
+        # query += " AND ..." : fold every optional clause into the statement
+        if isinstance(node.target, ast.Name) and node.target.id in self._by_var:
+            entry = self._by_var[node.target.id]
+            text, dynamic = _string_value(node.value)
+            if text is None:
+                entry['dynamic'] = True
+            else:
+                entry['sql'] += text
+                entry['dynamic'] = entry['dynamic'] or dynamic
+        self.generic_visit(node)
+
+    def visit_Constant(self, node):
+        if id(node) not in self._appended and is_sql(node.value if isinstance(node.value, str) else None):
+            self.sql.append({'sql': node.value, 'line': node.lineno, 'dynamic': bool(FORMAT_FIELD.search(node.value))})
+
+    def visit_JoinedStr(self, node):
+        text, dynamic = _string_value(node)
+        if id(node) not in self._appended and is_sql(text):
+            self.sql.append({'sql': text, 'line': node.lineno, 'dynamic': dynamic})
+
+
+def scan_source(path):
+    """
+    Extract SQL statements from one Python file.
+
+    Returns:
+        tuple: (statements, functions) where statements are dicts with sql,
+        file, line, function (None for module constants), constant and
+        dynamic, and functions maps each function name to the names it calls
+        or references.
+    """
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=path)
+    filename = os.path.basename(path)
+    statements = []
+    functions = {}
+
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+            text, dynamic = _string_value(node.value)
+            if is_sql(text):
+                statements.append({'sql': text, 'file': filename, 'line': node.value.lineno,
+                                   'function': None, 'constant': node.targets[0].id, 'dynamic': dynamic})
+
+    for node in ast.walk(tree):
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        if node.name in functions:
+            continue
+        scanner = _FunctionScanner()
+        for child in node.body:
+            scanner.visit(child)
+        functions[node.name] = scanner.calls | scanner.names
+        for entry in scanner.sql:
+            statements.append({'sql': entry['sql'], 'file': filename, 'line': entry['line'],
+                               'function': node.name, 'constant': None, 'dynamic': entry['dynamic']})
+    return statements, functions
+
+
+def local_modules(app_path):
+    """app.py plus the sibling modules it imports from"""
+    directory = os.path.dirname(os.path.abspath(app_path))
+    with open(app_path, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=app_path)
+    paths = [os.path.abspath(app_path)]
+    for node in tree.body:
+        if isinstance(node, ast.ImportFrom) and node.module:
+            candidate = os.path.join(directory, node.module.replace('.', os.sep) + '.py')
+            if os.path.exists(candidate) and candidate not in paths:
+                paths.append(candidate)
+    return paths
+
+
+def attribute_routes(statements, functions, endpoints):
+    """
+    Fill statement['routes'] with the URL rules that can run it.
+
+    Args:
+        statements: From scan_source()
+        functions: Merged function -> referenced names maps
+        endpoints: {view function name: [rule strings]}
+    """
+    reach = {}
+    for endpoint in endpoints:
+        seen = set()
+        stack = [endpoint]
+        while stack:
+            name = stack.pop()
+            if name in seen:
+                continue
+            seen.add(name)
+            stack.extend(n for n in functions.get(name, ()) if n in functions and n not in seen)
+        reach[endpoint] = seen
+
+    users_of = {}
+    for name, refs in functions.items():
+        for ref in refs:
+            users_of.setdefault(ref, set()).add(name)
+
+    for stmt in statements:
+        owners = {stmt['function']} if stmt['function'] else users_of.get(stmt['constant'], set())
+        routes = set()
+        for endpoint, reachable in reach.items():
+            if owners & reachable:
+                routes.update(endpoints[endpoint])
+        stmt['routes'] = sorted(routes)
+
+
+# ---------------------------------------------------------------------------
+# Runtime capture
+# ---------------------------------------------------------------------------
+
+class _CapturingCursor:
+    def __init__(self, capture, cursor, endpoint):
+        self._capture = capture
+        self._cursor = cursor
+        self._endpoint = endpoint
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self._cursor.execute(operation, params, *args, **kwargs)
+        finally:
+            self._capture.record(operation, params, self._endpoint, time.perf_counter() - start)
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self._cursor.executemany(operation, seq_params, *args, **kwargs)
+        finally:
+            first = seq_params[0] if seq_params else None
+            self._capture.record(operation, first, self._endpoint, time.perf_counter() - start)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class _CapturingConnection:
+    def __init__(self, capture, conn, endpoint):
+        self._capture = capture
+        self._conn = conn
+        self._endpoint = endpoint
+
+    def cursor(self, *args, **kwargs):
+        return _CapturingCursor(self._capture, self._conn.cursor(*args, **kwargs), self._endpoint)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+class QueryCapture:
+    """
+    Records the SQL actually executed while the app runs.
+
+    Each distinct statement keeps its call count, time spent, the endpoints
+    that ran it and the parameters of the first call, which the audit uses
+    to EXPLAIN statements that are assembled at runtime. save() merges into
+    the JSON file so several runs (or worker processes, one after another)
+    accumulate.
+
+    Args:
+        path (str): JSON file the capture is written to
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._queries = {}
+
+    def wrap(self, conn, endpoint=None):
+        return _CapturingConnection(self, conn, endpoint)
+
+    def record(self, operation, params, endpoint, elapsed):
+        if isinstance(operation, bytes):
+            operation = operation.decode('utf-8', 'replace')
+        sql = normalize_sql(operation)
+        if not is_sql(sql):
+            return
+        with self._lock:
+            entry = self._queries.get(sql)
+            if entry is None:
+                entry = self._queries[sql] = {
+                    'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'endpoints': {},
+                    'params': json.loads(json.dumps(list(params) if isinstance(params, (list, tuple)) else params,
+                                                    default=str))
+                }
+            ms = elapsed * 1000
+            entry['count'] += 1
+            entry['total_ms'] += ms
+            entry['max_ms'] = max(entry['max_ms'], ms)
+            key = endpoint or '(none)'
+            entry['endpoints'][key] = entry['endpoints'].get(key, 0) + 1
+
+    def save(self):
+        with self._lock:
+            queries = self._queries
+            self._queries = {}
+        if not queries:
+            return
+        merged = load_capture(self.path)
+        for sql, entry in queries.items():
+            current = merged.get(sql)
+            if current is None:
+                merged[sql] = entry
+                continue
+            current['count'] += entry['count']
+            current['total_ms'] += entry['total_ms']
+            current['max_ms'] = max(current['max_ms'], entry['max_ms'])
+            for endpoint, count in entry['endpoints'].items():
+                current['endpoints'][endpoint] = current['endpoints'].get(endpoint, 0) + count
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(merged, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+
+def load_capture(path):
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+# ---------------------------------------------------------------------------
+# EXPLAIN and analysis
+# ---------------------------------------------------------------------------
+
+def fill_placeholders(sql):
+    """Replace %s with sample literals so static statements can be EXPLAINed"""
+    out = []
+    pos = 0
+    for match in re.finditer(r'%s', sql):
+        before = sql[max(0, match.start() - 60):match.start()]
+        out.append(sql[pos:match.start()])
+        if re.search(r'\b(LIMIT|OFFSET|INTERVAL)\s*$', before, re.I) or re.search(r'LIMIT\s+%s\s*,\s*$', before, re.I):
+            out.append('1')
+        else:
+            column = re.findall(r'(\w+)\W*$', before)
+            name = column[0].lower() if column else ''
+            out.append("'2024-01-01'" if ('date' in name or name.endswith('_at')) else "'1'")
+        pos = match.end()
+    out.append(sql[pos:])
+    return ''.join(out).replace('%%', '%')
+
+
+def load_schema(cursor):
+    """({table: [columns]}, {table: [[index columns], ...]}) for the current database"""
+    cursor.execute("""
+        SELECT TABLE_NAME, COLUMN_NAME FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() ORDER BY TABLE_NAME, ORDINAL_POSITION
+    """)
+    columns = {}
+    for row in cursor.fetchall():
+        table, column = _row_values(row, 'TABLE_NAME', 'COLUMN_NAME')
+        columns.setdefault(table.lower(), []).append(column.lower())
+
+    cursor.execute("""
+        SELECT TABLE_NAME, INDEX_NAME, COLUMN_NAME FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX
+    """)
+    grouped = {}
+    for row in cursor.fetchall():
+        table, index, column = _row_values(row, 'TABLE_NAME', 'INDEX_NAME', 'COLUMN_NAME')
+        grouped.setdefault((table.lower(), index), []).append((column or '').lower())
+    indexes = {}
+    for (table, _), cols in grouped.items():
+        indexes.setdefault(table, []).append(cols)
+    return columns, indexes
+
+
+def _row_values(row, *keys):
+    if isinstance(row, dict):
+        return tuple(row.get(key, row.get(key.lower())) for key in keys)
+    return tuple(row)
+
+
+def table_aliases(sql):
+    """{alias or table name: table} for the tables referenced in ``sql``"""
+    aliases = {}
+    for table, alias in TABLE_REF.findall(sql):
+        table = table.lower()
+        aliases[table] = table
+        if alias and alias.lower() not in SQL_WORDS:
+            aliases[alias.lower()] = table
+    return aliases
+
+
+def _predicate_text(sql):
+    """The part of the statement that filters rows (select list and SET clause removed)"""
+    text = re.split(r'\bON\s+DUPLICATE\s+KEY\b', sql, flags=re.I)[0]
+    if re.match(r'\s*UPDATE\b', text, re.I):
+        text = re.sub(r'\bSET\b.*?(?=\bWHERE\b|$)', ' ', text, count=1, flags=re.I | re.S)
+    else:
+        match = re.search(r'\bFROM\b', text, re.I)
+        if match:
+            text = text[match.start():]
+    return re.sub(r"'(?:[^'\\]|\\.)*'", "''", text)
+
+
+def _resolve(qualifier, column, aliases, columns):
+    """Table owning ``qualifier.column``, or None"""
+    column = column.lower()
+    if qualifier:
+        table = aliases.get(qualifier.lower())
+        return table if table and column in columns.get(table, ()) else None
+    owners = [t for t in set(aliases.values()) if column in columns.get(t, ())]
+    return owners[0] if len(owners) == 1 else None
+
+
+def column_usage(sql, columns):
+    """
+    Columns used for filtering, joining, sorting and grouping, per table.
+
+    Returns:
+        dict: {table: {'eq': [...], 'range': [...], 'order': [...], 'group': [...]}}
+    """
+    aliases = table_aliases(sql)
+    text = _predicate_text(sql)
+    usage = {}
+
+    def add(kind, qualifier, column):
+        table = _resolve(qualifier, column, aliases, columns)
+        if table is None or column.lower() in SQL_WORDS:
+            return
+        bucket = usage.setdefault(table, {'eq': [], 'range': [], 'order': [], 'group': []})[kind]
+        if column.lower() not in bucket:
+            bucket.append(column.lower())
+
+    for qualifier, column in EQ_LEFT.findall(text):
+        add('eq', qualifier, column)
+    for qualifier, column in EQ_RIGHT.findall(text):
+        add('eq', qualifier, column)
+    for qualifier, column in RANGE_PRED.findall(text):
+        add('range', qualifier, column)
+    for kind, pattern in CLAUSE_LIST.items():
+        match = pattern.search(text)
+        if not match:
+            continue
+        for item in match.group(1).split(','):
+            ref = re.match(r'\s*(?:(\w+)\.)?(\w+)\s*(?:ASC|DESC)?\s*$', item, re.I)
+            if ref:
+                add(kind, ref.group(1), ref.group(2))
+    return usage
+
+
+def candidate_index(usage):
+    """Equality columns, then one range column, then sort/group columns"""
+    cols = list(usage['eq'])
+    ranges = [c for c in usage['range'] if c not in cols]
+    if ranges:
+        cols.append(ranges[0])
+    else:
+        for c in usage['group'] or usage['order']:
+            if c not in cols:
+                cols.append(c)
+    return cols[:4]
+
+
+def is_covered(cols, existing):
+    return any(index[:len(cols)] == cols for index in existing)
+
+
+def plan_flags(plan):
+    """[(table alias, flag, estimated rows)] for the problems in an EXPLAIN result"""
+    flags = []
+    for row in plan:
+        table = row.get('table')
+        if not table or table.startswith('<'):
+            continue
+        rows = int(row.get('rows') or 0)
+        extra = row.get('Extra') or ''
+        if row.get('type') == 'ALL':
+            flags.append((table, 'full_scan', rows))
+        elif row.get('type') == 'index':
+            flags.append((table, 'full_index_scan', rows))
+        if 'Using join buffer' in extra:
+            flags.append((table, 'join_buffer', rows))
+        if 'Using filesort' in extra:
+            flags.append((table, 'filesort', rows))
+        if 'Using temporary' in extra:
+            flags.append((table, 'temporary', rows))
+    return flags
+
+
+def explain(cursor, sql, params=None):
+    if params:
+        cursor.execute('EXPLAIN ' + sql, params)
+    else:
+        cursor.execute('EXPLAIN ' + fill_placeholders(sql))
+    rows = cursor.fetchall()
+    names = [d[0] for d in cursor.description]
+    return [row if isinstance(row, dict) else dict(zip(names, row)) for row in rows]
+
+
+def run_audit(conn, statements, capture=None, endpoints=None):
+    """
+    EXPLAIN every statement and rank index recommendations.
+
+    Args:
+        conn: Connection to a database seeded with representative data;
+            estimates (and therefore the ranking) depend on it
+        statements: Statements from scan_source() with routes attributed
+        capture (dict, optional): Runtime capture from QueryCapture/load_capture()
+        endpoints (dict, optional): {endpoint: [rules]} to report captured
+            endpoints as routes
+
+    Returns:
+        dict: JSON-serializable report. It has no timestamps and is sorted
+        deterministically so reports from two releases can be diffed.
+    """
+    capture = capture or {}
+    merged = {}
+    for stmt in statements:
+        sid = statement_id(stmt['sql'])
+        entry = merged.setdefault(sid, {
+            'id': sid, 'sql': normalize_sql(stmt['sql']), 'sources': [], 'routes': set(),
+            'dynamic': stmt['dynamic'], 'runtime': None
+        })
+        entry['sources'].append(f"{stmt['file']}:{stmt['line']}" + (f" ({stmt['function']})" if stmt['function'] else ''))
+        entry['routes'].update(stmt.get('routes', ()))
+    for sql, runtime in capture.items():
+        sid = statement_id(sql)
+        entry = merged.setdefault(sid, {
+            'id': sid, 'sql': normalize_sql(sql), 'sources': ['runtime'], 'routes': set(),
+            'dynamic': False, 'runtime': None
+        })
+        entry['runtime'] = runtime
+        for endpoint in runtime.get('endpoints', {}):
+            if endpoint != '(none)':
+                entry['routes'].update((endpoints or {}).get(endpoint, [endpoint]))
+
+    cursor = conn.cursor(dictionary=True)
+    try:
+        columns, indexes = load_schema(cursor)
+        recommendations = {}
+        for entry in merged.values():
+            runtime = entry['runtime']
+            if DYNAMIC_MARK in entry['sql'] or FORMAT_FIELD.search(entry['sql']):
+                entry['error'] = 'Statement is assembled at runtime; run with a query capture to explain it'
+                entry['plan'], entry['flags'] = [], []
+                continue
+            try:
+                params = runtime.get('params') if runtime else None
+                plan = explain(cursor, entry['sql'], params)
+            except Exception as e:
+                entry['error'] = str(e)
+                entry['plan'], entry['flags'] = [], []
+                continue
+            entry['plan'] = [{k: row.get(k) for k in ('table', 'type', 'possible_keys', 'key', 'rows', 'Extra')}
+                             for row in plan]
+            aliases = table_aliases(entry['sql'])
+            flags = plan_flags(plan)
+            non_sargable = sorted({f"{func.upper()}({col})" for func, col in NON_SARGABLE.findall(_predicate_text(entry['sql']))})
+            entry['flags'] = [{'table': aliases.get(t.lower(), t), 'flag': f, 'rows': r} for t, f, r in flags]
+            entry['flags'] += [{'table': None, 'flag': 'non_sargable', 'expression': e} for e in non_sargable]
+
+            usage = column_usage(entry['sql'], columns)
+            weight = runtime['count'] if runtime else 1
+            for alias, flag, rows in flags:
+                table = aliases.get(alias.lower())
+                if table not in usage:
+                    continue
+                cols = candidate_index(usage[table])
+                if not cols or is_covered(cols, indexes.get(table, [])):
+                    continue
+                rec = recommendations.setdefault((table, tuple(cols)), {
+                    'table': table, 'columns': cols, 'score': 0.0, 'flags': {},
+                    'statements': set(), 'routes': set()
+                })
+                rec['score'] += FLAG_WEIGHTS[flag] * max(rows, 1) * weight
+                rec['flags'][flag] = rec['flags'].get(flag, 0) + 1
+                rec['statements'].add(entry['id'])
+                rec['routes'].update(entry['routes'])
+    finally:
+        cursor.close()
+
+    ranked = _merge_prefixes(list(recommendations.values()))
+    ranked.sort(key=lambda r: (-r['score'], r['table'], r['columns']))
+    for rank, rec in enumerate(ranked, 1):
+        rec['rank'] = rank
+        rec['score'] = round(rec['score'], 2)
+        rec['statements'] = sorted(rec['statements'])
+        rec['routes'] = sorted(rec['routes'])
+        rec['ddl'] = f"CREATE INDEX idx_{rec['table']}_{'_'.join(rec['columns'])} ON {rec['table']} ({', '.join(rec['columns'])})"
+
+    report_statements = []
+    for entry in sorted(merged.values(), key=lambda e: (e['sources'][0], e['id'])):
+        entry['routes'] = sorted(entry['routes'])
+        report_statements.append(entry)
+
+    return {
+        'summary': {
+            'statements': len(report_statements),
+            'explained': sum(1 for s in report_statements if 'error' not in s),
+            'flagged': sum(1 for s in report_statements if s.get('flags')),
+            'errors': sum(1 for s in report_statements if 'error' in s),
+            'captured': sum(1 for s in report_statements if s['runtime']),
+            'recommendations': len(ranked)
+        },
+        'recommendations': ranked,
+        'statements': report_statements
+    }
+
+
+def _merge_prefixes(recs):
+    """Fold a recommendation into a longer one on the same table that starts with its columns"""
+    recs.sort(key=lambda r: -len(r['columns']))
+    kept = []
+    for rec in recs:
+        target = next((k for k in kept if k['table'] == rec['table']
+                       and k['columns'][:len(rec['columns'])] == rec['columns']), None)
+        if target is None:
+            kept.append(rec)
+            continue
+        target['score'] += rec['score']
+        for flag, count in rec['flags'].items():
+            target['flags'][flag] = target['flags'].get(flag, 0) + count
+        target['statements'] |= rec['statements']
+        target['routes'] |= rec['routes']
+    return kept
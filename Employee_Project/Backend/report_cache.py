@@ -0,0 +1,194 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+
+class CachedReport:
+    def __init__(self, key, report_type, path, etag, size, filename, mimetype, record_count, expires_at):
+        self.key = key
+        self.report_type = report_type
+        self.path = path
+        self.etag = etag
+        self.size = size
+        self.filename = filename
+        self.mimetype = mimetype
+        self.record_count = record_count
+        self.expires_at = expires_at
+
+
+class ReportArtifactCache:
+    """
+    Disk cache for rendered CSV/PDF reports.
+
+    Entries are keyed on (report type, filter params, format, data version).
+    Each report type has a version counter that write routes bump through
+    invalidate(), so a change to projects makes every cached project report
+    unreachable at once. Files are stored under the SHA-256 of their content,
+    which doubles as the ETag, and identical artifacts share one file. The
+    total size on disk is bounded; least recently used entries are evicted
+    first.
+
+    Versions live in this process only, so ``ttl`` bounds how long another
+    worker process can serve a report after the data changed.
+
+    encoded_path() keeps gzip/brotli copies of an artifact next to it,
+    written the first time a client asks for that encoding and removed
+    with the artifact; they count towards ``max_bytes``.
+
+    Args:
+        directory (str, optional): Where artifacts are written
+        max_bytes (int): Upper bound for the total size of cached files
+        ttl (float): Seconds an entry stays valid
+    """
+
+    def __init__(self, directory=None, max_bytes=256 * 1024 * 1024, ttl=600):
+        self.directory = directory or os.path.join(tempfile.gettempdir(), 'report_cache')
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._generation = 0
+        self._file_refs = {}
+        self._encoded = {}
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    def version(self, report_type):
+        with self._lock:
+            return self._generation, self._versions.get(report_type, 0)
+
+    def make_key(self, report_type, params, download_format):
+        payload = json.dumps(
+            [report_type, params or {}, download_format, list(self.version(report_type))],
+            sort_keys=True, default=str, separators=(',', ':')
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at > time.monotonic() and os.path.exists(entry.path):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            if entry is not None:
+                self._drop(key)
+            self.misses += 1
+            return None
+
+    def put(self, key, report_type, content, filename, mimetype, record_count):
+        """Store ``content`` under ``key`` and return the CachedReport"""
+        etag = hashlib.sha256(content).hexdigest()
+        path = os.path.join(self.directory, etag)
+        if not os.path.exists(path):
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+
+        entry = CachedReport(key, report_type, path, etag, len(content), filename, mimetype,
+                             record_count, time.monotonic() + self.ttl)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = entry
+            refs = self._file_refs.get(path, 0)
+            if refs == 0:
+                self._bytes += entry.size
+            self._file_refs[path] = refs + 1
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                oldest_key = next(iter(self._entries))
+                self._drop(oldest_key)
+                self.evictions += 1
+        return entry
+
+    def encoded_path(self, entry, encoding, compress_file):
+        """
+        Path of ``entry``'s artifact compressed with ``encoding``, or None.
+
+        Args:
+            entry (CachedReport): Entry returned by get() or put()
+            encoding (str): Content-Encoding token, e.g. 'gzip' or 'br'
+            compress_file: Callable(source_path, target_path, encoding)
+                writing the compressed copy and returning its size
+        """
+        path = f"{entry.path}.{encoding}"
+        with self._lock:
+            if encoding in self._encoded.get(entry.path, {}):
+                return path
+            if entry.path not in self._file_refs:
+                return None
+        try:
+            size = compress_file(entry.path, path, encoding)
+        except OSError as e:
+            print(f"Error compressing report artifact {entry.etag}: {e}")
+            return None
+        with self._lock:
+            if entry.path not in self._file_refs:
+                # Evicted while compressing
+                self._remove(path)
+                return None
+            encoded = self._encoded.setdefault(entry.path, {})
+            if encoding not in encoded:
+                encoded[encoding] = size
+                self._bytes += size
+        return path
+
+    def invalidate(self, report_type=None):
+        """Bump the data version of one report type (or all) and drop their entries"""
+        with self._lock:
+            self.invalidations += 1
+            if report_type:
+                self._versions[report_type] = self._versions.get(report_type, 0) + 1
+            else:
+                self._generation += 1
+            for key in [k for k, e in self._entries.items() if not report_type or e.report_type == report_type]:
+                self._drop(key)
+
+    def _drop(self, key):
+        # Caller holds the lock
+        entry = self._entries.pop(key)
+        refs = self._file_refs.get(entry.path, 1) - 1
+        if refs > 0:
+            self._file_refs[entry.path] = refs
+            return
+        self._file_refs.pop(entry.path, None)
+        self._bytes -= entry.size
+        self._remove(entry.path)
+        for encoding, size in self._encoded.pop(entry.path, {}).items():
+            self._bytes -= size
+            self._remove(f"{entry.path}.{encoding}")
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'encoded_files': sum(len(e) for e in self._encoded.values()),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'generation': self._generation,
+                'versions': dict(self._versions)
+            }
@@ -0,0 +1,383 @@
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+FINISHED_STATES = (JOB_DONE, JOB_FAILED)
+
+JOB_ID = re.compile(r'^[0-9a-f]{32}$')
+
+
+class ReportJobError(Exception):
+    """Raised by artifact builders for expected failures (no rows, bad filters, ...)"""
+
+
+class QueueFullError(ReportJobError):
+    """Raised by submit() when the queue already holds max_queue waiting jobs"""
+
+
+class ReportJob:
+    """
+    One report request and its lifecycle.
+
+    Args:
+        report_type (str): 'project', 'product' or 'client'
+        download_format (str): 'csv' or 'pdf'
+        params (dict): Builder parameters (entity id, source, ...)
+        context (dict, optional): Request details captured at submit time
+            (user id, IP address) for logging from the worker thread
+    """
+
+    def __init__(self, report_type, download_format, params, context=None):
+        self.job_id = uuid.uuid4().hex
+        self.report_type = report_type
+        self.download_format = download_format
+        self.params = params
+        self.context = context or {}
+        self.state = JOB_QUEUED
+        self.queued_at = datetime.now()
+        self.started_at = None
+        self.finished_at = None
+        self.record_count = None
+        self.filename = None
+        self.mimetype = None
+        self.artifact_path = None
+        self.size = None
+        self.error = None
+        self.log_id = None
+        # Set on jobs rebuilt from another worker process's record
+        self.remote = False
+        self._recorded_ms = {}
+        self._queued_mono = time.monotonic()
+        self._started_mono = None
+        self._finished_mono = None
+        self._done = threading.Event()
+
+    @classmethod
+    def from_record(cls, record, artifact_dir, stale_after=None):
+        """
+        Rebuild a job accepted by another worker process from its stored
+        record (the download_logs row); the artifact is expected at
+        ``artifact_dir/<job_id>``. A job still unfinished ``stale_after``
+        seconds after it was queued is reported as failed: the process
+        that owned it is gone.
+        """
+        params = {'entityId': record.get('entity_id') or None}
+        if record.get('filter_params'):
+            try:
+                params['filters'] = json.loads(record['filter_params'])
+            except ValueError:
+                pass
+        job = cls(record['report_type'], record['download_format'], params)
+        job.job_id = record['job_id']
+        job.remote = True
+        job.state = record.get('job_status') or JOB_QUEUED
+        job.queued_at = record.get('download_date') or job.queued_at
+        job.started_at = record.get('started_at')
+        job.finished_at = record.get('finished_at')
+        job.record_count = record.get('record_count')
+        job.error = record.get('error_message')
+        job.log_id = record.get('log_id')
+        job._recorded_ms = {'queue': record.get('queue_ms'), 'run': record.get('run_ms')}
+        if (not job.finished and stale_after is not None
+                and (datetime.now() - job.queued_at).total_seconds() > stale_after):
+            job.state = JOB_FAILED
+            job.error = "Report job was abandoned by the process that accepted it"
+        if job.state == JOB_DONE:
+            job.filename = record.get('artifact_name')
+            job.mimetype = record.get('artifact_type')
+            path = os.path.join(artifact_dir, job.job_id)
+            if os.path.exists(path):
+                job.artifact_path = path
+                job.size = os.path.getsize(path)
+        if job.finished:
+            job._done.set()
+        return job
+
+    @property
+    def finished(self):
+        return self.state in FINISHED_STATES
+
+    @property
+    def queue_ms(self):
+        if self._started_mono is None:
+            return self._recorded_ms.get('queue')
+        return int((self._started_mono - self._queued_mono) * 1000)
+
+    @property
+    def run_ms(self):
+        if self._started_mono is None or self._finished_mono is None:
+            return self._recorded_ms.get('run')
+        return int((self._finished_mono - self._started_mono) * 1000)
+
+    def wait(self, timeout=None):
+        """Block until the job finishes; returns False if the timeout expired"""
+        return self._done.wait(timeout)
+
+    def to_dict(self):
+        return {
+            'jobId': self.job_id,
+            'reportType': self.report_type,
+            'format': self.download_format,
+            'params': self.params,
+            'status': self.state,
+            'queuedAt': self.queued_at.strftime('%Y-%m-%d %H:%M:%S'),
+            'startedAt': self.started_at.strftime('%Y-%m-%d %H:%M:%S') if self.started_at else None,
+            'finishedAt': self.finished_at.strftime('%Y-%m-%d %H:%M:%S') if self.finished_at else None,
+            'queueMs': self.queue_ms,
+            'runMs': self.run_ms,
+            'recordCount': self.record_count,
+            'filename': self.filename,
+            'size': self.size,
+            'error': self.error,
+            'logId': self.log_id
+        }
+
+
+class ReportJobQueue:
+    """
+    Bounded background queue for report generation.
+
+    Jobs run on a small thread pool (database reads, CSV writing). CPU-bound
+    work such as PDF rendering is handed to a separate process pool through
+    run_cpu_bound(), so it neither holds the GIL for request threads nor
+    blocks the web workers. Finished artifacts are written to ``artifact_dir``
+    and kept for ``result_ttl`` seconds.
+
+    Job state lives in the process that accepted the job. With several
+    worker processes, ``load_job`` lets get() rebuild a job held by another
+    process from its stored record, and ``artifact_dir`` must be shared by
+    all of them (the default temp directory is, on a single host). Artifact
+    files older than ``result_ttl`` are deleted whoever wrote them.
+
+    Args:
+        build_artifact: Callable ``(job, run_cpu_bound)`` returning
+            ``(content_bytes, filename, mimetype, record_count)``
+        max_workers (int): Jobs running at the same time
+        max_queue (int): Jobs allowed to wait for a worker; further submits
+            raise QueueFullError
+        render_processes (int): Size of the process pool; 0 renders in the
+            job thread
+        artifact_dir (str, optional): Directory for finished artifacts
+        result_ttl (float): Seconds a finished job and its artifact are kept
+        on_state_change: Optional callable ``(job)`` invoked on every state
+            change (queued, running, done, failed); errors are printed and
+            ignored
+        mp_start_method (str): multiprocessing start method for the process pool
+        load_job: Optional callable ``(job_id)`` returning the stored record
+            (dict) of a job this process does not hold, or None
+        stale_after (float): Seconds after which an unfinished job loaded
+            with ``load_job`` is reported as failed
+    """
+
+    def __init__(self, build_artifact, max_workers=2, max_queue=20, render_processes=2,
+                 artifact_dir=None, result_ttl=3600, on_state_change=None, mp_start_method='spawn',
+                 load_job=None, stale_after=1800):
+        self._build_artifact = build_artifact
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.render_processes = render_processes
+        self.artifact_dir = artifact_dir or os.path.join(tempfile.gettempdir(), 'report_jobs')
+        self.result_ttl = result_ttl
+        self._on_state_change = on_state_change
+        self._mp_start_method = mp_start_method
+        self._load_job = load_job
+        self.stale_after = stale_after
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='report-job')
+        self._process_pool = None
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+        self._total_queue_ms = 0
+        self._total_run_ms = 0
+        os.makedirs(self.artifact_dir, exist_ok=True)
+        # Left over from before a restart or from other processes
+        self._prune_files()
+
+    def submit(self, report_type, download_format, params, context=None):
+        """
+        Queue a report job.
+
+        Raises:
+            QueueFullError: If max_workers jobs are running and max_queue are waiting
+        """
+        job = ReportJob(report_type, download_format, params, context)
+        with self._lock:
+            self._prune()
+            active = sum(1 for j in self._jobs.values() if not j.finished)
+            if active >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise QueueFullError("Report queue is full, try again later")
+            self._jobs[job.job_id] = job
+            self.submitted += 1
+
+        self._prune_files()
+        self._notify(job)
+        self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id):
+        """The job, from this process or, failing that, from its stored record"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None or self._load_job is None:
+            return job
+        return self._load(job_id)
+
+    def _load(self, job_id):
+        if not JOB_ID.match(job_id or ''):
+            return None
+        try:
+            record = self._load_job(job_id)
+        except Exception as e:
+            print(f"Error loading report job {job_id}: {e}")
+            return None
+        return ReportJob.from_record(record, self.artifact_dir, self.stale_after) if record else None
+
+    def wait(self, job, timeout, poll_interval=0.5):
+        """
+        Wait up to ``timeout`` seconds for ``job`` to finish and return its
+        latest state; a job of another process is re-read until then.
+        """
+        if not job.remote:
+            job.wait(timeout)
+            return job
+        deadline = time.monotonic() + timeout
+        while not job.finished:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            time.sleep(min(poll_interval, remaining))
+            job = self._load(job.job_id) or job
+        return job
+
+    def jobs(self):
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda j: j.queued_at, reverse=True)
+
+    def run_cpu_bound(self, func, *args):
+        """Run ``func(*args)`` in the render process pool and return its result"""
+        if not self.render_processes:
+            return func(*args)
+        with self._lock:
+            if self._process_pool is None:
+                self._process_pool = ProcessPoolExecutor(
+                    max_workers=self.render_processes,
+                    mp_context=multiprocessing.get_context(self._mp_start_method)
+                )
+            pool = self._process_pool
+        return pool.submit(func, *args).result()
+
+    def _run(self, job):
+        job.state = JOB_RUNNING
+        job.started_at = datetime.now()
+        job._started_mono = time.monotonic()
+        self._notify(job)
+
+        try:
+            content, filename, mimetype, record_count = self._build_artifact(job, self.run_cpu_bound)
+            path = os.path.join(self.artifact_dir, job.job_id)
+            with open(path, 'wb') as f:
+                f.write(content)
+            job.artifact_path = path
+            job.filename = filename
+            job.mimetype = mimetype
+            job.record_count = record_count
+            job.size = len(content)
+            job.state = JOB_DONE
+        except Exception as e:
+            job.error = str(e)
+            job.state = JOB_FAILED
+        finally:
+            job.finished_at = datetime.now()
+            job._finished_mono = time.monotonic()
+            with self._lock:
+                if job.state == JOB_DONE:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+                self._total_queue_ms += job.queue_ms or 0
+                self._total_run_ms += job.run_ms or 0
+            self._notify(job)
+            job._done.set()
+
+    def _notify(self, job):
+        if not self._on_state_change:
+            return
+        try:
+            self._on_state_change(job)
+        except Exception as e:
+            print(f"Error recording report job {job.job_id} state '{job.state}': {e}")
+
+    def _prune(self):
+        # Caller holds the lock
+        cutoff = time.monotonic() - self.result_ttl
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished and job._finished_mono < cutoff]
+        for job_id in expired:
+            job = self._jobs.pop(job_id)
+            if job.artifact_path:
+                try:
+                    os.remove(job.artifact_path)
+                except OSError:
+                    pass
+
+    def _prune_files(self):
+        """Delete artifact files older than result_ttl, by modification time"""
+        cutoff = time.time() - self.result_ttl
+        try:
+            names = os.listdir(self.artifact_dir)
+        except OSError:
+            return
+        for name in names:
+            if not JOB_ID.match(name):
+                continue
+            path = os.path.join(self.artifact_dir, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def metrics(self):
+        with self._lock:
+            states = {JOB_QUEUED: 0, JOB_RUNNING: 0, JOB_DONE: 0, JOB_FAILED: 0}
+            for job in self._jobs.values():
+                states[job.state] += 1
+            finished = self.completed + self.failed
+            return {
+                'max_workers': self.max_workers,
+                'max_queue': self.max_queue,
+                'render_processes': self.render_processes,
+                'queued': states[JOB_QUEUED],
+                'running': states[JOB_RUNNING],
+                'done': states[JOB_DONE],
+                'failed': states[JOB_FAILED],
+                'submitted': self.submitted,
+                'rejected': self.rejected,
+                'completed_total': self.completed,
+                'failed_total': self.failed,
+                'avg_queue_ms': round(self._total_queue_ms / finished, 1) if finished else 0,
+                'avg_run_ms': round(self._total_run_ms / finished, 1) if finished else 0
+            }
+
+    def shutdown(self, remove_artifacts=False):
+        self._executor.shutdown(wait=False)
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False)
+        if remove_artifacts:
+            shutil.rmtree(self.artifact_dir, ignore_errors=True)
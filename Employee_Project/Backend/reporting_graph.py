@@ -0,0 +1,145 @@
+import re
+
+from role_tree import RoleTree, RoleTreeService
+
+# Current reporting line of every employee: the reporting_person of their
+# latest role allocation. Newer allocation dates win, then newer rows.
+LATEST_ALLOCATIONS = """
+    SELECT employee_id, employee_name, reporting_person
+    FROM (
+        SELECT employee_id, employee_name, reporting_person,
+               ROW_NUMBER() OVER (
+                   PARTITION BY employee_id ORDER BY allocated_date DESC, id DESC
+               ) AS rn
+        FROM employee_role_allocations
+        {where}
+    ) latest
+    WHERE rn = 1
+"""
+
+# reporting_person is free text, written by the allocation form as
+# "EMP001, John Doe, Chief Executive Officer"; top-level roles store
+# "N/A - Top Level Position"
+NO_MANAGER = re.compile(r'^\s*(n/?a\b|none\b|-?\s*$)', re.IGNORECASE)
+
+
+def parse_reporting_person(text):
+    """
+    (manager_id, manager_name) from a reporting_person value, or (None, None)
+    when it names nobody. The ID is returned as typed; callers canonicalize it.
+    """
+    if not text or NO_MANAGER.match(text):
+        return None, None
+    parts = [p.strip() for p in str(text).split(',')]
+    manager_id = parts[0]
+    if not manager_id or ' ' in manager_id:
+        return None, None
+    return manager_id, (parts[1] if len(parts) > 1 and parts[1] else None)
+
+
+class ReportingTree(RoleTree):
+    """RoleTree of employees, each under the manager of their latest allocation"""
+
+    ID_KEY = 'employeeId'
+    NAME_KEY = 'employeeName'
+    PARENT_KEY = 'managerId'
+
+    def direct_reports(self, employee_id):
+        return list(self.children.get(employee_id, ()))
+
+    def headcount(self, employee_id):
+        return {
+            'employeeId': employee_id,
+            'employeeName': self.names[employee_id],
+            'directReports': len(self.children.get(employee_id, ())),
+            'totalReports': self.subtree_sizes().get(employee_id, 0)
+        }
+
+
+class ReportingGraphService(RoleTreeService):
+    """
+    Process-wide reporting tree, loaded from the latest allocations and
+    updated by the allocation write routes through apply_allocations().
+    """
+
+    tree_class = ReportingTree
+
+    def apply_allocations(self, lines, employee_ids):
+        """
+        Update the reporting lines of ``employee_ids``.
+
+        Args:
+            lines: manager_lines() of their latest allocations; an employee
+                without one leaves the tree unless others still report to them
+            employee_ids: Employees whose allocations were written
+        """
+        with self._lock:
+            tree = self._tree
+            if tree is None:
+                return
+            allocated = {line[0] for line in lines}
+            for employee_id in employee_ids:
+                if employee_id in allocated or employee_id not in tree:
+                    continue
+                if tree.children.get(employee_id):
+                    tree = tree.with_role(employee_id, tree.names[employee_id], None)
+                else:
+                    tree = tree.without(employee_id)
+            for row in reporting_rows(lines, known=tree.names):
+                tree = tree.with_role(*row)
+            self._tree = tree
+            self.updates += 1
+
+
+def fetch_latest_allocations(cursor, employee_ids=None):
+    """(employee_id, employee_name, reporting_person) of the latest allocations"""
+    params = ()
+    where = ''
+    if employee_ids is not None:
+        employee_ids = sorted({str(e) for e in employee_ids if e})
+        if not employee_ids:
+            return []
+        where = f"WHERE employee_id IN ({', '.join(['%s'] * len(employee_ids))})"
+        params = employee_ids
+    cursor.execute(LATEST_ALLOCATIONS.format(where=where), params)
+    rows = cursor.fetchall()
+    if rows and isinstance(rows[0], dict):
+        rows = [(r['employee_id'], r['employee_name'], r['reporting_person']) for r in rows]
+    return rows
+
+
+def manager_lines(allocations, resolve_id=None):
+    """
+    (employee_id, employee_name, manager_id, manager_name) per allocation row.
+
+    Args:
+        allocations: (employee_id, employee_name, reporting_person) rows
+        resolve_id: Optional callable mapping a typed manager ID to the
+            canonical employee ID
+    """
+    lines = []
+    for employee_id, employee_name, reporting_person in allocations:
+        manager_id, manager_name = parse_reporting_person(reporting_person)
+        if manager_id and resolve_id:
+            manager_id = resolve_id(manager_id)
+        if manager_id == employee_id:
+            manager_id = None
+        lines.append((employee_id, employee_name, manager_id, manager_name))
+    return lines
+
+
+def reporting_rows(lines, known=()):
+    """
+    Tree rows (employee_id, employee_name, manager_id) for manager_lines().
+
+    Managers without an allocation of their own are added as roots so their
+    reports hang under them instead of becoming roots themselves; ``known``
+    IDs are already in the tree and need no such row.
+    """
+    employees = {line[0] for line in lines}
+    managers = {}
+    for _, _, manager_id, manager_name in lines:
+        if manager_id and manager_id not in employees and manager_id not in known:
+            managers.setdefault(manager_id, manager_name)
+    return ([(m, name, None) for m, name in sorted(managers.items())]
+            + [(employee_id, name, manager_id) for employee_id, name, manager_id, _ in lines])
@@ -0,0 +1,225 @@
+import threading
+import time
+from collections import defaultdict
+
+
+class RoleTree:
+    """
+    Immutable snapshot of the role hierarchy with its ancestor closure.
+
+    ``ancestors[r]`` is the chain from r's parent up to the root, so depth,
+    chain and "is a descendant of" checks are dictionary lookups. A parent
+    that is not a known role, or that would close a cycle, makes the role a
+    root.
+
+    Args:
+        roles: Iterable of (role_id, role_name, parent_role_id)
+    """
+
+    # Keys of the dicts returned by node() and nested()
+    ID_KEY = 'roleId'
+    NAME_KEY = 'roleName'
+    PARENT_KEY = 'parentRoleId'
+
+    def __init__(self, roles=()):
+        self.names = {}
+        self.parents = {}
+        for role_id, role_name, parent_id in roles:
+            self.names[role_id] = role_name or role_id
+            self.parents[role_id] = parent_id or None
+        self._link()
+
+    def _link(self):
+        self.children = defaultdict(list)
+        for role_id, parent_id in self.parents.items():
+            if parent_id is not None and parent_id in self.names and parent_id != role_id:
+                self.children[parent_id].append(role_id)
+        for siblings in self.children.values():
+            siblings.sort()
+        self.ancestors = {}
+        for role_id in self.roots():
+            self._close(role_id, ())
+        # Roles left over sit on a cycle; break it at the first one seen
+        self.detached = []
+        for role_id in sorted(self.names):
+            if role_id not in self.ancestors:
+                self.detached.append(role_id)
+                self._close(role_id, ())
+
+    def _close(self, role_id, chain):
+        stack = [(role_id, chain)]
+        while stack:
+            role_id, chain = stack.pop()
+            if role_id in self.ancestors:
+                continue
+            self.ancestors[role_id] = chain
+            below = (role_id,) + chain
+            stack.extend((child, below) for child in self.children.get(role_id, ()))
+
+    def roots(self):
+        return sorted(r for r, p in self.parents.items()
+                      if p is None or p not in self.names or p == r)
+
+    def __contains__(self, role_id):
+        return role_id in self.names
+
+    def __len__(self):
+        return len(self.names)
+
+    def parent(self, role_id):
+        chain = self.ancestors.get(role_id, ())
+        return chain[0] if chain else None
+
+    def depth(self, role_id):
+        return len(self.ancestors[role_id])
+
+    def descendants(self, role_id):
+        """Every role below ``role_id``, parents before children"""
+        result = []
+        stack = list(reversed(self.children.get(role_id, ())))
+        while stack:
+            child = stack.pop()
+            result.append(child)
+            stack.extend(reversed(self.children.get(child, ())))
+        return result
+
+    def is_ancestor(self, ancestor_id, role_id):
+        return ancestor_id in self.ancestors.get(role_id, ())
+
+    def with_role(self, role_id, role_name, parent_id):
+        """
+        A new tree with one role added or changed.
+
+        Renaming shares the closure with this snapshot and moving a role only
+        recomputes the closure of its subtree. A move that would create a
+        cycle, or a new role that others already name as parent, relinks the
+        whole tree.
+        """
+        parent_id = parent_id or None
+        tree = type(self).__new__(type(self))
+        tree.names = dict(self.names)
+        tree.parents = dict(self.parents)
+        tree.names[role_id] = role_name or role_id
+        tree.parents[role_id] = parent_id
+        new_parent = parent_id if parent_id in self.names and parent_id != role_id else None
+
+        if role_id in self.names and new_parent == self.parent(role_id) and role_id not in self.detached:
+            tree.children, tree.ancestors, tree.detached = self.children, self.ancestors, self.detached
+            return tree
+        if (self.detached or (role_id not in self.names and role_id in self.parents.values())
+                or (new_parent is not None and self.is_ancestor(role_id, new_parent))):
+            tree._link()
+            return tree
+
+        tree.children = defaultdict(list, {k: list(v) for k, v in self.children.items()})
+        tree.ancestors = dict(self.ancestors)
+        tree.detached = []
+        old_parent = self.parent(role_id) if role_id in self.names else None
+        if old_parent is not None:
+            tree.children[old_parent].remove(role_id)
+        if new_parent is not None:
+            tree.children[new_parent] = sorted(tree.children[new_parent] + [role_id])
+        chain = ((new_parent,) + tree.ancestors[new_parent]) if new_parent is not None else ()
+        for member in [role_id] + self.descendants(role_id):
+            tree.ancestors.pop(member, None)
+        tree._close(role_id, chain)
+        return tree
+
+    def subtree_sizes(self):
+        """{role_id: number of roles below it} for every role with sub-roles"""
+        sizes = getattr(self, '_sizes', None)
+        if sizes is None:
+            sizes = defaultdict(int)
+            for chain in self.ancestors.values():
+                for ancestor in chain:
+                    sizes[ancestor] += 1
+            self._sizes = sizes = dict(sizes)
+        return sizes
+
+    def node(self, role_id):
+        return {
+            self.ID_KEY: role_id,
+            self.NAME_KEY: self.names[role_id],
+            self.PARENT_KEY: self.parent(role_id) or '',
+            'depth': self.depth(role_id)
+        }
+
+    def nested(self, role_id, max_depth=None):
+        """``role_id`` and its subtree as nested dicts with a children list"""
+        node = self.node(role_id)
+        node['children'] = []
+        stack = [(node, role_id, 0)]
+        while stack:
+            parent_node, parent_id, level = stack.pop()
+            if max_depth is not None and level >= max_depth:
+                continue
+            for child in self.children.get(parent_id, ()):
+                child_node = self.node(child)
+                child_node['children'] = []
+                parent_node['children'].append(child_node)
+                stack.append((child_node, child, level + 1))
+        return node
+
+
+class RoleTreeService:
+    """
+    Process-wide role tree, loaded with ``loader()`` on first use and
+    reloaded after ``ttl`` seconds so other worker processes' role writes
+    show up. Role writes in this process call apply() so the tree changes
+    immediately, without a reload.
+
+    Args:
+        loader: Callable returning (role_id, role_name, parent_role_id) rows
+        ttl (float): Seconds before the tree is reloaded
+    """
+
+    tree_class = RoleTree
+
+    def __init__(self, loader, ttl=300):
+        self.loader = loader
+        self.ttl = ttl
+        self._tree = None
+        self._loaded_at = 0
+        self._lock = threading.Lock()
+        self.reloads = 0
+        self.updates = 0
+
+    def tree(self):
+        with self._lock:
+            if self._tree is not None and time.monotonic() - self._loaded_at < self.ttl:
+                return self._tree
+        return self.reload()
+
+    def reload(self):
+        tree = self.tree_class(self.loader())
+        with self._lock:
+            self._tree = tree
+            self._loaded_at = time.monotonic()
+            self.reloads += 1
+        return tree
+
+    def apply(self, rows):
+        """Add or change roles from (role_id, role_name, parent_role_id) rows"""
+        with self._lock:
+            if self._tree is None:
+                return
+            tree = self._tree
+            for role_id, role_name, parent_id in rows:
+                tree = tree.with_role(role_id, role_name, parent_id)
+            self._tree = tree
+            self.updates += 1
+
+    def invalidate(self):
+        with self._lock:
+            self._tree = None
+
+    def stats(self):
+        with self._lock:
+            tree = self._tree
+            return {
+                'loaded': tree is not None,
+                'roles': len(tree) if tree is not None else 0,
+                'roots': len(tree.roots()) if tree is not None else 0,
+                'reloads': self.reloads,
+                'updates': self.updates
+            }
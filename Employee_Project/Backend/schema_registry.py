@@ -0,0 +1,120 @@
+import threading
+import time
+
+from mysql.connector import Error
+
+# MySQL errors that mean our cached view of the schema is out of date
+SCHEMA_CHANGE_ERRNOS = (
+    1054,  # ER_BAD_FIELD_ERROR: unknown column
+    1146,  # ER_NO_SUCH_TABLE
+)
+
+
+class SchemaRegistry:
+    """
+    Cached column sets for every table in the current database.
+
+    The schema is read from information_schema once (at startup or on first
+    use) instead of running SHOW COLUMNS / DESCRIBE inside requests. Routes
+    that build SQL from the available columns register a builder with
+    compiled(); the statement is built once and reused until the next
+    refresh().
+
+    Args:
+        get_connection: Callable returning a DB connection (or None)
+        max_age (float): Seconds before the cache is reloaded; 0 keeps it
+            until refresh() is called
+    """
+
+    def __init__(self, get_connection, max_age=0):
+        self._get_connection = get_connection
+        self.max_age = max_age
+        self._lock = threading.RLock()
+        self._tables = None
+        self._compiled = {}
+        self._loaded_at = None
+
+    def load(self):
+        """Read column names for all tables from information_schema"""
+        conn = self._get_connection()
+        if not conn:
+            raise Error(msg="Database connection failed while loading schema")
+
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                SELECT TABLE_NAME, COLUMN_NAME
+                FROM information_schema.COLUMNS
+                WHERE TABLE_SCHEMA = DATABASE()
+                ORDER BY TABLE_NAME, ORDINAL_POSITION
+            """)
+            tables = {}
+            for table_name, column_name in cursor.fetchall():
+                tables.setdefault(table_name, []).append(column_name)
+        finally:
+            cursor.close()
+            conn.close()
+
+        with self._lock:
+            self._tables = {name: tuple(cols) for name, cols in tables.items()}
+            self._compiled = {}
+            self._loaded_at = time.monotonic()
+        return self._tables
+
+    def refresh(self):
+        """Drop cached columns and compiled statements and reload them"""
+        with self._lock:
+            self._tables = None
+            self._compiled = {}
+        return self.load()
+
+    def invalidate_on_error(self, error):
+        """Reload the schema if ``error`` indicates a column or table changed"""
+        if getattr(error, 'errno', None) in SCHEMA_CHANGE_ERRNOS:
+            try:
+                self.refresh()
+            except Error as e:
+                print(f"Error refreshing schema cache: {e}")
+            return True
+        return False
+
+    def _ensure_loaded(self):
+        with self._lock:
+            expired = (self.max_age and self._loaded_at is not None
+                       and time.monotonic() - self._loaded_at > self.max_age)
+            if self._tables is None or expired:
+                self.load()
+            return self._tables
+
+    def columns(self, table):
+        """Column names of ``table`` in ordinal order (empty if the table is missing)"""
+        return self._ensure_loaded().get(table, ())
+
+    def has_table(self, table):
+        return table in self._ensure_loaded()
+
+    def has_column(self, table, column):
+        return column in self.columns(table)
+
+    def compiled(self, key, builder):
+        """
+        Return the statement registered under ``key``, building it on first use.
+
+        Args:
+            key (str): Cache key, unique per statement
+            builder: Callable taking this registry and returning the statement
+                (any value, e.g. a (sql, field_name) tuple)
+        """
+        self._ensure_loaded()
+        with self._lock:
+            if key not in self._compiled:
+                self._compiled[key] = builder(self)
+            return self._compiled[key]
+
+    def summary(self):
+        tables = self._ensure_loaded()
+        return {
+            'tables': len(tables),
+            'columns': {name: list(cols) for name, cols in tables.items()},
+            'compiled_statements': sorted(self._compiled)
+        }
@@ -0,0 +1,191 @@
+import re
+
+# One search document per entity, kept in sync by the write routes. The
+# ngram FULLTEXT parser indexes 2-character grams, so partial names and IDs
+# ("PRO1", "kum") match without a leading-wildcard LIKE.
+CREATE_SEARCH_TABLE = """
+    CREATE TABLE IF NOT EXISTS search_documents (
+        entity_type VARCHAR(20) NOT NULL,
+        entity_id VARCHAR(50) NOT NULL,
+        title VARCHAR(255),
+        subtitle VARCHAR(255),
+        keywords TEXT,
+        body TEXT,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        PRIMARY KEY (entity_type, entity_id),
+        FULLTEXT INDEX ft_search_title (title) WITH PARSER ngram,
+        FULLTEXT INDEX ft_search_all (title, keywords, body) WITH PARSER ngram
+    )
+"""
+
+# Columns that make up each document. Only the columns present in the live
+# schema are used, since installations differ.
+SEARCH_SOURCES = {
+    'employee': {
+        'table': 'employees',
+        'key': 'employee_id',
+        'title': ['first_name', 'last_name'],
+        'subtitle': ['role_name', 'email'],
+        'keywords': ['employee_id', 'email', 'mobile'],
+        'body': ['qualification', 'joining_location']
+    },
+    'project': {
+        'table': 'projects',
+        'key': 'project_id',
+        'title': ['project_name'],
+        'subtitle': ['client_name', 'product_name'],
+        'keywords': ['project_id', 'project_client_id', 'client_id', 'product_id'],
+        'body': ['description', 'project_description']
+    },
+    'product': {
+        'table': 'products',
+        'key': 'product_id',
+        'title': ['product_name'],
+        'subtitle': ['product_status'],
+        'keywords': ['product_id'],
+        'body': ['product_description', 'product_technical', 'product_framework']
+    },
+    'client': {
+        'table': 'clients',
+        'key': 'client_id',
+        'title': ['client_name'],
+        'subtitle': ['contact_name', 'contact_person'],
+        'keywords': ['client_id', 'communication_email', 'contact_email', 'contact_mobile'],
+        'body': ['client_description', 'client_address']
+    },
+    'task': {
+        'table': 'tasks',
+        'key': 'task_id',
+        'title': ['task_name'],
+        'subtitle': ['project_name', 'project_id'],
+        'keywords': ['task_id', 'project_id'],
+        'body': ['task_description', 'description']
+    }
+}
+
+SEARCH_TYPES = tuple(SEARCH_SOURCES)
+MIN_TERM_LENGTH = 2
+BOOLEAN_OPERATORS = re.compile(r'[+\-<>()~*"@]')
+
+
+def _document_select(entity_type, columns):
+    """SELECT list building one document row from the source table, or None"""
+    source = SEARCH_SOURCES[entity_type]
+    available = set(columns(source['table']))
+    if source['key'] not in available:
+        return None
+
+    def concat(part, limit):
+        cols = [c for c in source[part] if c in available]
+        if not cols:
+            return 'NULL'
+        expr = f"CONCAT_WS(' ', {', '.join(cols)})"
+        return f"LEFT({expr}, {limit})" if limit else expr
+
+    return (f"'{entity_type}', {source['key']}, {concat('title', 255)}, {concat('subtitle', 255)}, "
+            f"{concat('keywords', None)}, {concat('body', None)}")
+
+
+def _insert_documents(cursor, entity_type, columns, where='', params=()):
+    select = _document_select(entity_type, columns)
+    if select is None:
+        return 0
+    source = SEARCH_SOURCES[entity_type]
+    cursor.execute(f"""
+        INSERT INTO search_documents (entity_type, entity_id, title, subtitle, keywords, body)
+        SELECT {select} FROM {source['table']} {where}
+    """, params)
+    return cursor.rowcount
+
+
+def reindex_entities(cursor, entity_type, entity_ids, columns):
+    """
+    Rebuild the documents of some entities from their source rows.
+
+    Entities that no longer exist lose their document. Runs on the caller's
+    cursor so the index commits with the write.
+
+    Args:
+        cursor: Cursor in the write's transaction
+        entity_type (str): Key of SEARCH_SOURCES
+        entity_ids: IDs that were inserted, updated or deleted
+        columns: Callable returning the column names of a table
+    """
+    entity_ids = [str(i) for i in entity_ids if i not in (None, '')]
+    if not entity_ids:
+        return
+    placeholders = ', '.join(['%s'] * len(entity_ids))
+    cursor.execute(f"DELETE FROM search_documents WHERE entity_type = %s AND entity_id IN ({placeholders})",
+                   [entity_type] + entity_ids)
+    key = SEARCH_SOURCES[entity_type]['key']
+    _insert_documents(cursor, entity_type, columns, f"WHERE {key} IN ({placeholders})", entity_ids)
+
+
+def rebuild_search_index(conn, columns):
+    """
+    Regenerate every search document, one transaction per entity type.
+
+    Returns:
+        dict: Documents written per entity type
+    """
+    cursor = conn.cursor()
+    counts = {}
+    try:
+        cursor.execute(CREATE_SEARCH_TABLE)
+        for entity_type, source in SEARCH_SOURCES.items():
+            cursor.execute("DELETE FROM search_documents WHERE entity_type = %s", (entity_type,))
+            counts[entity_type] = _insert_documents(cursor, entity_type, columns)
+            conn.commit()
+    finally:
+        cursor.close()
+    return counts
+
+
+def search_terms(query):
+    """Words of ``query`` long enough for the ngram index, operators removed"""
+    words = BOOLEAN_OPERATORS.sub(' ', query or '').split()
+    return [w for w in words if len(w) >= MIN_TERM_LENGTH][:8]
+
+
+def search(cursor, query, types=None, limit=10, max_execution_ms=500):
+    """
+    Top ``limit`` documents matching every term of ``query``.
+
+    Title matches weigh three times as much as matches elsewhere and an
+    exact ID match always ranks first. MAX_EXECUTION_TIME caps the query so
+    latency stays bounded as the tables grow.
+
+    Returns:
+        list: Dicts with type, id, title, subtitle and score
+    """
+    terms = search_terms(query)
+    if not terms:
+        return []
+    boolean_query = ' '.join(f'+"{term}"' for term in terms)
+    sql = f"""
+        SELECT /*+ MAX_EXECUTION_TIME({int(max_execution_ms)}) */
+            entity_type, entity_id, title, subtitle,
+            MATCH(title) AGAINST (%s IN BOOLEAN MODE) * 3
+              + MATCH(title, keywords, body) AGAINST (%s IN BOOLEAN MODE)
+              + IF(entity_id = %s, 100, 0) AS score
+        FROM search_documents
+        WHERE MATCH(title, keywords, body) AGAINST (%s IN BOOLEAN MODE)
+    """
+    params = [boolean_query, boolean_query, query.strip(), boolean_query]
+    if types:
+        sql += f" AND entity_type IN ({', '.join(['%s'] * len(types))})"
+        params.extend(types)
+    sql += " ORDER BY score DESC, entity_type, entity_id LIMIT %s"
+    params.append(int(limit))
+    cursor.execute(sql, params)
+    rows = cursor.fetchall()
+    if rows and not isinstance(rows[0], dict):
+        names = [d[0] for d in cursor.description]
+        rows = [dict(zip(names, row)) for row in rows]
+    return [{
+        'type': row['entity_type'],
+        'id': row['entity_id'],
+        'title': row['title'],
+        'subtitle': row['subtitle'],
+        'score': round(float(row['score'] or 0), 4)
+    } for row in rows]
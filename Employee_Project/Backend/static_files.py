@@ -0,0 +1,91 @@
+import hashlib
+import mimetypes
+import os
+import re
+
+from flask import abort, make_response, request, send_file
+
+from ref_cache import TTLCache
+
+# Uploads are saved under names containing a uuid4 hex, and a name is never
+# reused for different content, so those files can be cached for good
+UUID_NAME = re.compile(r'(?<![0-9a-f])[0-9a-f]{32}(?![0-9a-f])')
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+# Content hashes are computed once per file version (path, mtime, size)
+_etags = TTLCache('file_etags', maxsize=4096, ttl=24 * 3600)
+
+
+def is_immutable_name(filename):
+    return bool(UUID_NAME.search(os.path.basename(filename)))
+
+
+def file_etag(path, stat):
+    """Strong ETag from the file's SHA-256, cached until the file changes"""
+    key = (path, stat.st_mtime_ns, stat.st_size)
+
+    def digest():
+        sha = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                sha.update(chunk)
+        return sha.hexdigest()[:32]
+
+    return _etags.get_or_load(key, digest)
+
+
+def resolve_path(directory, filename):
+    """Absolute path of ``filename`` inside ``directory``, or None if it escapes or is missing"""
+    root = os.path.realpath(directory)
+    path = os.path.realpath(os.path.join(root, filename))
+    if not path.startswith(root + os.sep) or not os.path.isfile(path):
+        return None
+    return path
+
+
+def send_cached_file(directory, filename, max_age=0, accel_prefix=None):
+    """
+    Serve a file with a strong ETag, Last-Modified and Cache-Control.
+
+    Conditional requests (If-None-Match, If-Modified-Since) get a 304 and
+    Range requests a 206, both handled by werkzeug. uuid-named files are
+    marked immutable for a year; other files get ``max_age``.
+
+    When ``accel_prefix`` is set (running behind nginx) the body is not
+    sent from Python: the response carries X-Accel-Redirect to
+    ``accel_prefix + filename`` and the proxy serves the file, ranges
+    included. Without it, Flask's USE_X_SENDFILE or the server's
+    wsgi.file_wrapper avoid copying the file through Python.
+
+    Args:
+        directory (str): Folder the file is served from
+        filename (str): Requested name, relative to ``directory``
+        max_age (int): Cache lifetime in seconds for files that may change
+        accel_prefix (str, optional): Internal nginx location of ``directory``
+    """
+    path = resolve_path(directory, filename)
+    if path is None:
+        abort(404)
+    stat = os.stat(path)
+    etag = file_etag(path, stat)
+    if is_immutable_name(filename):
+        cache_control = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    elif max_age:
+        cache_control = f'public, max-age={int(max_age)}'
+    else:
+        cache_control = 'no-cache'
+
+    if accel_prefix and request.if_none_match.contains(etag):
+        # Answered here, since the proxy only sees the internal redirect
+        response = make_response('', 304)
+        response.set_etag(etag)
+    elif accel_prefix:
+        response = make_response('')
+        response.headers['X-Accel-Redirect'] = accel_prefix.rstrip('/') + '/' + filename
+        response.headers['Content-Type'] = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        response.set_etag(etag)
+        response.last_modified = stat.st_mtime
+    else:
+        response = send_file(path, etag=etag, last_modified=stat.st_mtime, conditional=True, max_age=None)
+    response.headers['Cache-Control'] = cache_control
+    return response
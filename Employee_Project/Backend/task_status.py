@@ -0,0 +1,105 @@
+# Latest task_update row per task. task_update stays the append-only
+# history; this projection is what list and allocation views read.
+CREATE_TASK_CURRENT_STATUS_TABLE = """
+    CREATE TABLE IF NOT EXISTS task_current_status (
+        task_id VARCHAR(50) PRIMARY KEY,
+        task_name VARCHAR(255),
+        task_status VARCHAR(50),
+        reason TEXT,
+        allocate_by VARCHAR(100),
+        employee_id VARCHAR(50),
+        assigned_date DATE,
+        target_date DATE,
+        update_id INT NOT NULL,
+        updated_at DATETIME,
+        INDEX idx_employee_status (employee_id, task_status, updated_at),
+        INDEX idx_status (task_status)
+    )
+"""
+
+PROJECTION_COLUMNS = """
+    task_id, task_name, task_status, reason, allocate_by,
+    employee_id, assigned_date, target_date, update_id, updated_at
+"""
+
+PROJECTION_SELECT = """
+    SELECT task_id, task_name, task_status, reason, allocate_by,
+           employee_id, assigned_date, target_date, id, created_at
+    FROM task_update
+"""
+
+
+def record_task_status(cursor, update_id):
+    """
+    Make the task_update row ``update_id`` the current status of its task.
+
+    Call it right after inserting the row, on the same cursor, so history
+    and projection commit together. The newest insert always wins, which is
+    what MAX(created_at) over the history returns.
+    """
+    cursor.execute(f"""
+        INSERT INTO task_current_status ({PROJECTION_COLUMNS})
+        {PROJECTION_SELECT}
+        WHERE id = %s
+        ON DUPLICATE KEY UPDATE
+            task_name = VALUES(task_name),
+            task_status = VALUES(task_status),
+            reason = VALUES(reason),
+            allocate_by = VALUES(allocate_by),
+            employee_id = VALUES(employee_id),
+            assigned_date = VALUES(assigned_date),
+            target_date = VALUES(target_date),
+            update_id = VALUES(update_id),
+            updated_at = VALUES(updated_at)
+    """, (update_id,))
+
+
+def current_statuses(cursor, task_ids):
+    """{task_id: projection row} for ``task_ids`` (primary-key lookups)"""
+    task_ids = sorted({t for t in task_ids if t})
+    if not task_ids:
+        return {}
+    placeholders = ', '.join(['%s'] * len(task_ids))
+    cursor.execute(f"""
+        SELECT task_id, task_name, task_status, reason, employee_id, updated_at
+        FROM task_current_status
+        WHERE task_id IN ({placeholders})
+    """, task_ids)
+    rows = cursor.fetchall()
+    if rows and not isinstance(rows[0], dict):
+        names = [d[0] for d in cursor.description]
+        rows = [dict(zip(names, row)) for row in rows]
+    return {row['task_id']: row for row in rows}
+
+
+def rebuild_task_status(conn):
+    """
+    Regenerate task_current_status from the full task_update history.
+
+    Returns:
+        int: Number of tasks in the projection
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute(CREATE_TASK_CURRENT_STATUS_TABLE)
+        cursor.execute("DELETE FROM task_current_status")
+        cursor.execute(f"""
+            INSERT INTO task_current_status ({PROJECTION_COLUMNS})
+            SELECT task_id, task_name, task_status, reason, allocate_by,
+                   employee_id, assigned_date, target_date, id, created_at
+            FROM (
+                SELECT u.*, ROW_NUMBER() OVER (
+                    PARTITION BY task_id ORDER BY created_at DESC, id DESC
+                ) AS rn
+                FROM task_update u
+            ) latest
+            WHERE rn = 1
+        """)
+        count = cursor.rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return count
@@ -0,0 +1,179 @@
+import json
+from decimal import Decimal
+
+# One row per assigned/misc task line of a timesheet entry. employee_id and
+# entry_date are copied from the entry so range aggregates can be answered
+# from the indexes without joining time_sheet_entries.
+CREATE_TASK_LINES_TABLE = """
+    CREATE TABLE IF NOT EXISTS time_sheet_task_lines (
+        line_id INT AUTO_INCREMENT PRIMARY KEY,
+        entry_id INT NOT NULL,
+        line_type VARCHAR(10) NOT NULL,
+        line_no INT NOT NULL,
+        employee_id VARCHAR(50) NOT NULL,
+        entry_date DATE NOT NULL,
+        task_id VARCHAR(20),
+        task_name VARCHAR(255),
+        project_id VARCHAR(20),
+        task_description TEXT,
+        time_spent DECIMAL(6,2) NOT NULL DEFAULT 0,
+        remarks TEXT,
+        UNIQUE KEY uq_entry_line (entry_id, line_type, line_no),
+        INDEX idx_task_date (task_id, entry_date, time_spent),
+        INDEX idx_project_date (project_id, entry_date, time_spent),
+        INDEX idx_employee_date (employee_id, entry_date, time_spent)
+    )
+"""
+
+LINE_ASSIGNED = 'assigned'
+LINE_MISC = 'misc'
+
+INSERT_TASK_LINE = """
+    INSERT INTO time_sheet_task_lines (
+        entry_id, line_type, line_no, employee_id, entry_date,
+        task_id, task_name, project_id, task_description, time_spent, remarks
+    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+
+def parse_task_json(value):
+    """Decode an assigned_tasks/misc_tasks column; bad or empty JSON gives []"""
+    if not value:
+        return []
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    try:
+        tasks = json.loads(value)
+    except (TypeError, ValueError):
+        return []
+    return tasks if isinstance(tasks, list) else []
+
+
+def to_hours(value):
+    try:
+        return Decimal(str(value or 0)).quantize(Decimal('0.01'))
+    except ArithmeticError:
+        return Decimal('0.00')
+
+
+def task_project_ids(cursor, task_ids):
+    """project_id for each task id, looked up in one query"""
+    task_ids = sorted({t for t in task_ids if t})
+    if not task_ids:
+        return {}
+    placeholders = ', '.join(['%s'] * len(task_ids))
+    cursor.execute(f"SELECT task_id, project_id FROM tasks WHERE task_id IN ({placeholders})", task_ids)
+    rows = cursor.fetchall()
+    if rows and isinstance(rows[0], dict):
+        return {row['task_id']: row['project_id'] for row in rows}
+    return {row[0]: row[1] for row in rows}
+
+
+def build_task_lines(entry_id, employee_id, entry_date, assigned_tasks, misc_tasks, project_ids):
+    """INSERT_TASK_LINE parameter tuples for one entry's decoded task lists"""
+    lines = []
+    for line_no, task in enumerate(assigned_tasks):
+        if not isinstance(task, dict):
+            continue
+        task_id = task.get('task_id') or None
+        lines.append((
+            entry_id, LINE_ASSIGNED, line_no, employee_id, entry_date,
+            task_id, task.get('task_name'), project_ids.get(task_id),
+            None, to_hours(task.get('time_spent')), task.get('remarks')
+        ))
+    for line_no, task in enumerate(misc_tasks):
+        if not isinstance(task, dict):
+            continue
+        lines.append((
+            entry_id, LINE_MISC, line_no, employee_id, entry_date,
+            None, None, None,
+            task.get('task_description'), to_hours(task.get('time_spent')), task.get('remarks')
+        ))
+    return lines
+
+
+def sync_entry_task_lines(cursor, entry_id):
+    """
+    Rewrite the task lines of one entry from its JSON columns.
+
+    Runs on the caller's cursor so it commits (or rolls back) together with
+    the entry write.
+
+    Returns:
+        int: Number of lines written (0 if the entry no longer exists)
+    """
+    cursor.execute("DELETE FROM time_sheet_task_lines WHERE entry_id = %s", (entry_id,))
+    cursor.execute("""
+        SELECT entry_id, employee_id, entry_date, assigned_tasks, misc_tasks
+        FROM time_sheet_entries WHERE entry_id = %s
+    """, (entry_id,))
+    row = cursor.fetchone()
+    if not row:
+        return 0
+    if isinstance(row, dict):
+        row = (row['entry_id'], row['employee_id'], row['entry_date'], row['assigned_tasks'], row['misc_tasks'])
+    lines = lines_for_entries(cursor, [row])
+    if lines:
+        cursor.executemany(INSERT_TASK_LINE, lines)
+    return len(lines)
+
+
+def lines_for_entries(cursor, entries):
+    """Task line tuples for (entry_id, employee_id, entry_date, assigned_json, misc_json) rows"""
+    decoded = [(entry_id, employee_id, entry_date, parse_task_json(assigned), parse_task_json(misc))
+               for entry_id, employee_id, entry_date, assigned, misc in entries]
+    project_ids = task_project_ids(
+        cursor, [task.get('task_id') for _, _, _, assigned, _ in decoded
+                 for task in assigned if isinstance(task, dict)]
+    )
+    lines = []
+    for entry_id, employee_id, entry_date, assigned, misc in decoded:
+        lines.extend(build_task_lines(entry_id, employee_id, entry_date, assigned, misc, project_ids))
+    return lines
+
+
+def backfill_task_lines(conn, batch_size=500):
+    """
+    Rebuild time_sheet_task_lines from the JSON columns of every entry.
+
+    Entries are processed in primary-key order, one transaction per batch,
+    so the migration can be re-run safely and does not hold long locks.
+
+    Returns:
+        dict: entries and lines processed
+    """
+    cursor = conn.cursor()
+    last_id = 0
+    entries_done = 0
+    lines_done = 0
+    try:
+        while True:
+            cursor.execute("""
+                SELECT entry_id, employee_id, entry_date, assigned_tasks, misc_tasks
+                FROM time_sheet_entries
+                WHERE entry_id > %s
+                ORDER BY entry_id
+                LIMIT %s
+            """, (last_id, batch_size))
+            entries = cursor.fetchall()
+            if not entries:
+                break
+            first_id, last_id = entries[0][0], entries[-1][0]
+            lines = lines_for_entries(cursor, entries)
+            cursor.execute("DELETE FROM time_sheet_task_lines WHERE entry_id BETWEEN %s AND %s",
+                           (first_id, last_id))
+            if lines:
+                cursor.executemany(INSERT_TASK_LINE, lines)
+            conn.commit()
+            entries_done += len(entries)
+            lines_done += len(lines)
+        # Lines whose entry has been deleted
+        cursor.execute("""
+            DELETE l FROM time_sheet_task_lines l
+            LEFT JOIN time_sheet_entries e ON e.entry_id = l.entry_id
+            WHERE e.entry_id IS NULL
+        """)
+        conn.commit()
+    finally:
+        cursor.close()
+    return {'entries': entries_done, 'lines': lines_done}
@@ -0,0 +1,180 @@
+import calendar
+from datetime import date, datetime, timedelta
+
+# Per-period hour totals keyed by (employee_id, period_start, project_id).
+# project_id '' collects hours without a project and ALL_PROJECTS holds the
+# employee's total for the period, so dashboard reads are a single
+# primary-key lookup.
+ROLLUP_TABLES = {
+    'day': 'time_sheet_rollup_daily',
+    'week': 'time_sheet_rollup_weekly',
+    'month': 'time_sheet_rollup_monthly',
+}
+ALL_PROJECTS = '*'
+
+CREATE_ROLLUP_TABLE = """
+    CREATE TABLE IF NOT EXISTS {table} (
+        employee_id VARCHAR(50) NOT NULL,
+        period_start DATE NOT NULL,
+        project_id VARCHAR(20) NOT NULL,
+        summary_hours DECIMAL(10,2) NOT NULL DEFAULT 0,
+        summary_count INT NOT NULL DEFAULT 0,
+        logged_hours DECIMAL(10,2) NOT NULL DEFAULT 0,
+        approved_hours DECIMAL(10,2) NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        PRIMARY KEY (employee_id, period_start, project_id)
+    )
+"""
+
+# First day of the period containing src.entry_date (weeks start on Monday)
+PERIOD_START_SQL = {
+    'day': "src.entry_date",
+    'week': "DATE_SUB(src.entry_date, INTERVAL WEEKDAY(src.entry_date) DAY)",
+    'month': "DATE_SUB(src.entry_date, INTERVAL DAYOFMONTH(src.entry_date) - 1 DAY)",
+}
+
+# Hours from saved summaries and from timesheet task lines (approved
+# hours follow the status of the entry)
+ROLLUP_SOURCE_SQL = """
+    SELECT employee_id, entry_date, IFNULL(project_id, '') AS project_id,
+           total_hours AS summary_hours, 1 AS summary_count,
+           0 AS logged_hours, 0 AS approved_hours
+    FROM time_sheet_summary
+    {summary_where}
+    UNION ALL
+    SELECT l.employee_id, l.entry_date, IFNULL(l.project_id, '') AS project_id,
+           0, 0, l.time_spent,
+           CASE WHEN e.status = 'approved' THEN l.time_spent ELSE 0 END
+    FROM time_sheet_task_lines l
+    JOIN time_sheet_entries e ON e.entry_id = l.entry_id
+    {lines_where}
+"""
+
+ROLLUP_INSERT_SQL = """
+    INSERT INTO {table} (
+        employee_id, period_start, project_id,
+        summary_hours, summary_count, logged_hours, approved_hours
+    )
+    SELECT employee_id, {period_start} AS period_start, project_id,
+           SUM(summary_hours), SUM(summary_count), SUM(logged_hours), SUM(approved_hours)
+    FROM ({source}) src
+    GROUP BY employee_id, period_start, project_id
+    UNION ALL
+    SELECT employee_id, {period_start} AS period_start, '{all_projects}',
+           SUM(summary_hours), SUM(summary_count), SUM(logged_hours), SUM(approved_hours)
+    FROM ({source}) src
+    GROUP BY employee_id, period_start
+"""
+
+
+def create_rollup_tables(cursor):
+    for table in ROLLUP_TABLES.values():
+        cursor.execute(CREATE_ROLLUP_TABLE.format(table=table))
+
+
+def to_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value)[:10], '%Y-%m-%d').date()
+
+
+def period_bounds(period, day):
+    """(first day, last day) of the day/week/month containing ``day``"""
+    day = to_date(day)
+    if period == 'day':
+        return day, day
+    if period == 'week':
+        start = day - timedelta(days=day.weekday())
+        return start, start + timedelta(days=6)
+    if period == 'month':
+        last = calendar.monthrange(day.year, day.month)[1]
+        return day.replace(day=1), day.replace(day=last)
+    raise ValueError(f"Unknown rollup period: {period}")
+
+
+def _insert_sql(period, summary_where='', lines_where=''):
+    source = ROLLUP_SOURCE_SQL.format(summary_where=summary_where, lines_where=lines_where)
+    return ROLLUP_INSERT_SQL.format(table=ROLLUP_TABLES[period], period_start=PERIOD_START_SQL[period],
+                                    source=source, all_projects=ALL_PROJECTS)
+
+
+def refresh_rollups(cursor, changes):
+    """
+    Recompute the rollup rows touched by a write.
+
+    Only the periods containing the changed dates are recomputed, each from
+    an index range over one employee's rows, on the caller's cursor so the
+    rollups commit together with the write.
+
+    Args:
+        cursor: Cursor inside the write's transaction
+        changes: Iterable of (employee_id, entry_date) pairs; include both the
+            old and new values when an entry moves
+    """
+    periods = set()
+    for employee_id, entry_date in changes:
+        if not employee_id or not entry_date:
+            continue
+        for period in ROLLUP_TABLES:
+            periods.add((period, str(employee_id), period_bounds(period, entry_date)))
+
+    for period, employee_id, (start, end) in sorted(periods):
+        cursor.execute(f"DELETE FROM {ROLLUP_TABLES[period]} WHERE employee_id = %s AND period_start = %s",
+                       (employee_id, start))
+        sql = _insert_sql(
+            period,
+            summary_where="WHERE employee_id = %s AND entry_date BETWEEN %s AND %s",
+            lines_where="WHERE l.employee_id = %s AND l.entry_date BETWEEN %s AND %s"
+        )
+        window = (employee_id, start, end)
+        cursor.execute(sql, window * 4)
+
+
+def rebuild_rollups(conn):
+    """
+    Regenerate every rollup table from time_sheet_summary and the task lines.
+
+    Returns:
+        dict: Row count per period
+    """
+    cursor = conn.cursor()
+    counts = {}
+    try:
+        create_rollup_tables(cursor)
+        for period, table in ROLLUP_TABLES.items():
+            cursor.execute(f"DELETE FROM {table}")
+            cursor.execute(_insert_sql(period))
+            counts[period] = cursor.rowcount
+            conn.commit()
+    finally:
+        cursor.close()
+    return counts
+
+
+def read_rollup(cursor, employee_id, period, day, project_id=ALL_PROJECTS):
+    """Rollup row for the period containing ``day`` (zeros when there is none)"""
+    start, end = period_bounds(period, day)
+    cursor.execute(f"""
+        SELECT summary_hours, summary_count, logged_hours, approved_hours
+        FROM {ROLLUP_TABLES[period]}
+        WHERE employee_id = %s AND period_start = %s AND project_id = %s
+    """, (employee_id, start, project_id))
+    row = cursor.fetchone()
+    if row is None:
+        values = (0, 0, 0, 0)
+    elif isinstance(row, dict):
+        values = (row['summary_hours'], row['summary_count'], row['logged_hours'], row['approved_hours'])
+    else:
+        values = row
+    return {
+        'period': period,
+        'periodStart': start.strftime('%Y-%m-%d'),
+        'periodEnd': end.strftime('%Y-%m-%d'),
+        'projectId': project_id,
+        'summaryHours': float(values[0] or 0),
+        'summaryCount': int(values[1] or 0),
+        'loggedHours': float(values[2] or 0),
+        'approvedHours': float(values[3] or 0)
+    }
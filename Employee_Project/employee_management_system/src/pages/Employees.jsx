@@ -52,31 +52,14 @@ function Employees() {
     const fetchEmployees = async () => {
       try {
         setLoading(true);
-        const { data } = await axios.get("http://127.0.0.1:5000/api/employees");
-        
-        // Fetch roles for each employee to make sure we have the latest role information
-        const employeesWithRoles = await Promise.all(
-          data.map(async (employee) => {
-            try {
-              const roleResponse = await axios.get(`http://127.0.0.1:5000/get_employee_role/${employee.employee_id}`);
-              return {
-                ...employee,
-                role_name: roleResponse.data.roleName || "Unassigned"
-              };
-            } catch (error) {
-              console.error(`Error fetching role for employee ${employee.employee_id}:`, error);
-              return {
-                ...employee,
-                role_name: "Unassigned"
-              };
-            }
-          })
-        );
+        // Employees come back with their latest role allocation attached
+        const { data: employeesWithRoles } = await axios.get("http://127.0.0.1:5000/api/employees/with-roles");
         
         const mappedEmployees = employeesWithRoles.map((item) => ({
           employee_id: item.employee_id || "N/A",
           employee_name: item.employee_name || "N/A",
           profile_photo: item.profile_photo,
+          profile_thumbnail: item.profile_thumbnail,
           date_joined: item.date_joined || "17/03/2021",
           email: item.email || "ronald@example.com",
           phone: item.phone || "+1-202-555-0129",
@@ -504,7 +487,7 @@ function Employees() {
                 {employee.profile_photo ? (
                   <Avatar 
                     size={64} 
-                    src={employee.profile_photo.startsWith('http') ? employee.profile_photo : `http://127.0.0.1:5000/uploads/${employee.profile_photo}`}
+                    src={employee.profile_thumbnail || (employee.profile_photo.startsWith('http') ? employee.profile_photo : `http://127.0.0.1:5000/uploads/${employee.profile_photo}`)}
                     className="staff-avatar"
                   />
                 ) : (
@@ -653,7 +636,7 @@ function Employees() {
                 {employee.profile_photo ? (
                   <Avatar 
                     size={40} 
-                    src={employee.profile_photo.startsWith('http') ? employee.profile_photo : `http://127.0.0.1:5000/uploads/${employee.profile_photo}`}
+                    src={employee.profile_thumbnail || (employee.profile_photo.startsWith('http') ? employee.profile_photo : `http://127.0.0.1:5000/uploads/${employee.profile_photo}`)}
                     className="staff-list-avatar"
                   />
                 ) : (
@@ -123,19 +123,12 @@ const RoleAllocationsList = () => {
       
       setAllocations(transformedData);
       
-      // Update pagination
-      setPagination({
+      // Update pagination (the total comes from /api/role_allocations_stats)
+      setPagination(prev => ({
+        ...prev,
         current: page,
-        pageSize: pageSize,
-        total: res.data.stats.total || 0
-      });
-      
-      // Store stats
-      setStats({
-        total: res.data.stats.total || 0,
-        recent: res.data.stats.recent || 0,
-        roleDistribution: res.data.stats.roleDistribution || []
-      });
+        pageSize: pageSize
+      }));
       
       setLoading(false);
     } catch (error) {
@@ -145,11 +138,8 @@ const RoleAllocationsList = () => {
     }
   };
 
-  // Initial data load
-  useEffect(() => {
-    fetchAllocations();
-    
-    // Also fetch stats directly
+  // Totals for the cards and the table pagination; reload after a mutation
+  const fetchStats = () => {
     api.get('/api/role_allocations_stats')
       .then(res => {
         setStats({
@@ -157,10 +147,17 @@ const RoleAllocationsList = () => {
           recent: res.data.recent || 0,
           roleDistribution: res.data.roleDistribution || []
         });
+        setPagination(prev => ({ ...prev, total: res.data.total || 0 }));
       })
       .catch(err => {
         console.error('Failed to fetch stats:', err);
       });
+  };
+
+  // Initial data load
+  useEffect(() => {
+    fetchAllocations();
+    fetchStats();
   }, []);
 
   // Handle filter changes
@@ -290,8 +287,9 @@ const RoleAllocationsList = () => {
                     const res = await api.delete(`/api/role_allocations/${record.id}`);
                     if (res.status === 200) {
                       message.success('Role allocation deleted successfully');
-                      // Refresh the allocations list
+                      // Refresh the allocations list and the totals
                       fetchAllocations(pagination.current, pagination.pageSize);
+                      fetchStats();
                     }
                   } catch (error) {
                     console.error('Failed to delete role allocation:', error);
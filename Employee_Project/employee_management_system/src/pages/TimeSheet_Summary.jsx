@@ -622,18 +622,17 @@ const TimeSheetSummary = () => {
         total_hours: entry.total_hours
       }));
       
-      // Call API to save timesheet summary - we'll save each entry individually
-      const savePromises = timesheetData.map(entry => 
-        axios.post(`${API_BASE_URL}/api/timesheet-summary`, entry)
-      );
-      
-      const results = await Promise.allSettled(savePromises);
+      // Save all entries in one request; the response has one result per entry
+      const response = await axios.post(`${API_BASE_URL}/api/timesheet-summary/bulk`, {
+        entries: timesheetData
+      });
       
-      // Check if all entries were saved successfully
-      const allSuccessful = results.every(result => result.status === 'fulfilled');
-      const successCount = results.filter(result => result.status === 'fulfilled').length;
+      const results = response.data.results || [];
+      const successCount = results.filter(
+        result => result.status === 'inserted' || result.status === 'updated'
+      ).length;
       
-      if (allSuccessful) {
+      if (successCount === timesheetData.length) {
         message.success(`All ${timesheetData.length} timesheet entries saved successfully`);
       } else {
         message.warning(`Saved ${successCount} out of ${timesheetData.length} entries`);